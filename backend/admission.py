@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Optional
+
+import metrics
+import storage
+
+logger = logging.getLogger(__name__)
+
+# Buckets are pruned after this many takes; a bucket idle long enough to
+# refill completely is equivalent to having no row at all.
+_PRUNE_EVERY = 1000
+
+
+class AdmissionRejected(Exception):
+    """The tenant's bucket cannot cover the request before the queue deadline."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limited; retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucketStore:
+    """Per-tenant token buckets in a SQLite file shared by every worker.
+
+    Each bucket holds up to ``burst`` tokens and refills at ``rate`` tokens
+    per second. A take runs in one ``BEGIN IMMEDIATE`` transaction, so
+    concurrent workers never spend the same tokens twice.
+    """
+
+    def __init__(self, path: str, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._takes = 0
+        self._lock = threading.Lock()
+        self._conn = storage.connect(path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS token_buckets ("
+                " tenant TEXT PRIMARY KEY,"
+                " tokens REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+
+    def take(self, tenant: str, cost: float, now: Optional[float] = None) -> float:
+        """Take ``cost`` tokens if the bucket has them.
+
+        Returns 0 when taken, otherwise the seconds until the bucket will
+        have refilled enough (nothing is taken then). Costs above ``burst``
+        are capped at ``burst`` so large requests are slow, not impossible.
+        """
+        now = time.time() if now is None else now
+        cost = min(cost, self.burst)
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute(
+                "SELECT tokens, updated_at FROM token_buckets WHERE tenant = ?",
+                (tenant,),
+            ).fetchone()
+            tokens = self.burst
+            if row is not None:
+                tokens = min(self.burst, row[0] + max(0.0, now - row[1]) * self.rate)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / self.rate
+            self._conn.execute(
+                "INSERT INTO token_buckets (tenant, tokens, updated_at)"
+                " VALUES (?, ?, ?) ON CONFLICT(tenant) DO UPDATE SET"
+                " tokens = excluded.tokens, updated_at = excluded.updated_at",
+                (tenant, tokens, now),
+            )
+            self._takes += 1
+            if self._takes % _PRUNE_EVERY == 0:
+                self._conn.execute(
+                    "DELETE FROM token_buckets WHERE updated_at < ?",
+                    (now - self.burst / self.rate,),
+                )
+        return wait
+
+    def reset(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM token_buckets")
+
+
+class FairAdmission:
+    """Admit requests against per-tenant token buckets, queuing briefly.
+
+    A tenant's waiting requests are served first come, first served behind
+    a per-tenant lock, so a tenant with a long queue only delays itself while
+    other tenants draw on their own buckets. A request that cannot be
+    admitted within ``max_wait`` seconds raises ``AdmissionRejected``.
+    """
+
+    def __init__(self, store: TokenBucketStore, max_wait: float):
+        self.store = store
+        self.max_wait = max_wait
+        self.enabled = True
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._queued: dict[str, int] = {}
+
+    async def admit(self, tenant: str, cost: float) -> None:
+        if not self.enabled:
+            return
+        start = time.monotonic()
+        deadline = start + self.max_wait
+        lock = self._locks.setdefault(tenant, asyncio.Lock())
+        self._queued[tenant] = self._queued.get(tenant, 0) + 1
+        try:
+            if lock.locked():
+                try:
+                    await asyncio.wait_for(lock.acquire(), self.max_wait)
+                except asyncio.TimeoutError:
+                    self._reject(tenant, cost, self.store.burst / self.store.rate)
+            else:
+                await lock.acquire()
+            try:
+                while True:
+                    # SQLite may wait on another worker's lock; not on the loop.
+                    wait = await asyncio.to_thread(self.store.take, tenant, cost)
+                    if wait == 0:
+                        break
+                    if time.monotonic() + wait > deadline:
+                        self._reject(tenant, cost, wait)
+                    await asyncio.sleep(wait)
+            finally:
+                lock.release()
+        finally:
+            self._queued[tenant] -= 1
+            if not self._queued[tenant]:
+                del self._queued[tenant]
+                del self._locks[tenant]
+        metrics.ADMISSION_WAIT_SECONDS.observe(time.monotonic() - start)
+
+    @staticmethod
+    def _reject(tenant: str, cost: float, retry_after: float) -> None:
+        metrics.ADMISSION_REJECTIONS.inc()
+        logger.info(
+            "request rate limited",
+            extra={"tenant": tenant, "cost": cost, "retry_after": retry_after},
+        )
+        raise AdmissionRejected(retry_after)
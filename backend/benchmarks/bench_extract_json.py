@@ -0,0 +1,65 @@
+"""Microbenchmark: extract_json against the previous char-by-char implementation.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_extract_json --rows 2000
+"""
+
+import argparse
+import timeit
+
+from benchmarks import legacy
+from benchmarks.fake_provider import make_payload
+from benchmarks.report import write_results
+from parsing import extract_json
+
+
+CASES = {
+    "clean": lambda payload: payload,
+    "prefixed": lambda payload: f"Here is your dataset:\n{payload}\nEnjoy!",
+    "fenced": lambda payload: f"```json\n{payload}\n```",
+}
+
+
+def run(rows: int, repeat: int) -> list[dict]:
+    payload = make_payload(rows)
+    results = []
+    for case, wrap in CASES.items():
+        content = wrap(payload)
+        assert extract_json(content) == legacy.extract_json(content)
+        number = max(1, 2000 // rows)
+        timings = {}
+        for label, fn in (("legacy", legacy.extract_json), ("current", extract_json)):
+            best = min(timeit.repeat(lambda: fn(content), number=number, repeat=repeat))
+            timings[label] = best / number * 1000
+        results.append(
+            {
+                "case": case,
+                "bytes": len(content),
+                "legacy_ms": round(timings["legacy"], 3),
+                "current_ms": round(timings["current"], 3),
+                "speedup": round(timings["legacy"] / timings["current"], 1),
+            }
+        )
+    return results
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", metavar="PATH", help="also write results here")
+    args = parser.parse_args(argv)
+    results = run(args.rows, args.repeat)
+    if args.json:
+        write_results(args.json, "extract_json", vars(args), results)
+    print(f"{'case':<10}{'bytes':>10}{'legacy ms':>12}{'current ms':>12}{'x':>8}")
+    for r in results:
+        print(
+            f"{r['case']:<10}{r['bytes']:>10}{r['legacy_ms']:>12}"
+            f"{r['current_ms']:>12}{r['speedup']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
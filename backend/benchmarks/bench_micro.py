@@ -0,0 +1,114 @@
+"""Microbenchmarks for the request hot paths: parsing, CSV and cache lookups.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_micro --rows 2000 --json micro.json
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import timeit
+
+from benchmarks import bench_extract_json, legacy
+from benchmarks.fake_provider import make_payload
+from benchmarks.report import write_results
+from cache import MemoryCache, SQLiteCache
+from dataset import Dataset
+from serializers import to_csv
+
+
+def _time(fn, number: int, repeat: int) -> float:
+    """Best-of-``repeat`` milliseconds per call."""
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1000
+
+
+def bench_find_balanced(rows: int, repeat: int) -> list[dict]:
+    content = f"Here is your dataset:\n{make_payload(rows)}\nEnjoy!"
+    number = max(1, 2000 // rows)
+    return [
+        {
+            "name": "legacy._find_balanced",
+            "bytes": len(content),
+            "ms": round(
+                _time(lambda: legacy._find_balanced(content, "{", "}"), number, repeat),
+                3,
+            ),
+        }
+    ]
+
+
+def bench_csv(rows: int, repeat: int) -> list[dict]:
+    data = json.loads(make_payload(rows))["rows"]
+    number = max(1, 2000 // rows)
+    return [
+        {
+            "name": "to_csv",
+            "rows": rows,
+            "ms": round(_time(lambda: to_csv(data), number, repeat), 3),
+        },
+        {
+            # A fresh Dataset each call, so the memoized body is not reused.
+            "name": "Dataset.body(csv)",
+            "rows": rows,
+            "ms": round(
+                _time(lambda: Dataset(data).body("csv"), number, repeat),
+                3,
+            ),
+        },
+    ]
+
+
+def bench_cache(rows: int, repeat: int) -> list[dict]:
+    dataset = Dataset(json.loads(make_payload(rows))["rows"])
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        caches = {
+            "memory": MemoryCache(maxsize=1024, ttl=3600),
+            "sqlite": SQLiteCache(
+                os.path.join(tmp, "cache.sqlite3"),
+                ttl=3600,
+                dumps=Dataset.to_bytes,
+                loads=Dataset.from_bytes,
+            ),
+        }
+        for backend, cache in caches.items():
+            cache.set("hit", dataset)
+            for case, key in (("hit", "hit"), ("miss", "absent")):
+                results.append(
+                    {
+                        "name": f"{backend}.get({case})",
+                        "rows": rows,
+                        "ms": round(_time(lambda: cache.get(key), 200, repeat), 4),
+                    }
+                )
+    return results
+
+
+def run(rows: int, repeat: int) -> list[dict]:
+    results = [
+        {"name": f"extract_json({r.pop('case')})", **r}
+        for r in bench_extract_json.run(rows, repeat)
+    ]
+    for bench in (bench_find_balanced, bench_csv, bench_cache):
+        results.extend(bench(rows, repeat))
+    return results
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", metavar="PATH", help="also write results here")
+    args = parser.parse_args(argv)
+    results = run(args.rows, args.repeat)
+    if args.json:
+        write_results(args.json, "micro", vars(args), results)
+    for r in results:
+        ms = r.get("ms", r.get("current_ms"))
+        print(f"{r['name']:<28}{ms:>12} ms")
+
+
+if __name__ == "__main__":
+    main()
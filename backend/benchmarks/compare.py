@@ -0,0 +1,79 @@
+"""Compare two benchmark JSON files and flag regressions.
+
+Run from ``backend/``::
+
+    python -m benchmarks.compare baseline.json current.json --threshold 0.1
+
+Results are matched by ``name`` (microbenchmarks) or ``concurrency`` (load
+test). Timings (``*_ms``) regress when they grow and ``throughput_rps`` when
+it shrinks by more than ``threshold``. Exits with status 1 on any regression.
+"""
+
+import argparse
+import json
+import sys
+
+
+def _key(result: dict):
+    return result.get("name", result.get("concurrency"))
+
+
+def _lower_is_better(metric: str) -> bool:
+    return metric.endswith("_ms") or metric == "ms"
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[dict]:
+    before = {_key(r): r for r in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        old = before.get(_key(result))
+        if old is None:
+            continue
+        for metric, value in result.items():
+            if metric not in old or not isinstance(value, (int, float)):
+                continue
+            if not (_lower_is_better(metric) or metric == "throughput_rps"):
+                continue
+            if not old[metric]:
+                continue
+            change = (value - old[metric]) / old[metric]
+            worse = (
+                change > threshold
+                if _lower_is_better(metric)
+                else (change < -threshold)
+            )
+            rows.append(
+                {
+                    "key": _key(result),
+                    "metric": metric,
+                    "baseline": old[metric],
+                    "current": value,
+                    "change": round(change, 3),
+                    "regression": worse,
+                }
+            )
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args(argv)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.threshold)
+    for r in rows:
+        flag = "REGRESSION" if r["regression"] else ""
+        print(
+            f"{str(r['key']):<28}{r['metric']:<16}{r['baseline']:>12}"
+            f"{r['current']:>12}{r['change']:>+9.1%}  {flag}"
+        )
+    return 1 if any(r["regression"] for r in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Local stand-in LLM provider for benchmarks and load tests."""
+
+import asyncio
+import json
+import random
+from typing import AsyncIterator, Optional
+
+from providers import LLMProvider
+
+
+def make_payload(rows: int, indent: Optional[int] = 2) -> str:
+    """Return a ``{"rows": [...]}`` completion with ``rows`` customer rows."""
+    return json.dumps(
+        {
+            "rows": [
+                {
+                    "id": i,
+                    "name": f"Customer {i}",
+                    "email": f"customer{i}@example.com",
+                    "note": 'says "hi" {sometimes} [rarely]',
+                    "active": i % 2 == 0,
+                    "score": i * 0.37,
+                }
+                for i in range(rows)
+            ]
+        },
+        indent=indent,
+    )
+
+
+SPEC = json.dumps(
+    {
+        "columns": [
+            {"name": "id", "type": "integer", "min": 1, "unique": True},
+            {"name": "name", "type": "string", "faker": "name"},
+            {"name": "email", "type": "string", "faker": "email"},
+            {"name": "score", "type": "number", "min": 0, "max": 100},
+        ]
+    }
+)
+
+
+class FakeProvider(LLMProvider):
+    """Serve a canned completion after ``latency`` ± ``jitter`` seconds.
+
+    ``rows`` sets the completion size. When a prompt ends with the usual
+    "Generate exactly N rows." instruction, N rows are returned instead, so
+    chunked fan-out behaves as it would against a real model. Streams yield
+    the completion in ``chunk_size`` character pieces spread over the delay.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        rows: int = 50,
+        latency: float = 0.05,
+        jitter: float = 0.0,
+        chunk_size: int = 256,
+        seed: Optional[int] = None,
+    ):
+        self._rows = rows
+        self._latency = latency
+        self._jitter = jitter
+        self._chunk_size = chunk_size
+        self._random = random.Random(seed)
+        self._payloads: dict[int, str] = {}
+        self.calls = 0
+
+    def _delay(self) -> float:
+        return max(0.0, self._latency + self._random.uniform(-1, 1) * self._jitter)
+
+    def _payload(self, prompt: str) -> str:
+        rows = self._rows
+        tail = prompt.rsplit("Generate exactly ", 1)
+        if len(tail) == 2 and tail[1].split(" ", 1)[0].isdigit():
+            rows = int(tail[1].split(" ", 1)[0])
+        if rows not in self._payloads:
+            self._payloads[rows] = make_payload(rows, indent=None)
+        return self._payloads[rows]
+
+    async def generate(self, prompt: str, max_tokens: Optional[int] = None) -> str:
+        self.calls += 1
+        await asyncio.sleep(self._delay())
+        return self._payload(prompt)
+
+    async def generate_spec(self, prompt: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self._delay())
+        return SPEC
+
+    async def stream(
+        self, prompt: str, max_tokens: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        self.calls += 1
+        payload = self._payload(prompt)
+        pieces = range(0, len(payload), self._chunk_size)
+        pause = self._delay() / max(1, len(pieces))
+        for start in pieces:
+            await asyncio.sleep(pause)
+            yield payload[start : start + self._chunk_size]
+
+    async def health_check(self) -> bool:
+        return True
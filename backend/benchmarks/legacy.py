@@ -0,0 +1,62 @@
+"""Previous implementations of optimized hot paths, kept as benchmark baselines."""
+
+import json
+from typing import List
+
+
+def _find_balanced(content: str, open_ch: str, close_ch: str):
+    """Return the first balanced substring delimited by open_ch/close_ch, or None."""
+    start = content.find(open_ch)
+    if start == -1:
+        return None
+    depth = 0
+    in_string = False
+    escape = False
+    for i in range(start, len(content)):
+        ch = content[i]
+        if escape:
+            escape = False
+            continue
+        if ch == "\\":
+            escape = True
+            continue
+        if ch == '"':
+            in_string = not in_string
+            continue
+        if in_string:
+            continue
+        if ch == open_ch:
+            depth += 1
+        elif ch == close_ch:
+            depth -= 1
+            if depth == 0:
+                return content[start : i + 1]
+    return None
+
+
+def extract_json(content: str) -> List[dict]:
+    try:
+        parsed = json.loads(content)
+    except json.JSONDecodeError:
+        balanced = _find_balanced(content, "[", "]")
+        if balanced:
+            parsed = json.loads(balanced)
+        else:
+            balanced = _find_balanced(content, "{", "}")
+            if not balanced:
+                raise ValueError("Response did not contain valid JSON")
+            parsed = json.loads(balanced)
+
+    if isinstance(parsed, dict) and "rows" in parsed:
+        rows = parsed["rows"]
+    else:
+        rows = parsed
+
+    if not isinstance(rows, list):
+        raise ValueError("Response JSON must include an array of rows")
+
+    for idx, row in enumerate(rows):
+        if not isinstance(row, dict):
+            raise ValueError(f"Row {idx} must be an object")
+
+    return rows
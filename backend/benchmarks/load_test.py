@@ -0,0 +1,158 @@
+"""End-to-end load test of /generate-data against the local FakeProvider.
+
+Requests go through the real ASGI app in-process (middleware, caching,
+parsing, serialization); only the LLM is replaced. Run from ``backend/``::
+
+    python -m benchmarks.load_test --concurrency 1,8,32 --requests 200 \\
+        --json load.json
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import time
+
+import httpx
+
+import main as app_main
+from benchmarks.fake_provider import FakeProvider
+from benchmarks.report import percentile, write_results
+from cache import MemoryCache
+from routing import RoutedProvider
+
+
+def install(provider: FakeProvider) -> None:
+    """Point the app at ``provider`` only, with a fresh cache and no rate limit."""
+    app_main._providers.clear()
+    app_main._providers["fake"] = app_main._guarded("fake", provider)
+    app_main._default_provider = "fake"
+    app_main._routed_provider = RoutedProvider(app_main._providers, app_main._router)
+    app_main._response_cache = MemoryCache(
+        maxsize=app_main.settings.cache_max_entries,
+        ttl=app_main.settings.cache_ttl_seconds,
+    )
+    app_main._admission.enabled = False
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    provider: FakeProvider,
+    concurrency: int,
+    requests: int,
+    body: dict,
+    hit_ratio: float,
+    rng: random.Random,
+) -> dict:
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(requests):
+        # Repeat an earlier prompt with probability ``hit_ratio``.
+        n = rng.randrange(i) if i and rng.random() < hit_ratio else i
+        queue.put_nowait(f"{body['prompt']} (level {concurrency}, #{n})")
+    latencies: list[float] = []
+    errors = 0
+    calls_before = provider.calls
+
+    async def worker() -> None:
+        nonlocal errors
+        while not queue.empty():
+            prompt = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.post(
+                "/generate-data", json={**body, "prompt": prompt}
+            )
+            await response.aread()
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    def ms(pct: float) -> float:
+        return round(percentile(latencies, pct) * 1000, 2)
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "provider_calls": provider.calls - calls_before,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": ms(0.5),
+        "p95_ms": ms(0.95),
+        "p99_ms": ms(0.99),
+    }
+
+
+async def run(
+    concurrency_levels: list[int],
+    requests: int,
+    rows: int,
+    latency: float,
+    jitter: float,
+    hit_ratio: float = 0.0,
+    fmt: str = "json",
+    stream: bool = False,
+    seed: int = 0,
+) -> list[dict]:
+    provider = FakeProvider(rows=rows, latency=latency, jitter=jitter, seed=seed)
+    install(provider)
+    rng = random.Random(seed)
+    body = {"prompt": "Load test customers", "format": fmt, "stream": stream}
+    transport = httpx.ASGITransport(app=app_main.app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://loadtest", timeout=None
+    ) as client:
+        return [
+            await run_level(client, provider, level, requests, body, hit_ratio, rng)
+            for level in concurrency_levels
+        ]
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--hit-ratio", type=float, default=0.0)
+    parser.add_argument("--format", default="json")
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="also write results here")
+    args = parser.parse_args(argv)
+    levels = [int(c) for c in args.concurrency.split(",")]
+    # Per-request INFO logs would dominate the measurement.
+    logging.getLogger().setLevel(logging.WARNING)
+    results = asyncio.run(
+        run(
+            levels,
+            args.requests,
+            args.rows,
+            args.latency,
+            args.jitter,
+            args.hit_ratio,
+            args.format,
+            args.stream,
+            args.seed,
+        )
+    )
+    if args.json:
+        write_results(args.json, "load_test", vars(args), results)
+    print(
+        f"{'conc':>5}{'reqs':>7}{'errors':>8}{'calls':>7}{'rps':>9}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    )
+    for r in results:
+        print(
+            f"{r['concurrency']:>5}{r['requests']:>7}{r['errors']:>8}"
+            f"{r['provider_calls']:>7}{r['throughput_rps']:>9}"
+            f"{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
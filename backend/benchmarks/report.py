@@ -0,0 +1,45 @@
+"""Shared helpers for benchmark scripts: percentiles and JSON result files."""
+
+import json
+import math
+import platform
+import subprocess  # nosec B404
+import time
+from typing import Optional
+
+
+def percentile(samples: list[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of ``samples`` (``pct`` in 0..1)."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct * len(ordered)) - 1))]
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(  # nosec B603 B607
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def write_results(path: str, benchmark: str, params: dict, results: list) -> None:
+    """Write ``results`` plus run metadata to ``path`` as JSON."""
+    document = {
+        "benchmark": benchmark,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "params": params,
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+        f.write("\n")
@@ -0,0 +1,115 @@
+"""Measure worker cold start: importing ``main`` and answering the first /health.
+
+Each run is a fresh interpreter, so nothing is cached between runs.
+``--importtime`` adds a ``python -X importtime`` breakdown of the modules
+``main`` imports, slowest first. Run from ``backend/``::
+
+    python -m benchmarks.startup --runs 5 --importtime --json startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess  # nosec B404
+import sys
+
+from benchmarks.report import write_results
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import asyncio, json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+import httpx
+
+async def probe():
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://s") as c:
+        return (await c.get("/health")).status_code
+
+status = asyncio.run(probe())
+done = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "first_health_ms": (done - start) * 1000,
+    "status": status,
+}))
+"""
+
+
+def _python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(  # nosec B603
+        [sys.executable, *args],
+        cwd=_BACKEND,
+        capture_output=True,
+        text=True,
+        check=True,
+        timeout=120,
+    )
+
+
+def measure(runs: int) -> list[dict]:
+    samples = [json.loads(_python("-c", _PROBE).stdout) for _ in range(runs)]
+    return [
+        {
+            "name": "import main",
+            "ms": round(statistics.median(s["import_ms"] for s in samples), 1),
+        },
+        {
+            "name": "first /health",
+            "ms": round(statistics.median(s["first_health_ms"] for s in samples), 1),
+            "status": samples[-1]["status"],
+        },
+    ]
+
+
+def parse_importtime(stderr: str, top: int) -> list[dict]:
+    """Cumulative import time of each module ``main`` imports directly."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # the header line
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        if depth == 1:
+            entries.append((int(cumulative) / 1000, name.strip()))
+        elif depth == 0 and name.strip() != "main":
+            entries = []  # children of interpreter start-up (site, encodings)
+    entries.sort(reverse=True)
+    return [
+        {"name": f"importtime {module}", "ms": round(ms, 1)}
+        for ms, module in entries[:top]
+    ]
+
+
+def importtime(top: int) -> list[dict]:
+    return parse_importtime(
+        _python("-X", "importtime", "-c", "import main").stderr, top
+    )
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--importtime", action="store_true", help="add a per-module import breakdown"
+    )
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", metavar="PATH", help="also write results here")
+    args = parser.parse_args(argv)
+    results = measure(args.runs)
+    if args.importtime:
+        results.extend(importtime(args.top))
+    if args.json:
+        write_results(args.json, "startup", vars(args), results)
+    for r in results:
+        print(f"{r['name']:<40}{r['ms']:>10} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import abc
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from cachetools import TTLCache
+
+import metrics
+import storage
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache(abc.ABC):
+    """Key/value cache for generated responses with hit/miss/eviction counters."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @abc.abstractmethod
+    def _get(self, key: str) -> Optional[Any]: ...
+
+    @abc.abstractmethod
+    def set(self, key: str, value: Any) -> None: ...
+
+    @abc.abstractmethod
+    def __len__(self) -> int: ...
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._get(key)
+        if value is None:
+            self.misses += 1
+            metrics.CACHE_LOOKUPS.labels(self.backend, "miss").inc()
+        else:
+            self.hits += 1
+            metrics.CACHE_LOOKUPS.labels(self.backend, "hit").inc()
+        return value
+
+    def _record_evictions(self, count: int) -> None:
+        self.evictions += count
+        metrics.CACHE_EVICTIONS.labels(self.backend).inc(count)
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# ---------------------------------------------------------------------------
+# In-memory (per-process) backend
+# ---------------------------------------------------------------------------
+class _EvictionCountingTTLCache(TTLCache):
+    def __init__(self, maxsize: int, ttl: float, on_evict: Callable[[], None]):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self._on_evict = on_evict
+
+    def popitem(self):
+        item = super().popitem()
+        self._on_evict()
+        return item
+
+
+class MemoryCache(ResponseCache):
+    """LRU/TTL cache private to the current worker process."""
+
+    backend = "memory"
+
+    def __init__(self, maxsize: int = 256, ttl: float = 600):
+        super().__init__()
+        self._cache = _EvictionCountingTTLCache(maxsize, ttl, self._count_eviction)
+
+    def _count_eviction(self) -> None:
+        self._record_evictions(1)
+
+    def _get(self, key: str) -> Optional[Any]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: Any) -> None:
+        self._cache[key] = value
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+# ---------------------------------------------------------------------------
+# SQLite (shared across workers) backend
+# ---------------------------------------------------------------------------
+class SQLiteCache(ResponseCache):
+    """Cache stored in a local SQLite file shared by every uvicorn worker.
+
+    WAL mode lets workers read concurrently while one writes. Entries expire
+    after ``ttl`` seconds; once the stored values exceed ``max_bytes`` the least
+    recently used entries are evicted. Values are encoded with ``dumps`` and
+    decoded with ``loads`` (JSON by default).
+
+    Lookups run on the event loop, so the cache fails open: a lookup or store
+    that cannot get the database within ``busy_timeout`` seconds counts as a
+    miss or is skipped. A hit refreshes the entry's LRU time at most every
+    ``touch_interval`` seconds, so most hits are read-only.
+    """
+
+    backend = "sqlite"
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = 600,
+        max_bytes: int = 64 * 1024 * 1024,
+        dumps: Callable[[Any], bytes] = lambda v: json.dumps(v).encode(),
+        loads: Callable[[bytes], Any] = json.loads,
+        busy_timeout: float = 0.05,
+        touch_interval: float = 30,
+    ):
+        super().__init__()
+        self._ttl = ttl
+        self._touch_interval = touch_interval
+        self._max_bytes = max_bytes
+        self._dumps = dumps
+        self._loads = loads
+        self._lock = threading.Lock()
+        self._conn = storage.connect(path, timeout=busy_timeout)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS response_cache_accessed"
+                " ON response_cache (accessed_at)"
+            )
+
+    def _get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        try:
+            with self._lock, self._conn:
+                row = self._conn.execute(
+                    "SELECT value, expires_at, accessed_at FROM response_cache"
+                    " WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                if row is None:
+                    return None
+                value, expires_at, accessed_at = row
+                if expires_at <= now:
+                    self._conn.execute(
+                        "DELETE FROM response_cache WHERE key = ?", (key,)
+                    )
+                    return None
+                if now - accessed_at >= self._touch_interval:
+                    self._conn.execute(
+                        "UPDATE response_cache SET accessed_at = ? WHERE key = ?",
+                        (now, key),
+                    )
+        except sqlite3.OperationalError as exc:
+            logger.warning("cache lookup skipped: %s", exc)
+            return None
+        return self._loads(value)
+
+    def set(self, key: str, value: Any) -> None:
+        blob = self._dumps(value)
+        try:
+            self._store(key, blob)
+        except sqlite3.OperationalError as exc:
+            logger.warning("cache store skipped: %s", exc)
+
+    def _store(self, key: str, blob: bytes) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache"
+                " (key, value, size, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now + self._ttl, now),
+            )
+            self._conn.execute(
+                "DELETE FROM response_cache WHERE expires_at <= ?", (now,)
+            )
+            self._evict_over_budget()
+
+    def _evict_over_budget(self) -> None:
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM response_cache"
+        ).fetchone()
+        if total <= self._max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT key, size FROM response_cache ORDER BY accessed_at"
+        ).fetchall()
+        doomed = []
+        for key, size in rows:
+            if total <= self._max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM response_cache WHERE key = ?", doomed)
+        self._record_evictions(len(doomed))
+        logger.info("cache evicted entries", extra={"count": len(doomed)})
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM response_cache"
+            ).fetchone()
+        return count
@@ -0,0 +1,51 @@
+import gzip
+from typing import Optional
+
+try:  # optional: zstd is preferred when installed and accepted by the client
+    import zstandard
+except ImportError:  # pragma: no cover - exercised when zstandard is absent
+    zstandard = None
+
+_GZIP_LEVEL = 6
+_ZSTD_LEVEL = 3
+
+
+def supported_encodings() -> tuple[str, ...]:
+    return ("zstd", "gzip") if zstandard is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Pick the best encoding from an ``Accept-Encoding`` header, or None.
+
+    zstd wins over gzip when both are accepted with the same weight; explicit
+    ``q=0`` entries and ``*`` are honoured.
+    """
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in supported_encodings():
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(body)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=_GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
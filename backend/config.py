@@ -1,4 +1,7 @@
 import logging
+import os
+import tempfile
+from typing import Literal
 
 from pydantic_settings import BaseSettings
 from pydantic import Field, model_validator
@@ -14,8 +17,71 @@ class Settings(BaseSettings):
     google_api_key: str = Field(default="")
     google_model: str = Field(default="gemini-2.0-flash")
     max_prompt_length: int = Field(default=2000)
+    byok_pool_size: int = Field(default=64, ge=1)
+    byok_idle_seconds: int = Field(default=300, ge=1)
+    routing_window: int = Field(default=50, ge=1)
+    routing_max_error_rate: float = Field(default=0.5, ge=0, le=1)
+    hedge_enabled: bool = Field(default=True)
+    hedge_min_delay_seconds: float = Field(default=1.0, ge=0)
+    circuit_failure_threshold: int = Field(default=5, ge=1)
+    circuit_reset_seconds: float = Field(default=30.0, gt=0)
+    provider_max_concurrency: int = Field(default=32, ge=1)
+    provider_queue_timeout_seconds: float = Field(default=10.0, ge=0)
+    max_rows: int = Field(default=5000, ge=1)
+    chunk_rows: int = Field(default=100, ge=1)
+    chunk_concurrency: int = Field(default=4, ge=1)
+    validation_max_topups: int = Field(default=1, ge=0)
+    row_bytes_estimate: int = Field(default=200, ge=1)
+    max_output_tokens: int = Field(default=16384, ge=256)
+    max_continuations: int = Field(default=2, ge=0)
+    spec_max_rows: int = Field(default=1_000_000, ge=1)
+    spec_default_rows: int = Field(default=100, ge=1)
+    # Larger non-streamed spec responses must use stream or save.
+    spec_max_inline_rows: int = Field(default=50_000, ge=1)
+    compression_min_bytes: int = Field(default=1024, ge=0)
+    batch_max_items: int = Field(default=20, ge=1)
+    batch_concurrency: int = Field(default=4, ge=1)
+    relational_max_tables: int = Field(default=10, ge=1)
+    rate_limit_per_minute: float = Field(default=10, gt=0)
+    rate_limit_burst: float = Field(default=20, ge=1)
+    rate_limit_max_wait_seconds: float = Field(default=5.0, ge=0)
+    # Only set this when a trusted proxy overwrites the header; clients could
+    # otherwise pick a fresh bucket per request.
+    tenant_header: str = Field(default="")
+    rate_limit_db_path: str = Field(
+        default_factory=lambda: os.path.join(
+            tempfile.gettempdir(), "synthetic-data-ratelimit.sqlite3"
+        )
+    )
     cors_origins: str = Field(default="http://localhost:3000")
     sentry_dsn: str = Field(default="")
+    startup_warmup: bool = Field(default=True)
+    cache_backend: Literal["memory", "sqlite"] = Field(default="memory")
+    cache_ttl_seconds: int = Field(default=600, ge=1)
+    cache_max_entries: int = Field(default=256, ge=1)
+    cache_max_bytes: int = Field(default=64 * 1024 * 1024, ge=1)
+    cache_path: str = Field(
+        default_factory=lambda: os.path.join(
+            tempfile.gettempdir(), "synthetic-data-cache.sqlite3"
+        )
+    )
+    job_concurrency: int = Field(default=2, ge=1)
+    job_max_active: int = Field(default=50, ge=1)
+    job_result_ttl_seconds: int = Field(default=86400, ge=1)
+    # Queued/running jobs not heartbeated for job_stale_seconds are failed.
+    job_heartbeat_seconds: float = Field(default=10, gt=0)
+    job_stale_seconds: float = Field(default=60, gt=0)
+    job_db_path: str = Field(
+        default_factory=lambda: os.path.join(
+            tempfile.gettempdir(), "synthetic-data-jobs.sqlite3"
+        )
+    )
+    dataset_store_path: str = Field(
+        default_factory=lambda: os.path.join(
+            tempfile.gettempdir(), "synthetic-data-datasets"
+        )
+    )
+    dataset_page_max_rows: int = Field(default=1000, ge=1)
 
     @model_validator(mode="after")
     def at_least_one_key(self):
@@ -1,3 +1,15 @@
 import os
 
 os.environ.setdefault("OPENAI_API_KEY", "test-key-not-real")
+
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _reset_rate_limits():
+    """Keep rate-limit buckets from leaking between tests."""
+    from main import _admission
+
+    _admission.store.reset()
+    yield
@@ -0,0 +1,138 @@
+import json
+from typing import List, Optional
+
+import metrics
+from compression import compress
+from serializers import iter_ndjson, to_arrow_ipc, to_csv, to_parquet
+
+# json and csv are wrapped in a {"<fmt>": ...} JSON envelope unless a raw body
+# is requested; the other formats are always sent as the raw body.
+ENVELOPE_FORMATS = ("json", "csv")
+RAW_MEDIA_TYPES = {
+    "json": "application/json",
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+# Formats that are already compressed internally.
+_PRECOMPRESSED = ("parquet",)
+# Heads kept per dataset; the least recently used one is dropped beyond this.
+_MAX_HEADS = 4
+
+
+def media_type(fmt: str, raw: bool = False) -> str:
+    if fmt in ENVELOPE_FORMATS and not raw:
+        return "application/json"
+    return RAW_MEDIA_TYPES[fmt]
+
+
+def _dumps(payload) -> bytes:
+    # Same encoding FastAPI's JSONResponse uses, so cached bodies are identical
+    # to freshly rendered ones.
+    return json.dumps(
+        payload,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class Dataset:
+    """Validated rows plus their response bodies, rendered once per format.
+
+    This is what the response cache stores, so a cache hit skips JSON
+    extraction and CSV rendering entirely and just sends the stored bytes.
+    """
+
+    __slots__ = ("rows", "rejected", "requested", "_bodies", "_heads")
+
+    def __init__(
+        self, rows: List[dict], rejected: int = 0, requested: Optional[int] = None
+    ):
+        self.rows = rows
+        # Rows dropped by schema validation while generating this dataset.
+        self.rejected = rejected
+        # Row count asked for when generating; the model may return fewer.
+        self.requested = requested
+        self._bodies: dict[str, bytes] = {}
+        self._heads: dict[int, "Dataset"] = {}
+
+    def head(self, n: Optional[int]) -> "Dataset":
+        """Return the first ``n`` rows as a Dataset.
+
+        The last few heads are memoized so repeated row counts reuse their
+        rendered bodies; the dict's insertion order doubles as LRU order.
+        """
+        if n is None or n >= len(self.rows):
+            return self
+        head = self._heads.pop(n, None)
+        if head is None:
+            head = Dataset(self.rows[:n], self.rejected, n)
+            if len(self._heads) >= _MAX_HEADS:
+                del self._heads[next(iter(self._heads))]
+        self._heads[n] = head
+        return head
+
+    def body(self, fmt: str, raw: bool = False) -> bytes:
+        """Return the response body for ``fmt`` (see ``media_type``).
+
+        ``raw`` drops the ``{"<fmt>": ...}`` envelope around json and csv.
+        """
+        raw = raw or fmt not in ENVELOPE_FORMATS
+        key = f"{fmt}:raw" if raw else fmt
+        cached = self._bodies.get(key)
+        if cached is not None:
+            return cached
+        with metrics.SERIALIZE_SECONDS.labels(fmt).time():
+            body = self._render(fmt, raw)
+        self._bodies[key] = body
+        return body
+
+    def _render(self, fmt: str, raw: bool) -> bytes:
+        if fmt == "csv":
+            csv_text = to_csv(self.rows)
+            return csv_text.encode("utf-8") if raw else _dumps({"csv": csv_text})
+        if fmt == "ndjson":
+            return "".join(iter_ndjson(self.rows)).encode("utf-8")
+        if fmt == "parquet":
+            return to_parquet(self.rows)
+        if fmt == "arrow":
+            return to_arrow_ipc(self.rows)
+        return _dumps(self.rows if raw else {"json": self.rows})
+
+    def encoded_body(
+        self, fmt: str, raw: bool, encoding: Optional[str], min_bytes: int = 0
+    ) -> tuple[bytes, Optional[str]]:
+        """Return ``(body, content_encoding)``, compressing once per encoding.
+
+        Bodies under ``min_bytes`` and already-compressed formats are sent
+        as is, with a ``None`` encoding.
+        """
+        body = self.body(fmt, raw)
+        if encoding is None or len(body) < min_bytes or fmt in _PRECOMPRESSED:
+            return body, None
+        key = f"{fmt}:{'raw' if raw else 'envelope'}:{encoding}"
+        compressed = self._bodies.get(key)
+        if compressed is None:
+            compressed = self._bodies[key] = compress(body, encoding)
+        return compressed, encoding
+
+    # -- cache codec (for byte-oriented backends such as SQLiteCache) --------
+    # A metadata line precedes the json body. The compact body never contains
+    # a raw newline, so blobs written before the metadata line still load.
+    def to_bytes(self) -> bytes:
+        meta = _dumps({"rejected": self.rejected, "requested": self.requested})
+        return meta + b"\n" + self.body("json")
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "Dataset":
+        blob = bytes(blob)
+        meta, _, body = blob.rpartition(b"\n")
+        meta = json.loads(meta) if meta else {}
+        dataset = cls(
+            json.loads(body)["json"], meta.get("rejected", 0), meta.get("requested")
+        )
+        dataset._bodies["json"] = body
+        return dataset
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import tempfile
+from typing import List, Optional
+
+from serializers import column_union, iter_ndjson
+
+logger = logging.getLogger(__name__)
+
+_ID = re.compile(r"^[0-9a-f]{32}$")
+_OFFSET = struct.Struct("<Q")
+
+
+class DatasetNotFound(KeyError):
+    pass
+
+
+class DatasetStore:
+    """Content-addressed NDJSON files with a row-offset index for range reads.
+
+    A dataset's id is a hash of its NDJSON body, so saving the same rows twice
+    stores them once. Next to each ``<id>.ndjson`` file sit ``<id>.idx``
+    (little-endian uint64 start offset of every row, plus the end of file) and
+    ``<id>.json`` (row count and columns). A page read memory-maps both files
+    and slices out just the requested rows' bytes. Files are written to a
+    temporary name and renamed, so readers in other workers never see a
+    partial dataset.
+    """
+
+    def __init__(self, root: str):
+        self._root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, dataset_id: str, suffix: str) -> str:
+        return os.path.join(self._root, dataset_id[:2], f"{dataset_id}{suffix}")
+
+    def save(self, rows: List[dict], body: Optional[bytes] = None) -> str:
+        """Store ``rows`` and return their id. ``body`` is their NDJSON, if known."""
+        if body is None:
+            body = "".join(iter_ndjson(rows)).encode("utf-8")
+        dataset_id = hashlib.sha256(body).hexdigest()[:32]
+        if os.path.exists(self._path(dataset_id, ".json")):
+            return dataset_id
+
+        import numpy as np
+
+        newlines = np.flatnonzero(np.frombuffer(body, dtype=np.uint8) == 10)
+        offsets = np.concatenate([[0], newlines + 1]).astype("<u8")
+        meta = {"rows": len(offsets) - 1, "columns": column_union(rows)}
+
+        os.makedirs(os.path.dirname(self._path(dataset_id, "")), exist_ok=True)
+        self._write(dataset_id, ".ndjson", body)
+        self._write(dataset_id, ".idx", offsets.tobytes())
+        # The metadata file goes last: its presence marks the dataset complete.
+        self._write(dataset_id, ".json", json.dumps(meta).encode())
+        logger.info("dataset saved", extra={"dataset_id": dataset_id, **meta})
+        return dataset_id
+
+    def _write(self, dataset_id: str, suffix: str, data: bytes) -> None:
+        path = self._path(dataset_id, suffix)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def meta(self, dataset_id: str) -> dict:
+        if not _ID.match(dataset_id):
+            raise DatasetNotFound(dataset_id)
+        try:
+            with open(self._path(dataset_id, ".json"), "rb") as f:
+                return json.loads(f.read())
+        except FileNotFoundError:
+            raise DatasetNotFound(dataset_id) from None
+
+    def read_lines(self, dataset_id: str, offset: int, limit: int) -> List[bytes]:
+        """Return the raw NDJSON lines of rows ``[offset, offset + limit)``."""
+        total = self.meta(dataset_id)["rows"]
+        end = min(offset + limit, total)
+        if offset >= end:
+            return []
+        with open(self._path(dataset_id, ".idx"), "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as index:
+            (start_byte,) = _OFFSET.unpack_from(index, offset * _OFFSET.size)
+            (end_byte,) = _OFFSET.unpack_from(index, end * _OFFSET.size)
+        with open(self._path(dataset_id, ".ndjson"), "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as data:
+            chunk = data[start_byte:end_byte]
+        return chunk.rstrip(b"\n").split(b"\n")
+
+    def read(
+        self,
+        dataset_id: str,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        columns: Optional[List[str]] = None,
+    ) -> List[dict]:
+        if limit is None:
+            limit = self.meta(dataset_id)["rows"]
+        rows = [json.loads(line) for line in self.read_lines(dataset_id, offset, limit)]
+        if columns is not None:
+            rows = [{c: row.get(c) for c in columns} for row in rows]
+        return rows
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import logging
+import math
+import re
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+import metrics
+from parsing import extract_json
+from providers import LLMProvider
+
+logger = logging.getLogger(__name__)
+
+
+def rows_prompt(prompt: str, rows: int) -> str:
+    """Append the explicit row-count instruction the frontend also uses."""
+    return f"{prompt}\n\nGenerate exactly {rows} rows."
+
+
+def _chunk_prompt(prompt: str, rows: int, index: int, total: int) -> str:
+    return (
+        f"{prompt}\n\n"
+        f"This is part {index + 1} of {total} of a larger dataset; make these "
+        f"rows distinct from the other parts. Generate exactly {rows} rows."
+    )
+
+
+def chunk_prompts(prompt: str, rows: int, chunk_rows: int) -> List[Tuple[str, int]]:
+    """``(prompt, rows)`` for each chunk call of a ``rows``-row request.
+
+    A request that fits in one chunk gets the plain row-count instruction.
+    """
+    sizes = chunk_sizes(rows, chunk_rows)
+    if len(sizes) == 1:
+        return [(rows_prompt(prompt, rows), rows)]
+    return [(_chunk_prompt(prompt, n, i, len(sizes)), n) for i, n in enumerate(sizes)]
+
+
+class TokenBudget(NamedTuple):
+    """How many output tokens to allow for a given number of rows."""
+
+    row_bytes: float = 200
+    limit: int = 16384
+    continuations: int = 2
+
+    def tokens(self, rows: int) -> int:
+        # About four bytes of JSON per token, 25% headroom and room for the
+        # wrapper object.
+        return min(self.limit, 256 + math.ceil(rows * self.row_bytes * 1.25 / 4))
+
+
+async def generate_rows(
+    provider: LLMProvider,
+    make_prompt: Callable[[int], str],
+    rows: int,
+    parse: Callable[[str], List[dict]] = extract_json,
+    budget: TokenBudget = TokenBudget(),
+) -> List[dict]:
+    """Ask for ``rows`` rows with an output cap sized to that count.
+
+    If the completion is still cut off at the cap, the rows that closed
+    before the cut are kept and up to ``budget.continuations`` follow-up
+    calls ask for the remainder only, each sized from the bytes per row
+    actually observed. ``make_prompt`` builds the prompt for a row count.
+    """
+    collected: List[dict] = []
+    for attempt in range(budget.continuations + 1):
+        wanted = rows - len(collected)
+        content = await provider.generate(
+            make_prompt(wanted), max_tokens=budget.tokens(wanted)
+        )
+        with metrics.PARSE_SECONDS.time():
+            batch = parse(content)[:wanted]
+        collected.extend(batch)
+        if not getattr(content, "truncated", False) or len(collected) >= rows:
+            break
+        logger.info(
+            "completion truncated",
+            extra={"rows": len(collected), "wanted": rows, "attempt": attempt},
+        )
+        if batch:
+            budget = budget._replace(
+                row_bytes=max(budget.row_bytes, len(content) / len(batch))
+            )
+    return collected
+
+
+def chunk_sizes(rows: int, chunk_rows: int) -> List[int]:
+    full, rest = divmod(rows, chunk_rows)
+    return [chunk_rows] * full + ([rest] if rest else [])
+
+
+async def generate_chunked(
+    provider: LLMProvider,
+    prompt: str,
+    rows: int,
+    chunk_rows: int,
+    concurrency: int,
+    dedupe: bool = False,
+    on_rows: Optional[Callable[[int], None]] = None,
+    parse: Callable[[str], List[dict]] = extract_json,
+    budget: TokenBudget = TokenBudget(),
+) -> List[dict]:
+    """Generate ``rows`` rows as concurrent chunk requests and merge them.
+
+    At most ``concurrency`` chunk calls are in flight. Each call goes through
+    the provider's own retry policy, so a flaky chunk is retried on its own;
+    if a chunk still fails, the remaining chunks are cancelled. ``on_rows`` is
+    called with the row count of every chunk as it completes. ``parse`` turns
+    a completion into rows; it may drop invalid rows, leaving a chunk short.
+    Each chunk is sized and continued on truncation as in ``generate_rows``.
+    """
+    sizes = chunk_sizes(rows, chunk_rows)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_chunk(index: int, size: int) -> List[dict]:
+        async with semaphore:
+            chunk = await generate_rows(
+                provider,
+                lambda n: _chunk_prompt(prompt, n, index, len(sizes)),
+                size,
+                parse,
+                budget,
+            )
+        if on_rows is not None:
+            on_rows(len(chunk))
+        return chunk
+
+    logger.info("fan-out generation", extra={"rows": rows, "chunks": len(sizes)})
+    tasks = [asyncio.ensure_future(run_chunk(i, n)) for i, n in enumerate(sizes)]
+    try:
+        chunks = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    return merge_rows(chunks, dedupe=dedupe)
+
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def column_id(name: str) -> str:
+    return _NON_ALNUM.sub("", name.lower()) or name
+
+
+def merge_rows(chunks: List[List[dict]], dedupe: bool = False) -> List[dict]:
+    """Concatenate chunk rows onto one reconciled column set.
+
+    Column names that differ only in case or separators ("First Name",
+    "first_name") are folded onto the first spelling seen. Every row gets the
+    union of columns in first-seen order, with ``None`` for missing values.
+    With ``dedupe`` exact duplicate rows are dropped.
+    """
+    canonical: dict[str, str] = {}
+    renamed: List[dict] = []
+    for chunk in chunks:
+        for row in chunk:
+            out = {}
+            for key, value in row.items():
+                name = canonical.setdefault(column_id(key), key)
+                out[name] = value
+            renamed.append(out)
+
+    columns = list(dict.fromkeys(canonical.values()))
+    merged: List[dict] = []
+    seen = set()
+    for row in renamed:
+        values = [row.get(c) for c in columns]
+        if dedupe:
+            fingerprint = json.dumps(values, sort_keys=True, default=str)
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+        merged.append(dict(zip(columns, values)))
+    return merged
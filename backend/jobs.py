@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+
+from fastapi import HTTPException
+
+import storage
+from dataset import Dataset
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[int], None]
+JobRunner = Callable[[ProgressCallback], Awaitable[Dataset]]
+
+_COLUMNS = (
+    "id",
+    "status",
+    "format",
+    "rows_requested",
+    "rows_done",
+    "error",
+    "created_at",
+    "updated_at",
+)
+
+
+class JobStore:
+    """SQLite-backed job records and results, readable from every worker.
+
+    A queued or running job's ``updated_at`` is its heartbeat. One not
+    touched for ``stale_after`` seconds belonged to a worker that stopped
+    without finishing it, so it is marked failed and no longer counts as
+    active.
+    """
+
+    def __init__(self, path: str, result_ttl: float = 86400, stale_after: float = 60):
+        self._result_ttl = result_ttl
+        self._stale_after = stale_after
+        self._lock = threading.Lock()
+        self._conn = storage.connect(path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " status TEXT NOT NULL,"
+                " format TEXT NOT NULL,"
+                " rows_requested INTEGER,"
+                " rows_done INTEGER NOT NULL DEFAULT 0,"
+                " error TEXT,"
+                " result BLOB,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+
+    def create(self, job_id: str, fmt: str, rows_requested: Optional[int]) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed')"
+                " AND updated_at <= ?",
+                (now - self._result_ttl,),
+            )
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, format, rows_requested,"
+                " created_at, updated_at) VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, fmt, rows_requested, now, now),
+            )
+
+    def update(self, job_id: str, **fields) -> None:
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?",  # nosec B608
+                (*fields.values(), job_id),
+            )
+
+    def add_progress(self, job_id: str, rows: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET rows_done = rows_done + ?, updated_at = ?"
+                " WHERE id = ?",
+                (rows, time.time(), job_id),
+            )
+
+    def heartbeat(self, job_ids: list[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE jobs SET updated_at = ?"
+                " WHERE id = ? AND status IN ('queued', 'running')",
+                [(time.time(), job_id) for job_id in job_ids],
+            )
+
+    def _fail_stale(self) -> None:
+        now = time.time()
+        with self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated_at = ?"
+                " WHERE status IN ('queued', 'running') AND updated_at < ?",
+                ("Job lost: its worker stopped", now, now - self._stale_after),
+            )
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            self._fail_stale()
+            row = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?",  # nosec B608
+                (job_id,),
+            ).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def result(self, job_id: str) -> Optional[Dataset]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM jobs WHERE id = ? AND status = 'succeeded'",
+                (job_id,),
+            ).fetchone()
+        return Dataset.from_bytes(row[0]) if row else None
+
+    def count_active(self) -> int:
+        with self._lock:
+            self._fail_stale()
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()
+        return count
+
+
+class JobManager:
+    """Run generation jobs as in-process asyncio tasks with bounded concurrency.
+
+    Job state and results go to the shared ``JobStore`` so any worker can
+    answer status and result requests; the task itself runs in the worker
+    that accepted the job, which heartbeats its jobs every ``heartbeat``
+    seconds while any are queued or running.
+    """
+
+    def __init__(self, store: JobStore, concurrency: int, heartbeat: float = 10):
+        self.store = store
+        self._concurrency = concurrency
+        self._heartbeat = heartbeat
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._beating: Optional[asyncio.Task] = None
+
+    def submit(self, run: JobRunner, fmt: str, rows_requested: Optional[int]) -> str:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+        job_id = uuid.uuid4().hex
+        self.store.create(job_id, fmt, rows_requested)
+        task = asyncio.create_task(self._run(job_id, run))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+        if self._beating is None or self._beating.done():
+            self._beating = asyncio.create_task(self._beat())
+        return job_id
+
+    async def _beat(self) -> None:
+        while self._tasks:
+            await asyncio.sleep(self._heartbeat)
+            self.store.heartbeat(list(self._tasks))
+
+    async def _run(self, job_id: str, run: JobRunner) -> None:
+        async with self._semaphore:
+            self.store.update(job_id, status="running")
+            try:
+                dataset = await run(lambda n: self.store.add_progress(job_id, n))
+            except asyncio.CancelledError:
+                self.store.update(job_id, status="failed", error="Job cancelled")
+                raise
+            except Exception as exc:
+                logger.exception("Job failed", extra={"job_id": job_id})
+                if isinstance(exc, HTTPException):
+                    detail = exc.detail
+                elif isinstance(exc, ValueError):
+                    detail = str(exc)
+                else:
+                    detail = "Failed to generate synthetic data"
+                self.store.update(job_id, status="failed", error=detail)
+                return
+            # Encoding and writing the result can take a while; keep them off
+            # the event loop.
+            await asyncio.to_thread(
+                lambda: self.store.update(
+                    job_id,
+                    status="succeeded",
+                    rows_done=len(dataset.rows),
+                    result=dataset.to_bytes(),
+                )
+            )
+            logger.info("Job finished", extra={"job_id": job_id})
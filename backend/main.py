@@ -1,23 +1,51 @@
+import asyncio
 import hashlib
+import importlib
 import logging
 import json
+import math
+import re
+import time
+from contextlib import asynccontextmanager
+from functools import partial
 
 from fastapi import FastAPI, HTTPException, Query, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Literal, Optional
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
-import pandas as pd
-import sentry_sdk
-from cachetools import TTLCache
+from pydantic import BaseModel, Field, PrivateAttr, model_validator
+from typing import AsyncIterator, Callable, List, Literal, Optional, Union
 from pythonjsonlogger.json import JsonFormatter
 
+from admission import AdmissionRejected, FairAdmission, TokenBucketStore
+from cache import MemoryCache, ResponseCache, SQLiteCache
 from config import Settings
-from providers import OpenAIProvider, AnthropicProvider, GoogleProvider, LLMProvider
+from compression import negotiate
+from dataset import Dataset, media_type
+from datastore import DatasetNotFound, DatasetStore
+from fanout import (
+    TokenBudget,
+    chunk_prompts,
+    generate_chunked,
+    generate_rows,
+    merge_rows,
+    rows_prompt,
+)
+from jobs import JobManager, JobStore, ProgressCallback
+import metrics
+from parsing import RowStreamParser, extract_json
+from relational import dependency_levels, link_tables, table_prompt
+from serializers import csv_line, to_csv
+from resilience import AdaptiveLimiter, CircuitBreaker, GuardedProvider
+from routing import RoutedProvider, Router
+from validation import RowValidator
+from providers import (
+    OpenAIProvider,
+    AnthropicProvider,
+    GoogleProvider,
+    LazyProvider,
+    LLMProvider,
+    ProviderPool,
+)
 
 # ---------------------------------------------------------------------------
 # Configuration
@@ -25,32 +53,113 @@ from providers import OpenAIProvider, AnthropicProvider, GoogleProvider, LLMProv
 settings = Settings()
 
 if settings.sentry_dsn:
+    import sentry_sdk
+
     sentry_sdk.init(
         dsn=settings.sentry_dsn,
         traces_sample_rate=0.1,
         send_default_pii=False,
     )
 
-# Build provider registry
+# Build provider registry. SDKs are imported and clients built on first use
+# (or by the start-up warm-up), not at import time.
 _providers: dict[str, LLMProvider] = {}
 if settings.openai_api_key:
-    _providers["openai"] = OpenAIProvider(
-        settings.openai_api_key, settings.openai_model
+    _providers["openai"] = LazyProvider(
+        partial(OpenAIProvider, settings.openai_api_key, settings.openai_model)
     )
 if settings.anthropic_api_key:
-    _providers["anthropic"] = AnthropicProvider(
-        settings.anthropic_api_key, settings.anthropic_model
+    _providers["anthropic"] = LazyProvider(
+        partial(AnthropicProvider, settings.anthropic_api_key, settings.anthropic_model)
     )
 if settings.google_api_key:
-    _providers["google"] = GoogleProvider(
-        settings.google_api_key, settings.google_model
+    _providers["google"] = LazyProvider(
+        partial(GoogleProvider, settings.google_api_key, settings.google_model)
+    )
+_lazy_providers = dict(_providers)
+
+
+def _guarded(name: str, provider: LLMProvider) -> GuardedProvider:
+    """Put a server-side provider behind a circuit breaker and an AIMD cap.
+
+    A degraded vendor then fails fast with 503 instead of holding workers
+    through a full retry cycle on every request.
+    """
+    return GuardedProvider(
+        name,
+        provider,
+        CircuitBreaker(
+            failure_threshold=settings.circuit_failure_threshold,
+            reset_timeout=settings.circuit_reset_seconds,
+        ),
+        AdaptiveLimiter(
+            initial_limit=min(8, settings.provider_max_concurrency),
+            max_limit=settings.provider_max_concurrency,
+            queue_timeout=settings.provider_queue_timeout_seconds,
+        ),
     )
 
+
+_providers = {name: _guarded(name, provider) for name, provider in _providers.items()}
+
+# provider="auto" routes across every server-side provider by rolling latency
+# and error rate, hedging slow calls to the runner-up.
+_router = Router(
+    window=settings.routing_window,
+    max_error_rate=settings.routing_max_error_rate,
+    hedge=settings.hedge_enabled,
+    hedge_min_delay=settings.hedge_min_delay_seconds,
+)
+_routed_provider = RoutedProvider(_providers, _router)
+
 _default_provider = (
     settings.available_providers[0] if settings.available_providers else None
 )
 
-_response_cache = TTLCache(maxsize=256, ttl=600)  # 10-min TTL
+# Response cache of parsed Datasets: per-worker LRU/TTL by default, or a
+# SQLite file shared by every uvicorn worker when CACHE_BACKEND=sqlite.
+_response_cache: ResponseCache
+if settings.cache_backend == "sqlite":
+    _response_cache = SQLiteCache(
+        settings.cache_path,
+        ttl=settings.cache_ttl_seconds,
+        max_bytes=settings.cache_max_bytes,
+        dumps=Dataset.to_bytes,
+        loads=Dataset.from_bytes,
+    )
+else:
+    _response_cache = MemoryCache(
+        maxsize=settings.cache_max_entries, ttl=settings.cache_ttl_seconds
+    )
+
+_jobs = JobManager(
+    JobStore(
+        settings.job_db_path,
+        result_ttl=settings.job_result_ttl_seconds,
+        stale_after=settings.job_stale_seconds,
+    ),
+    concurrency=settings.job_concurrency,
+    heartbeat=settings.job_heartbeat_seconds,
+)
+
+_datasets = DatasetStore(settings.dataset_store_path)
+
+# Output token caps are sized from the requested row count.
+_token_budget = TokenBudget(
+    row_bytes=settings.row_bytes_estimate,
+    limit=settings.max_output_tokens,
+    continuations=settings.max_continuations,
+)
+
+# Per-tenant token buckets in a SQLite file, so limits hold across workers.
+_admission = FairAdmission(
+    TokenBucketStore(
+        settings.rate_limit_db_path,
+        rate=settings.rate_limit_per_minute / 60,
+        burst=settings.rate_limit_burst,
+    ),
+    max_wait=settings.rate_limit_max_wait_seconds,
+)
 
 # Header-to-provider mapping for BYOK
 _HEADER_PROVIDER_MAP = {
@@ -60,14 +169,19 @@ _HEADER_PROVIDER_MAP = {
 }
 
 
-def _user_key_providers(request: Request) -> dict[str, LLMProvider]:
-    """Build ephemeral provider instances from user-supplied API key headers."""
-    user_providers: dict[str, LLMProvider] = {}
+_byok_pool = ProviderPool(
+    maxsize=settings.byok_pool_size, idle_seconds=settings.byok_idle_seconds
+)
+
+
+def _user_keys(request: Request) -> dict[str, tuple]:
+    """Map provider name to (provider_cls, model, api_key) from key headers."""
+    user_keys: dict[str, tuple] = {}
     for header, (name, cls, model) in _HEADER_PROVIDER_MAP.items():
         key = request.headers.get(header, "").strip()
         if key:
-            user_providers[name] = cls(key, model)
-    return user_providers
+            user_keys[name] = (cls, model, key)
+    return user_keys
 
 
 def _resolve_provider(
@@ -75,25 +189,110 @@ def _resolve_provider(
 ) -> tuple[str, LLMProvider, bool]:
     """Return (provider_name, provider_instance, is_user_key).
 
-    User-supplied headers override server defaults.
+    User-supplied headers override server defaults. User-key providers come
+    from a pool so their SDK clients and connections are reused. ``"auto"``
+    selects load-aware routing across the server-side providers.
     """
-    user_provs = _user_key_providers(request)
+    if provider_name == "auto" and _providers:
+        return "auto", _routed_provider, False
+    user_keys = _user_keys(request)
     name = provider_name or (
-        list(user_provs.keys())[0] if user_provs else _default_provider
+        list(user_keys.keys())[0] if user_keys else _default_provider
     )
-    if name and name in user_provs:
-        return name, user_provs[name], True
+    if name and name in user_keys:
+        cls, model, key = user_keys[name]
+        return name, _byok_pool.get(name, cls, key, model), True
     if name and name in _providers:
         return name, _providers[name], False
-    available = list({**_providers, **user_provs}.keys())
+    available = list({**_providers, **user_keys}.keys())
     raise HTTPException(
         status_code=400,
         detail=f"Invalid or unconfigured provider: {name}. Available: {available}",
     )
 
 
-def _cache_key(provider: str, prompt: str) -> str:
-    return hashlib.sha256(f"{provider}:{prompt}".encode()).hexdigest()
+# Row-count instruction appended by the frontend (and by DataRequest.rows).
+_ROW_COUNT_SUFFIX = re.compile(
+    r"\s*generate\s+exactly\s+(\d+)\s+rows?\s*\.?\s*$", re.IGNORECASE
+)
+
+
+def _normalize_prompt(prompt: str) -> tuple[str, Optional[int]]:
+    """Return (canonical prompt, trailing row count or None).
+
+    Case and whitespace are folded and a trailing "Generate exactly N rows."
+    is split off, so prompts that differ only in those respects share a cache
+    entry.
+    """
+    rows = None
+    match = _ROW_COUNT_SUFFIX.search(prompt)
+    if match:
+        rows = int(match.group(1))
+        prompt = prompt[: match.start()]
+    return " ".join(prompt.lower().split()), rows
+
+
+def _cache_key(
+    provider: str,
+    prompt: str,
+    dedupe: bool = False,
+    mode: str = "llm",
+    columns: str = "",
+) -> str:
+    # Hashed as a JSON list so no prompt text can spell another request's key.
+    normalized, _ = _normalize_prompt(prompt)
+    parts = [provider, mode, dedupe, columns, normalized]
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+
+def _cached_rows(key: str, wanted: Optional[int]) -> Optional[Dataset]:
+    """Return the cached dataset for ``key`` if it covers ``wanted`` rows.
+
+    A cached result with more rows than requested is served as its first
+    ``wanted`` rows, so asking for fewer rows never calls the LLM again. A
+    result that asked for at least ``wanted`` rows also counts, even if the
+    model returned fewer: asking again would most likely come up short too.
+    """
+    dataset = _response_cache.get(key)
+    if dataset is None:
+        return None
+    covered = max(len(dataset.rows), dataset.requested or 0)
+    if wanted is not None and covered < wanted:
+        logger.info(
+            "cached dataset too small",
+            extra={"cache_key": key[:12], "cached_rows": len(dataset.rows)},
+        )
+        return None
+    logger.info("cache hit", extra={"cache_key": key[:12]})
+    return dataset.head(wanted)
+
+
+# In-flight provider calls keyed by cache key. Concurrent identical requests
+# await the same task instead of each paying for its own LLM call.
+_inflight: dict[str, asyncio.Task] = {}
+
+
+def _singleflight(key: str, factory) -> asyncio.Future:
+    """Return an awaitable for ``factory()``, shared by all callers of ``key``.
+
+    The underlying task is shielded so a disconnecting caller does not cancel
+    the call for everyone else waiting on it.
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        _inflight[key] = task
+
+        def _done(t: asyncio.Task) -> None:
+            if _inflight.get(key) is t:
+                del _inflight[key]
+            if not t.cancelled():
+                t.exception()  # mark retrieved even if every waiter went away
+
+        task.add_done_callback(_done)
+    else:
+        logger.info("joined in-flight request", extra={"cache_key": key[:12]})
+    return asyncio.shield(task)
 
 
 # ---------------------------------------------------------------------------
@@ -109,14 +308,38 @@ _handler.setFormatter(
 logging.basicConfig(level=logging.INFO, handlers=[_handler])
 logger = logging.getLogger(__name__)
 
+
 # ---------------------------------------------------------------------------
 # App & middleware
 # ---------------------------------------------------------------------------
-app = FastAPI()
+async def _warm_up() -> None:
+    """Build provider clients and import heavy modules off the event loop.
+
+    Runs in the background after start-up, so ``/health`` answers right
+    away while the first generate request usually finds everything loaded.
+    """
+    start = time.perf_counter()
+    for name, provider in _lazy_providers.items():
+        try:
+            await asyncio.to_thread(provider.load)
+        except Exception:
+            logger.exception("Provider warm-up failed", extra={"provider": name})
+    await asyncio.to_thread(importlib.import_module, "specgen")
+    logger.info(
+        "warm-up finished",
+        extra={"seconds": round(time.perf_counter() - start, 3)},
+    )
 
-limiter = Limiter(key_func=get_remote_address)
-app.state.limiter = limiter
-app.add_middleware(SlowAPIMiddleware)
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    warm_up = asyncio.ensure_future(_warm_up()) if settings.startup_warmup else None
+    yield
+    if warm_up is not None:
+        warm_up.cancel()
+
+
+app = FastAPI(lifespan=_lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -129,20 +352,25 @@ app.add_middleware(
         "X-Anthropic-API-Key",
         "X-Google-API-Key",
     ],
+    expose_headers=["X-Dataset-Id", "X-Rows-Rejected"],
 )
-
-
-@app.exception_handler(RateLimitExceeded)
-async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
-    raise HTTPException(
-        status_code=429,
-        detail="Too many requests \u2013 please try again later.",
-    )
+app.add_middleware(metrics.MetricsMiddleware)
 
 
 # ---------------------------------------------------------------------------
 # Schemas
 # ---------------------------------------------------------------------------
+class ColumnSchema(BaseModel):
+    name: str = Field(..., min_length=1)
+    type: Literal["string", "integer", "number", "boolean", "date", "datetime"] = (
+        "string"
+    )
+    nullable: bool = False
+    enum: Optional[List[Union[bool, int, float, str]]] = Field(
+        None, min_length=1, description="Allowed values"
+    )
+
+
 class DataRequest(BaseModel):
     prompt: str = Field(
         ...,
@@ -150,8 +378,156 @@ class DataRequest(BaseModel):
         max_length=settings.max_prompt_length,
         description="Prompt describing the dataset to generate",
     )
+    format: Literal["json", "csv", "ndjson", "parquet", "arrow"] = Field(
+        "json",
+        description=(
+            "json/csv are wrapped in a JSON envelope; ndjson, parquet and arrow"
+            " (IPC stream) are returned as the raw body"
+        ),
+    )
+    provider: Optional[str] = None
+    stream: bool = Field(
+        False,
+        description="Stream rows as they are generated (NDJSON, SSE, or CSV lines)",
+    )
+    rows: Optional[int] = Field(
+        None,
+        ge=1,
+        le=max(settings.max_rows, settings.spec_max_rows),
+        description="Number of rows; large counts are generated in parallel chunks",
+    )
+    dedupe: bool = Field(False, description="Drop exact duplicate rows")
+    mode: Literal["llm", "spec"] = Field(
+        "llm",
+        description=(
+            "llm: the provider writes every row; spec: the provider describes"
+            " the columns once and rows are generated locally"
+        ),
+    )
+    seed: Optional[int] = Field(
+        None, description="Random seed for reproducible spec-mode rows"
+    )
+    download: bool = Field(
+        False,
+        description="Return json/csv as the raw body (no envelope) as an attachment",
+    )
+    save: bool = Field(
+        False,
+        description="Persist the result; its id is returned in X-Dataset-Id",
+    )
+    columns: Optional[List[ColumnSchema]] = Field(
+        None,
+        min_length=1,
+        description=(
+            "Typed columns every row must match; rows that cannot be repaired"
+            " are dropped and replaced by a top-up call"
+        ),
+    )
+    _validator: Optional[RowValidator] = PrivateAttr(None)
+
+    @model_validator(mode="after")
+    def stream_format_supported(self):
+        if self.stream and self.format in ("parquet", "arrow"):
+            raise ValueError("stream supports the json, csv and ndjson formats")
+        if self.stream and self.save:
+            raise ValueError("save cannot be combined with stream")
+        if self.stream and self.format == "csv" and self.columns is not None:
+            # CSV has no place for the trailing count of rejected rows.
+            raise ValueError("columns with stream needs the json or ndjson format")
+        return self
+
+    @model_validator(mode="after")
+    def rows_within_mode_limit(self):
+        limit = settings.spec_max_rows if self.mode == "spec" else settings.max_rows
+        if self.rows is not None and self.rows > limit:
+            raise ValueError(f"rows must be at most {limit} in {self.mode} mode")
+        # Spec mode also honours a "Generate exactly N rows." prompt suffix.
+        suffix_rows = _normalize_prompt(self.prompt)[1]
+        if self.mode == "spec" and self.rows is None and (suffix_rows or 0) > limit:
+            raise ValueError(f"rows must be at most {limit} in spec mode")
+        return self
+
+    @model_validator(mode="after")
+    def compile_columns(self):
+        if self.columns is not None:
+            if self.mode == "spec":
+                raise ValueError("columns is only supported in llm mode")
+            try:
+                self._validator = RowValidator([c.model_dump() for c in self.columns])
+            except (TypeError, ValueError) as exc:
+                raise ValueError(str(exc)) from exc
+        return self
+
+    @property
+    def row_validator(self) -> Optional[RowValidator]:
+        return self._validator
+
+
+class BatchRequest(BaseModel):
+    requests: List[DataRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.batch_max_items,
+        description="Requests to run concurrently; results stream back as NDJSON",
+    )
+
+    @model_validator(mode="after")
+    def items_fit_ndjson(self):
+        for idx, item in enumerate(self.requests):
+            if item.format not in ("json", "csv") or item.stream:
+                raise ValueError(
+                    f"requests[{idx}]: batch items must use the json or csv"
+                    " format without stream"
+                )
+            error = _inline_rows_error(item)
+            if error is not None:
+                raise ValueError(f"requests[{idx}]: {error}")
+        return self
+
+
+class ForeignKey(BaseModel):
+    column: str = Field(..., min_length=1)
+    references: str = Field(..., description="Name of the parent table")
+
+
+class TableSpec(BaseModel):
+    name: str = Field(..., pattern=r"^[A-Za-z_][A-Za-z0-9_]*$")
+    prompt: str = Field(..., min_length=1, max_length=settings.max_prompt_length)
+    rows: int = Field(..., ge=1, le=settings.max_rows)
+    primary_key: str = Field("id", min_length=1)
+    foreign_keys: List[ForeignKey] = Field(default_factory=list)
+
+
+class RelationalRequest(BaseModel):
+    tables: List[TableSpec] = Field(
+        ..., min_length=1, max_length=settings.relational_max_tables
+    )
     format: Literal["json", "csv"] = "json"
     provider: Optional[str] = None
+    seed: Optional[int] = Field(
+        None, description="Random seed for reproducible foreign key assignment"
+    )
+
+    @model_validator(mode="after")
+    def keys_form_a_dag(self):
+        names = [table.name for table in self.tables]
+        if len(set(names)) != len(names):
+            raise ValueError("table names must be unique")
+        for table in self.tables:
+            for fk in table.foreign_keys:
+                if fk.column == table.primary_key:
+                    raise ValueError(
+                        f"{table.name}.{fk.column} cannot be both the primary key"
+                        " and a foreign key"
+                    )
+        dependency_levels(names, self.foreign_key_map())
+        return self
+
+    def foreign_key_map(self) -> dict[str, list[tuple[str, str]]]:
+        return {
+            table.name: [(fk.column, fk.references) for fk in table.foreign_keys]
+            for table in self.tables
+        }
 
 
 # ---------------------------------------------------------------------------
@@ -159,9 +535,8 @@ class DataRequest(BaseModel):
 # ---------------------------------------------------------------------------
 @app.get("/providers")
 async def get_providers(request: Request):
-    user_provs = _user_key_providers(request)
     all_providers = list(
-        dict.fromkeys(list(_providers.keys()) + list(user_provs.keys()))
+        dict.fromkeys(list(_providers.keys()) + list(_user_keys(request).keys()))
     )
     default = _default_provider or (all_providers[0] if all_providers else None)
     return {
@@ -194,20 +569,40 @@ async def health(deep: bool = Query(False)):
                 checks[f"{name}_reachable"] = "fail"
                 healthy = False
 
+    routing = {name: stats.snapshot() for name, stats in _router.stats.items()}
+    circuits = {name: provider.status() for name, provider in _providers.items()}
+
     status_code = 200 if healthy else 503
     return JSONResponse(
         status_code=status_code,
-        content={"status": "healthy" if healthy else "degraded", "checks": checks},
+        content={
+            "status": "healthy" if healthy else "degraded",
+            "checks": checks,
+            "cache": _response_cache.stats(),
+            "routing": routing,
+            "circuits": circuits,
+        },
     )
 
 
+@app.get("/metrics")
+async def get_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
 @app.post("/generate-data")
-@limiter.limit("10/minute")
 async def generate_data(request: Request, data_request: DataRequest):
+    error = _inline_rows_error(data_request)
+    if error is not None:
+        raise HTTPException(status_code=422, detail=error)
     # Resolve provider (user headers override server defaults)
     provider_name, provider, is_user_key = _resolve_provider(
         request, data_request.provider
     )
+    await _admit(
+        request, _request_cost(data_request), [provider_name] if is_user_key else None
+    )
 
     logger.info(
         "generate-data request received",
@@ -218,26 +613,57 @@ async def generate_data(request: Request, data_request: DataRequest):
             "user_key": is_user_key,
         },
     )
-    try:
-        # Skip server-side cache when user key is used (avoids cross-user leakage)
-        if is_user_key:
-            content = await provider.generate(data_request.prompt)
+    if data_request.stream:
+        sse = data_request.format == "json" and "text/event-stream" in (
+            request.headers.get("accept", "")
+        )
+        # Streams with a column schema end with a count of rejected rows.
+        summary = None if data_request.columns is None else {"rows_rejected": 0}
+        if data_request.mode == "spec":
+            rows = _iter_spec_rows(provider_name, provider, is_user_key, data_request)
         else:
-            key = _cache_key(provider_name, data_request.prompt)
-            cached = _response_cache.get(key)
-            if cached is not None:
-                logger.info("cache hit", extra={"cache_key": key[:12]})
-                content = cached
-            else:
-                content = await provider.generate(data_request.prompt)
-                _response_cache[key] = content
-        data = extract_json(content)
-
+            rows = _iter_rows(
+                provider,
+                _base_prompt(data_request),
+                (
+                    None
+                    if is_user_key
+                    else _request_cache_key(provider_name, data_request)
+                ),
+                _requested_rows(data_request),
+                data_request.row_validator,
+                summary,
+            )
         if data_request.format == "csv":
-            df = pd.DataFrame(data)
-            return {"csv": df.to_csv(index=False)}
+            media_type = "text/csv"
+        else:
+            media_type = "text/event-stream" if sse else "application/x-ndjson"
+        return StreamingResponse(
+            _encode_row_stream(rows, data_request.format, sse, summary),
+            media_type=media_type,
+        )
 
-        return {"json": data}
+    try:
+        dataset = await _cached_dataset(
+            provider_name, provider, is_user_key, data_request
+        )
+        headers = {}
+        if data_request.columns is not None:
+            headers["X-Rows-Rejected"] = str(dataset.rejected)
+        if data_request.save:
+            dataset_id = await asyncio.to_thread(
+                lambda: _datasets.save(dataset.rows, dataset.body("ndjson"))
+            )
+            headers["X-Dataset-Id"] = dataset_id
+            if _over_inline_limit(data_request):
+                # Too large to send back; the client reads it via /datasets.
+                return JSONResponse(
+                    {"dataset_id": dataset_id, "rows": len(dataset.rows)},
+                    headers=headers,
+                )
+        return _dataset_response(
+            request, dataset, data_request.format, data_request.download, headers
+        )
 
     except HTTPException:
         raise
@@ -252,62 +678,698 @@ async def generate_data(request: Request, data_request: DataRequest):
         ) from exc
 
 
+@app.post("/generate-batch")
+async def generate_batch(request: Request, batch: BatchRequest):
+    # Resolve every provider first so a bad name fails the whole batch with 400
+    # before anything is streamed.
+    items = [
+        (idx, item, *_resolve_provider(request, item.provider))
+        for idx, item in enumerate(batch.requests)
+    ]
+    await _admit(
+        request,
+        sum(_request_cost(item) for item in batch.requests),
+        (
+            [name for _, _, name, _, _ in items]
+            if all(user_key for *_, user_key in items)
+            else None
+        ),
+    )
+    logger.info(
+        "generate-batch request received",
+        extra={
+            "items": len(items),
+            "providers": sorted({name for _, _, name, _, _ in items}),
+        },
+    )
+    return StreamingResponse(_iter_batch(items), media_type="application/x-ndjson")
+
+
+@app.post("/generate-relational")
+async def generate_relational(request: Request, relational: RelationalRequest):
+    provider_name, provider, is_user_key = _resolve_provider(
+        request, relational.provider
+    )
+    await _admit(
+        request,
+        sum(_rows_cost(t.rows) for t in relational.tables),
+        [provider_name] if is_user_key else None,
+    )
+    foreign_keys = relational.foreign_key_map()
+    logger.info(
+        "generate-relational request received",
+        extra={"tables": len(relational.tables), "provider": provider_name},
+    )
+    semaphore = asyncio.Semaphore(settings.batch_concurrency)
+
+    async def generate_table(table: TableSpec) -> list[dict]:
+        # TableSpec already validated the prompt and row count; the key hints
+        # table_prompt adds may take the prompt past max_prompt_length.
+        item = DataRequest.model_construct(
+            prompt=table_prompt(
+                table.name,
+                table.prompt,
+                table.primary_key,
+                foreign_keys[table.name],
+            ),
+            rows=table.rows,
+        )
+        async with semaphore:
+            dataset = await _cached_dataset(provider_name, provider, is_user_key, item)
+        # Cached rows are shared; copy before keys are rewritten.
+        return [dict(row) for row in dataset.rows]
+
+    # Foreign keys are sampled locally from parent keys afterwards, so no
+    # table's prompt depends on another table's rows: all run concurrently.
+    tasks = [asyncio.ensure_future(generate_table(t)) for t in relational.tables]
+    try:
+        results = await asyncio.gather(*tasks)
+    except Exception as exc:
+        for task in tasks:
+            task.cancel()
+        if not isinstance(exc, (HTTPException, ValueError)):
+            logger.exception("Relational generation failed")
+        status, detail = _error_status(exc)
+        raise HTTPException(status_code=status, detail=detail) from exc
+
+    tables = {t.name: rows for t, rows in zip(relational.tables, results)}
+    try:
+        link_tables(
+            tables,
+            {t.name: t.primary_key for t in relational.tables},
+            foreign_keys,
+            relational.seed,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=502, detail=str(exc)) from exc
+    if relational.format == "csv":
+        tables = {name: to_csv(rows) for name, rows in tables.items()}
+    return {
+        "tables": tables,
+        "levels": dependency_levels(list(tables), foreign_keys),
+    }
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: Request, data_request: DataRequest):
+    if data_request.stream or data_request.save:
+        # A job's result is fetched from /jobs/{id}/result instead.
+        raise HTTPException(
+            status_code=422, detail="stream and save are not supported for jobs"
+        )
+    if _over_inline_limit(data_request):
+        # Job results are held whole in memory and in the job database.
+        raise HTTPException(
+            status_code=422,
+            detail=(
+                f"spec jobs are limited to {settings.spec_max_inline_rows} rows;"
+                " use /generate-data with stream or save for more"
+            ),
+        )
+    provider_name, provider, is_user_key = _resolve_provider(
+        request, data_request.provider
+    )
+    await _admit(
+        request, _request_cost(data_request), [provider_name] if is_user_key else None
+    )
+    if _jobs.store.count_active() >= settings.job_max_active:
+        raise HTTPException(
+            status_code=429, detail="Too many active jobs \u2013 try again later."
+        )
+
+    async def run(on_rows: ProgressCallback) -> Dataset:
+        return await _cached_dataset(
+            provider_name, provider, is_user_key, data_request, on_rows
+        )
+
+    job_id = _jobs.submit(run, data_request.format, data_request.rows)
+    logger.info(
+        "job submitted",
+        extra={"job_id": job_id, "provider": provider_name, "user_key": is_user_key},
+    )
+    return {"id": job_id, "status": "queued"}
+
+
+def _get_job_or_404(job_id: str) -> dict:
+    job = _jobs.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    return _get_job_or_404(job_id)
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(
+    request: Request,
+    job_id: str,
+    format: Optional[Literal["json", "csv", "ndjson", "parquet", "arrow"]] = Query(
+        None
+    ),
+    download: bool = Query(False),
+):
+    job = _get_job_or_404(job_id)
+    if job["status"] != "succeeded":
+        raise HTTPException(
+            status_code=409, detail=f"Job is {job['status']}, no result available"
+        )
+    dataset = await asyncio.to_thread(_jobs.store.result, job_id)
+    return await asyncio.to_thread(
+        _dataset_response, request, dataset, format or job["format"], download
+    )
+
+
+def _dataset_meta_or_404(dataset_id: str) -> dict:
+    try:
+        return _datasets.meta(dataset_id)
+    except DatasetNotFound:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset: {dataset_id}")
+
+
+@app.get("/datasets/{dataset_id}")
+async def get_dataset_page(
+    dataset_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=settings.dataset_page_max_rows),
+    columns: Optional[str] = Query(None, description="Comma-separated column names"),
+):
+    meta = _dataset_meta_or_404(dataset_id)
+    lines = _datasets.read_lines(dataset_id, offset, limit)
+    selected = [c for c in columns.split(",") if c] if columns else None
+    if selected is not None:
+        lines = [
+            json.dumps({c: row.get(c) for c in selected}, ensure_ascii=False).encode()
+            for row in map(json.loads, lines)
+        ]
+    # Stored lines are already JSON objects, so the page is assembled from
+    # their bytes without decoding them.
+    head = json.dumps(
+        {
+            "id": dataset_id,
+            "total_rows": meta["rows"],
+            "offset": offset,
+            "columns": selected or meta["columns"],
+        }
+    )[:-1].encode()
+    body = head + b',"rows":[' + b",".join(lines) + b"]}"
+    return Response(content=body, media_type="application/json")
+
+
+@app.get("/datasets/{dataset_id}/download")
+async def download_dataset(
+    request: Request,
+    dataset_id: str,
+    format: Literal["json", "csv", "ndjson", "parquet", "arrow"] = Query("ndjson"),
+):
+    _dataset_meta_or_404(dataset_id)
+    rows = await asyncio.to_thread(_datasets.read, dataset_id)
+    return _dataset_response(request, Dataset(rows), format, download=True)
+
+
+# ---------------------------------------------------------------------------
+# Admission helpers
+# ---------------------------------------------------------------------------
+def _tenants(request: Request, user_providers: Optional[List[str]] = None) -> List[str]:
+    """Rate-limit buckets a request is charged to.
+
+    Every request is charged to the trusted proxy's tenant header when one is
+    configured, else to the client address; headers the client merely sends
+    cannot move it to a fresh bucket. Calls that run entirely on the caller's
+    own API keys (``user_providers``) are also charged to a bucket keyed by
+    a hash of those keys, so one key shared across addresses stays limited.
+    A new, unverified key therefore never adds capacity.
+    """
+    tenant = ""
+    if settings.tenant_header:
+        tenant = request.headers.get(settings.tenant_header, "").strip()
+    if tenant:
+        tenants = ["tenant:" + tenant]
+    else:
+        tenants = ["ip:" + (request.client.host if request.client else "unknown")]
+    if user_providers:
+        user_keys = _user_keys(request)
+        keys = sorted({user_keys[name][2] for name in user_providers})
+        digest = hashlib.sha256("\0".join(keys).encode()).hexdigest()[:32]
+        tenants.append("key:" + digest)
+    return tenants
+
+
+def _rows_cost(rows: Optional[int]) -> int:
+    """One token per provider call the rows are expected to need."""
+    return max(1, math.ceil((rows or settings.chunk_rows) / settings.chunk_rows))
+
+
+def _request_cost(data_request: DataRequest) -> int:
+    if data_request.mode == "spec":
+        return 1  # one spec call; the rows are generated locally
+    return _rows_cost(_requested_rows(data_request))
+
+
+async def _admit(
+    request: Request, cost: int, user_providers: Optional[List[str]] = None
+) -> None:
+    try:
+        for tenant in _tenants(request, user_providers):
+            await _admission.admit(tenant, cost)
+    except AdmissionRejected as exc:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests \u2013 please try again later.",
+            headers={"Retry-After": str(math.ceil(exc.retry_after))},
+        ) from exc
+
+
 # ---------------------------------------------------------------------------
-# JSON parsing helpers
+# Generation helpers
 # ---------------------------------------------------------------------------
-def _find_balanced(content: str, open_ch: str, close_ch: str):
-    """Return the first balanced substring delimited by open_ch/close_ch, or None."""
-    start = content.find(open_ch)
-    if start == -1:
+def _dataset_response(
+    request: Request,
+    dataset: Dataset,
+    fmt: str,
+    download: bool,
+    headers: Optional[dict] = None,
+) -> Response:
+    """Render ``dataset`` as ``fmt``, compressed if the client accepts it.
+
+    Compressed bodies are memoized on the dataset, so cache hits do not pay
+    for compression again. ``download`` sends json/csv without the envelope
+    and marks the body as an attachment.
+    """
+    encoding = negotiate(request.headers.get("accept-encoding", ""))
+    body, encoding = dataset.encoded_body(
+        fmt, download, encoding, settings.compression_min_bytes
+    )
+    headers = {**(headers or {}), "Vary": "Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    if download:
+        headers["Content-Disposition"] = f'attachment; filename="synthetic_data.{fmt}"'
+    return Response(content=body, media_type=media_type(fmt, download), headers=headers)
+
+
+def _base_prompt(data_request: DataRequest) -> str:
+    """The prompt without its row count, which the callers append themselves."""
+    prompt = data_request.prompt
+    if data_request.rows is None:
+        match = _ROW_COUNT_SUFFIX.search(prompt)
+        if match:
+            prompt = prompt[: match.start()]
+    validator = data_request.row_validator
+    if validator is None:
+        return prompt
+    return validator.prompt(prompt)
+
+
+def _request_cache_key(provider_name: str, data_request: DataRequest) -> str:
+    validator = data_request.row_validator
+    return _cache_key(
+        provider_name,
+        data_request.prompt,
+        data_request.dedupe,
+        columns="" if validator is None else validator.fingerprint,
+    )
+
+
+def _requested_rows(data_request: DataRequest) -> Optional[int]:
+    if data_request.rows is not None:
+        return data_request.rows
+    return _normalize_prompt(data_request.prompt)[1]
+
+
+async def _generate_dataset(
+    provider: LLMProvider,
+    data_request: DataRequest,
+    on_rows: Optional[ProgressCallback] = None,
+) -> Dataset:
+    """Run the provider call(s) for ``data_request`` and parse the rows.
+
+    Row counts above ``chunk_rows`` fan out into parallel chunk requests, since a
+    single completion is capped by the provider's token limit and timeout.
+
+    With a column schema, rows that fail validation are dropped rather than
+    failing the request, and up to ``validation_max_topups`` further calls ask
+    only for the missing rows.
+    """
+    validator = data_request.row_validator
+    rejected = 0
+
+    def parse(content: str) -> List[dict]:
+        nonlocal rejected
+        if validator is None:
+            return extract_json(content)
+        valid, dropped = validator.parse(content)
+        rejected += dropped
+        return valid
+
+    rows = _requested_rows(data_request)
+    data = await _generate_rows(provider, data_request, rows, parse, on_rows)
+    if validator is not None and rows is not None:
+        for _ in range(settings.validation_max_topups):
+            missing = rows - len(data)
+            if missing <= 0:
+                break
+            logger.info(
+                "topping up rejected rows",
+                extra={"missing": missing, "rejected": rejected},
+            )
+            extra = await _generate_rows(
+                provider, data_request, missing, parse, on_rows
+            )
+            data = merge_rows([data, extra], dedupe=data_request.dedupe)[:rows]
+    return Dataset(data, rejected, _requested_rows(data_request))
+
+
+async def _generate_rows(
+    provider: LLMProvider,
+    data_request: DataRequest,
+    rows: Optional[int],
+    parse: Callable[[str], List[dict]],
+    on_rows: Optional[ProgressCallback],
+) -> List[dict]:
+    if rows is not None and rows > settings.chunk_rows:
+        return await generate_chunked(
+            provider,
+            _base_prompt(data_request),
+            rows,
+            chunk_rows=settings.chunk_rows,
+            concurrency=settings.chunk_concurrency,
+            dedupe=data_request.dedupe,
+            on_rows=on_rows,
+            parse=parse,
+            budget=_token_budget,
+        )
+
+    prompt = _base_prompt(data_request)
+    if rows is None:
+        content = await provider.generate(prompt)
+        with metrics.PARSE_SECONDS.time():
+            data = parse(content)
+    else:
+        data = await generate_rows(
+            provider, lambda n: rows_prompt(prompt, n), rows, parse, _token_budget
+        )
+    if data_request.dedupe:
+        data = merge_rows([data], dedupe=True)
+    if on_rows is not None:
+        on_rows(len(data))
+    return data
+
+
+async def _cached_dataset(
+    provider_name: str,
+    provider: LLMProvider,
+    is_user_key: bool,
+    data_request: DataRequest,
+    on_rows: Optional[ProgressCallback] = None,
+) -> Dataset:
+    """Serve ``data_request`` from the response cache or generate it once."""
+    if data_request.mode == "spec":
+        columns = await _cached_spec(provider_name, provider, is_user_key, data_request)
+        rows: List[dict] = []
+        async for batch in _spec_batches(columns, data_request):
+            rows.extend(batch)
+            if on_rows is not None:
+                on_rows(len(batch))
+        return Dataset(rows)
+
+    # Skip server-side cache when user key is used (avoids cross-user leakage)
+    if is_user_key:
+        return await _generate_dataset(provider, data_request, on_rows)
+
+    key = _request_cache_key(provider_name, data_request)
+    wanted = _requested_rows(data_request)
+    dataset = _cached_rows(key, wanted)
+    if dataset is not None:
+        if on_rows is not None:
+            on_rows(len(dataset.rows))
+        return dataset
+
+    async def _fetch() -> Dataset:
+        result = await _generate_dataset(provider, data_request, on_rows)
+        _response_cache.set(key, result)
+        return result
+
+    return await _singleflight(f"{key}:{wanted}", _fetch)
+
+
+def _spec_rows(data_request: DataRequest) -> int:
+    rows = _requested_rows(data_request) or settings.spec_default_rows
+    return min(rows, settings.spec_max_rows)
+
+
+def _over_inline_limit(data_request: DataRequest) -> bool:
+    return (
+        data_request.mode == "spec"
+        and _spec_rows(data_request) > settings.spec_max_inline_rows
+    )
+
+
+def _inline_rows_error(data_request: DataRequest) -> Optional[str]:
+    """Why ``data_request`` cannot be answered in one response body, if it can't.
+
+    A spec response is built and rendered in memory, so beyond
+    ``spec_max_inline_rows`` the client must stream it, or save it and read
+    it back through ``/datasets``.
+    """
+    if data_request.stream or data_request.save:
         return None
-    depth = 0
-    in_string = False
-    escape = False
-    for i in range(start, len(content)):
-        ch = content[i]
-        if escape:
-            escape = False
-            continue
-        if ch == "\\":
-            escape = True
-            continue
-        if ch == '"':
-            in_string = not in_string
-            continue
-        if in_string:
-            continue
-        if ch == open_ch:
-            depth += 1
-        elif ch == close_ch:
-            depth -= 1
-            if depth == 0:
-                return content[start : i + 1]
-    return None
-
-
-def extract_json(content: str) -> List[dict]:
+    if not _over_inline_limit(data_request):
+        return None
+    return (
+        f"spec responses above {settings.spec_max_inline_rows} rows"
+        " must use stream or save"
+    )
+
+
+async def _cached_spec(
+    provider_name: str,
+    provider: LLMProvider,
+    is_user_key: bool,
+    data_request: DataRequest,
+) -> List[dict]:
+    """Return the column spec for the request's prompt, asking the provider once.
+
+    Only the spec is cached; rows are cheap to regenerate locally, and a
+    million-row result would crowd everything else out of the cache.
+    """
+    from specgen import dump_spec, load_spec, parse_spec
+
+    if is_user_key:
+        return parse_spec(await provider.generate_spec(data_request.prompt))
+
+    key = _cache_key(provider_name, data_request.prompt, mode="spec")
+    cached = _response_cache.get(key)
+    if cached is not None:
+        logger.info("spec cache hit", extra={"cache_key": key[:12]})
+        return load_spec(cached.rows)
+
+    async def _fetch() -> List[dict]:
+        columns = parse_spec(await provider.generate_spec(data_request.prompt))
+        _response_cache.set(key, Dataset(dump_spec(columns)))
+        return columns
+
+    return await _singleflight(key, _fetch)
+
+
+def _error_status(exc: Exception) -> tuple[int, str]:
+    """Map a generation failure to the (status, detail) /generate-data returns."""
+    if isinstance(exc, HTTPException):
+        return exc.status_code, exc.detail
+    if isinstance(exc, ValueError):
+        return 502, str(exc)
+    return 502, "Failed to generate synthetic data"
+
+
+async def _iter_batch(items: list[tuple]) -> AsyncIterator[bytes]:
+    """Run batch items concurrently and yield one NDJSON line per finished item.
+
+    Items sharing a provider are capped at ``batch_concurrency`` at a time,
+    so one batch cannot monopolize a vendor. Each line is the item's cached
+    response envelope with ``index`` and ``status`` spliced in front, so no
+    result is re-encoded. Items still running when the client disconnects
+    are cancelled.
+    """
+    semaphores: dict[str, asyncio.Semaphore] = {}
+
+    async def run(idx, item, provider_name, provider, is_user_key) -> bytes:
+        semaphore = semaphores.setdefault(
+            provider_name, asyncio.Semaphore(settings.batch_concurrency)
+        )
+        try:
+            async with semaphore:
+                dataset = await _cached_dataset(
+                    provider_name, provider, is_user_key, item
+                )
+        except Exception as exc:
+            if not isinstance(exc, (HTTPException, ValueError)):
+                logger.exception("Batch item failed", extra={"index": idx})
+            status, detail = _error_status(exc)
+            line = {"index": idx, "status": status, "detail": detail}
+            return json.dumps(line).encode()
+        head = f'{{"index":{idx},"status":200,'.encode()
+        return head + dataset.body(item.format)[1:]
+
+    tasks = [asyncio.ensure_future(run(*entry)) for entry in items]
     try:
-        parsed = json.loads(content)
-    except json.JSONDecodeError:
-        balanced = _find_balanced(content, "[", "]")
-        if balanced:
-            parsed = json.loads(balanced)
-        else:
-            balanced = _find_balanced(content, "{", "}")
-            if not balanced:
-                raise ValueError("Response did not contain valid JSON")
-            parsed = json.loads(balanced)
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done + b"\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+# ---------------------------------------------------------------------------
+# Streaming helpers
+# ---------------------------------------------------------------------------
+async def _iter_spec_rows(
+    provider_name: str,
+    provider: LLMProvider,
+    is_user_key: bool,
+    data_request: DataRequest,
+) -> AsyncIterator[dict]:
+    """Yield spec-mode rows batch by batch as the local generator draws them."""
+    columns = await _cached_spec(provider_name, provider, is_user_key, data_request)
+    async for batch in _spec_batches(columns, data_request):
+        for row in batch:
+            yield row
 
-    if isinstance(parsed, dict) and "rows" in parsed:
-        rows = parsed["rows"]
+
+async def _spec_batches(
+    columns: List[dict], data_request: DataRequest
+) -> AsyncIterator[List[dict]]:
+    """Draw spec-mode rows a batch at a time in a worker thread."""
+    from specgen import generate_batches
+
+    batches = generate_batches(columns, _spec_rows(data_request), data_request.seed)
+    while True:
+        batch = await asyncio.to_thread(next, batches, None)
+        if batch is None:
+            return
+        yield batch
+
+
+async def _iter_rows(
+    provider: LLMProvider,
+    prompt: str,
+    cache_key: str | None,
+    wanted: Optional[int] = None,
+    validator: Optional[RowValidator] = None,
+    summary: Optional[dict] = None,
+) -> AsyncIterator[dict]:
+    """Yield rows as soon as the provider's stream closes each one.
+
+    ``prompt`` is the base prompt. A ``wanted`` row count is streamed as
+    ``chunk_rows``-sized calls one after another, each with an output cap
+    sized to its rows. A stream that ends before its rows array closes
+    (usually cut off at the cap) raises ``ValueError``, so the client sees
+    an error instead of a short result that looks complete.
+
+    With a cache key, a large enough cached dataset is replayed and a fully
+    streamed result is stored for later requests. With a ``validator`` each
+    row is checked as it closes, invalid rows are skipped and counted in
+    ``summary["rows_rejected"]``, and up to ``validation_max_topups`` further
+    calls stream just the missing rows.
+    """
+    if cache_key is not None:
+        cached = _cached_rows(cache_key, wanted)
+        if cached is not None:
+            if summary is not None:
+                summary["rows_rejected"] = cached.rejected
+            for row in cached.rows:
+                yield row
+            return
+
+    if wanted is None:
+        calls = [(prompt, None)]
     else:
-        rows = parsed
+        calls = [
+            (part, _token_budget.tokens(n))
+            for part, n in chunk_prompts(prompt, wanted, settings.chunk_rows)
+        ]
+    collected: List[dict] = []
+    rejected = 0
 
-    if not isinstance(rows, list):
-        raise ValueError("Response JSON must include an array of rows")
+    async def stream_rows(part: str, max_tokens: Optional[int]):
+        nonlocal rejected
+        parser = RowStreamParser()
+        async for chunk in provider.stream(part, max_tokens):
+            for row in parser.feed(chunk):
+                if validator is not None:
+                    row = validator.coerce(row)
+                    if row is None:
+                        rejected += 1
+                        if summary is not None:
+                            summary["rows_rejected"] = rejected
+                        continue
+                yield row
+        parser.close()
+        if not parser.done:
+            raise ValueError("Stream ended before all rows were generated")
 
-    for idx, row in enumerate(rows):
-        if not isinstance(row, dict):
-            raise ValueError(f"Row {idx} must be an object")
+    yielded = 0
+    for part, max_tokens in calls:
+        async for row in stream_rows(part, max_tokens):
+            yielded += 1
+            if cache_key is not None:
+                collected.append(row)
+            yield row
+    if validator is not None and wanted is not None:
+        for _ in range(settings.validation_max_topups):
+            missing = wanted - yielded
+            if missing <= 0:
+                break
+            top_up = stream_rows(
+                rows_prompt(prompt, missing), _token_budget.tokens(missing)
+            )
+            async for row in top_up:
+                if yielded < wanted:
+                    yielded += 1
+                    if cache_key is not None:
+                        collected.append(row)
+                    yield row
+    if cache_key is not None:
+        _response_cache.set(cache_key, Dataset(collected, rejected, wanted))
 
-    return rows
+
+async def _encode_row_stream(
+    rows: AsyncIterator[dict], fmt: str, sse: bool, summary: Optional[dict] = None
+) -> AsyncIterator[str]:
+    """Encode streamed rows as CSV lines, SSE events or NDJSON.
+
+    A ``summary`` filled in while the rows flow is sent once they are done:
+    as the data of the SSE ``done`` event, or as a final NDJSON object.
+    The status line is already sent by the time rows flow, so failures are
+    reported in-band (an ``error`` event / object) rather than as a 502.
+    CSV has no in-band error form, so a CSV failure is re-raised to abort the
+    response and the client sees a truncated body instead of a clean end.
+    CSV columns are fixed by the first row; later keys outside them are dropped.
+    """
+    try:
+        if fmt == "csv":
+            columns = None
+            async for row in rows:
+                if columns is None:
+                    columns = list(row)
+                    yield csv_line(columns)
+                yield csv_line([row.get(c) for c in columns])
+            return
+
+        async for row in rows:
+            line = json.dumps(row, ensure_ascii=False)
+            yield f"data: {line}\n\n" if sse else f"{line}\n"
+        if sse:
+            yield f"event: done\ndata: {json.dumps(summary or {})}\n\n"
+        elif summary is not None:
+            yield json.dumps(summary) + "\n"
+    except Exception as exc:
+        logger.exception("Streaming generation failed")
+        if fmt == "csv":
+            raise
+        detail = str(exc) if isinstance(exc, ValueError) else "Stream interrupted"
+        if sse:
+            yield f"event: error\ndata: {json.dumps({'detail': detail})}\n\n"
+        else:
+            yield json.dumps({"error": detail}) + "\n"
@@ -0,0 +1,186 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+_LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+_FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+_SIZE_BUCKETS = tuple(2**n for n in range(8, 28, 2))
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time to answer an HTTP request, including streamed bodies",
+    ["method", "route", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+HTTP_RESPONSE_BYTES = Histogram(
+    "http_response_size_bytes",
+    "Bytes sent in the response body",
+    ["route"],
+    buckets=_SIZE_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests currently being handled",
+    multiprocess_mode="livesum",
+)
+PROVIDER_CALL_SECONDS = Histogram(
+    "provider_call_duration_seconds",
+    "Latency of a single provider API attempt",
+    ["provider", "outcome"],
+    buckets=_LATENCY_BUCKETS,
+)
+PROVIDER_IN_FLIGHT = Gauge(
+    "provider_calls_in_flight",
+    "Provider API attempts currently awaiting a response",
+    ["provider"],
+    multiprocess_mode="livesum",
+)
+PROVIDER_RETRIES = Counter(
+    "provider_retries_total",
+    "Provider calls retried by the tenacity policy",
+    ["provider"],
+)
+PARSE_SECONDS = Histogram(
+    "extract_json_duration_seconds",
+    "Time to extract rows from a completion",
+    buckets=_FAST_BUCKETS,
+)
+SERIALIZE_SECONDS = Histogram(
+    "serialize_duration_seconds",
+    "Time to render a dataset body",
+    ["format"],
+    buckets=_FAST_BUCKETS,
+)
+PROVIDER_TOKENS = Counter(
+    "provider_tokens_total",
+    "Tokens reported by provider APIs; cache_read is input served from the"
+    " vendor's prompt cache",
+    ["provider", "kind"],
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "admission_wait_seconds",
+    "Time admitted requests spent queued for rate-limit tokens",
+    buckets=(0.001, 0.01, 0.1, 0.5, 1, 2, 5, 10, 30),
+)
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total",
+    "Requests rejected with 429 by the rate limiter",
+)
+CACHE_LOOKUPS = Counter(
+    "response_cache_lookups_total",
+    "Response cache lookups",
+    ["backend", "result"],
+)
+CACHE_EVICTIONS = Counter(
+    "response_cache_evictions_total",
+    "Entries evicted from the response cache",
+    ["backend"],
+)
+
+
+@contextmanager
+def provider_call(provider: str) -> Iterator[None]:
+    """Time one provider attempt and track it as in flight."""
+    gauge = PROVIDER_IN_FLIGHT.labels(provider)
+    gauge.inc()
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        gauge.dec()
+        PROVIDER_CALL_SECONDS.labels(provider, outcome).observe(
+            time.perf_counter() - start
+        )
+
+
+def record_usage(
+    provider: str,
+    input_tokens: Optional[int] = None,
+    output_tokens: Optional[int] = None,
+    cache_read: Optional[int] = None,
+    cache_write: Optional[int] = None,
+) -> None:
+    """Count one response's token usage; missing (None) fields are skipped."""
+    usage = {
+        "input": input_tokens,
+        "output": output_tokens,
+        "cache_read": cache_read,
+        "cache_write": cache_write,
+    }
+    for kind, tokens in usage.items():
+        if tokens:
+            PROVIDER_TOKENS.labels(provider, kind).inc(tokens)
+
+
+def record_retry(retry_state) -> None:
+    """tenacity ``before_sleep`` hook: count a retry for the provider method."""
+    provider = retry_state.args[0] if retry_state.args else None
+    PROVIDER_RETRIES.labels(getattr(provider, "name", "unknown")).inc()
+
+
+def render() -> tuple[bytes, str]:
+    """Return the exposition body and content type for ``/metrics``.
+
+    With ``PROMETHEUS_MULTIPROC_DIR`` set (required under several uvicorn
+    workers), samples every worker wrote to that directory are aggregated,
+    so any worker can answer the scrape.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status, size and in-flight requests.
+
+    Timing stops when the last body chunk is sent, so streamed responses are
+    measured end to end. Routes are labelled by their path template (e.g.
+    ``/jobs/{job_id}``) to keep label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            HTTP_REQUEST_SECONDS.labels(scope["method"], path, str(status)).observe(
+                time.perf_counter() - start
+            )
+            HTTP_RESPONSE_BYTES.labels(path).observe(size)
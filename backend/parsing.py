@@ -0,0 +1,217 @@
+import json
+import re
+from typing import List
+
+try:  # optional fast path for the common well-formed response
+    import orjson
+except ImportError:
+    orjson = None
+
+# Start of the rows array: either the `rows` key of the schema object or a
+# bare top-level array.
+_ROWS_START = re.compile(r'"rows"\s*:\s*\[|^\s*(?:```(?:json)?\s*)?\[')
+# Characters that can change nesting outside / inside a string literal.
+_STRUCTURAL = re.compile(r'[\[\]{}"]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+# Candidate starts of a JSON value embedded in prose (extract_json).
+_CANDIDATE = re.compile(r"[\[{]")
+_decoder = json.JSONDecoder()
+
+
+class RowStreamParser:
+    """Incrementally extract row objects from a streamed ``{"rows": [...]}``.
+
+    Feed completion text as it arrives; each call returns the rows whose
+    closing brace has been seen. Only the unfinished tail is buffered, so
+    memory stays proportional to one row rather than the whole response.
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._row_start = -1
+        self.done = False
+        self.rows_emitted = 0
+
+    def feed(self, chunk: str) -> List[dict]:
+        if self.done:
+            return []
+        self._buf += chunk
+        if not self._started:
+            match = _ROWS_START.search(self._buf)
+            if match is None:
+                return []
+            self._started = True
+            self._pos = match.end()
+        rows = self._scan()
+        self._compact()
+        return rows
+
+    def close(self) -> None:
+        """Signal end of input; raise if the rows array never started."""
+        if not self._started:
+            raise ValueError("Response did not contain valid JSON")
+
+    def _scan(self) -> List[dict]:
+        rows = []
+        buf = self._buf
+        pos = self._pos
+        while pos < len(buf):
+            if self._in_string:
+                match = _STRING_SPECIAL.search(buf, pos)
+                if match is None:
+                    pos = len(buf)
+                    break
+                if match.group() == "\\":
+                    pos = match.end() + 1  # skip the escaped character
+                else:
+                    self._in_string = False
+                    pos = match.end()
+                continue
+
+            match = _STRUCTURAL.search(buf, pos)
+            if match is None:
+                pos = len(buf)
+                break
+            ch = match.group()
+            pos = match.end()
+            if ch == '"':
+                self._in_string = True
+            elif ch in "[{":
+                if self._depth == 0 and ch == "{":
+                    self._row_start = match.start()
+                self._depth += 1
+            elif self._depth == 0:
+                # Closing bracket of the rows array itself.
+                self.done = True
+                break
+            else:
+                self._depth -= 1
+                if self._depth == 0 and self._row_start >= 0:
+                    row = json.loads(buf[self._row_start : pos])
+                    self._row_start = -1
+                    if isinstance(row, dict):
+                        rows.append(row)
+        self._pos = pos
+        self.rows_emitted += len(rows)
+        return rows
+
+    def _compact(self) -> None:
+        # Drop everything before the current row (or scan position) so the
+        # buffer only ever holds the row being assembled.
+        cut = (
+            self._row_start if self._row_start >= 0 else min(self._pos, len(self._buf))
+        )
+        if cut > 0:
+            self._buf = self._buf[cut:]
+            self._pos -= cut
+            if self._row_start >= 0:
+                self._row_start -= cut
+
+
+def _loads(text: str):
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def _strip_fence(content: str) -> str:
+    """Remove a markdown code fence wrapping the whole response, if any."""
+    stripped = content.strip()
+    if not (stripped.startswith("```") and stripped.endswith("```")):
+        return content
+    first_newline = stripped.find("\n")
+    if first_newline == -1:
+        return content
+    return stripped[first_newline + 1 : -3]
+
+
+def _scan_json(content: str):
+    """Decode the best JSON value embedded in ``content`` in one pass.
+
+    Every ``[``/``{`` is a candidate start; ``raw_decode`` parses from that
+    offset without slicing, and fails fast on prose brackets. The first array
+    wins; otherwise the first object (a ``{"rows": [...]}`` object wins
+    immediately). Returns None when nothing decodes.
+    """
+    fallback = None
+    for match in _CANDIDATE.finditer(content):
+        is_object = match.group() == "{"
+        if is_object and fallback is not None:
+            continue
+        try:
+            value, _ = _decoder.raw_decode(content, match.start())
+        except json.JSONDecodeError:
+            continue
+        if not is_object:
+            return value
+        if isinstance(value.get("rows"), list):
+            return value
+        fallback = value
+    return fallback
+
+
+def extract_object(content: str) -> dict:
+    """Decode the JSON object in ``content``, tolerating fences and prose."""
+    content = _strip_fence(content)
+    try:
+        parsed = _loads(content)
+    except ValueError:
+        parsed = None
+        start = content.find("{")
+        while start != -1:
+            try:
+                parsed, _ = _decoder.raw_decode(content, start)
+                break
+            except json.JSONDecodeError:
+                start = content.find("{", start + 1)
+    if not isinstance(parsed, dict):
+        raise ValueError("Response did not contain a JSON object")
+    return parsed
+
+
+def salvage_rows(content: str) -> List[dict]:
+    """Return the rows that closed before a completion was cut off."""
+    parser = RowStreamParser()
+    rows = parser.feed(_strip_fence(content))
+    parser.close()
+    return rows
+
+
+def extract_array(content: str) -> list:
+    """Return the rows array in ``content`` without checking its items.
+
+    A completion flagged ``truncated`` (see ``providers.Completion``) is
+    salvaged: the complete rows before the cut are kept.
+    """
+    if getattr(content, "truncated", False):
+        return salvage_rows(content)
+    content = _strip_fence(content)
+    try:
+        parsed = _loads(content)
+    except ValueError:
+        parsed = _scan_json(content)
+        if parsed is None:
+            raise ValueError("Response did not contain valid JSON")
+
+    if isinstance(parsed, dict) and "rows" in parsed:
+        rows = parsed["rows"]
+    else:
+        rows = parsed
+
+    if not isinstance(rows, list):
+        raise ValueError("Response JSON must include an array of rows")
+    return rows
+
+
+def extract_json(content: str) -> List[dict]:
+    rows = extract_array(content)
+    for idx, row in enumerate(rows):
+        if not isinstance(row, dict):
+            raise ValueError(f"Row {idx} must be an object")
+
+    return rows
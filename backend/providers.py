@@ -1,10 +1,19 @@
 import abc
+import asyncio
+import contextlib
+import hashlib
 import json
 import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, NamedTuple, Optional
 
 from fastapi import HTTPException
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
 
+import metrics
+
 logger = logging.getLogger(__name__)
 
 SYSTEM_PROMPT = (
@@ -35,14 +44,197 @@ DATASET_SCHEMA = {
     "additionalProperties": False,
 }
 
+SPEC_SYSTEM_PROMPT = (
+    "You are a service that designs synthetic tabular datasets. "
+    "Do not write any rows. Describe each column of the requested dataset "
+    "in the `columns` array: its type, value range, allowed values with "
+    "weights, distribution, and a pattern or faker kind for strings. "
+    "Set fields that do not apply to null."
+)
+
+
+def _nullable(schema: dict) -> dict:
+    return {"anyOf": [schema, {"type": "null"}]}
+
+
+# Per-column parameters understood by specgen. Every key is required and
+# nullable so the schema also works with OpenAI's strict structured output.
+COLUMN_SPEC_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "type": {
+            "type": "string",
+            "enum": [
+                "integer",
+                "number",
+                "boolean",
+                "category",
+                "date",
+                "datetime",
+                "string",
+            ],
+        },
+        "min": _nullable({"type": ["number", "string"]}),
+        "max": _nullable({"type": ["number", "string"]}),
+        "distribution": _nullable(
+            {"type": "string", "enum": ["uniform", "normal", "lognormal"]}
+        ),
+        "mean": _nullable({"type": "number"}),
+        "std": _nullable({"type": "number"}),
+        "decimals": _nullable({"type": "integer"}),
+        "values": _nullable(
+            {"type": "array", "items": {"type": ["string", "number", "boolean"]}}
+        ),
+        "weights": _nullable({"type": "array", "items": {"type": "number"}}),
+        "pattern": _nullable({"type": "string"}),
+        "faker": _nullable(
+            {
+                "type": "string",
+                "enum": [
+                    "first_name",
+                    "last_name",
+                    "name",
+                    "email",
+                    "phone",
+                    "city",
+                    "country",
+                    "company",
+                    "word",
+                    "uuid",
+                ],
+            }
+        ),
+        "unique": _nullable({"type": "boolean"}),
+        "null_fraction": _nullable({"type": "number"}),
+    },
+    "additionalProperties": False,
+}
+COLUMN_SPEC_SCHEMA["required"] = list(COLUMN_SPEC_SCHEMA["properties"])
+
+SPEC_SCHEMA = {
+    "type": "object",
+    "properties": {"columns": {"type": "array", "items": COLUMN_SPEC_SCHEMA}},
+    "required": ["columns"],
+    "additionalProperties": False,
+}
+
+
+class OutputSchema(NamedTuple):
+    """System prompt and JSON schema for one kind of structured completion."""
+
+    name: str
+    system: str
+    schema: dict
+
+
+DATASET_OUTPUT = OutputSchema("synthetic_dataset", SYSTEM_PROMPT, DATASET_SCHEMA)
+SPEC_OUTPUT = OutputSchema("column_spec", SPEC_SYSTEM_PROMPT, SPEC_SCHEMA)
+_OUTPUTS = (DATASET_OUTPUT, SPEC_OUTPUT)
+
+# Output cap when the caller does not size one (Anthropic requires a value).
+DEFAULT_MAX_TOKENS = 4096
+
+
+class Completion(str):
+    """Completion text that also records whether the model hit its token cap.
+
+    A truncated completion usually ends mid-row; ``extract_json`` then keeps
+    the rows that closed before the cut instead of failing.
+    """
+
+    truncated: bool = False
+
+    def __new__(cls, text: str, truncated: bool = False):
+        completion = super().__new__(cls, text)
+        completion.truncated = truncated
+        return completion
+
 
 class LLMProvider(abc.ABC):
     @abc.abstractmethod
-    async def generate(self, prompt: str) -> str: ...
+    async def generate(self, prompt: str, max_tokens: Optional[int] = None) -> str:
+        """Return the dataset completion for ``prompt``.
+
+        ``max_tokens`` caps the output; when the cap cuts the completion
+        short the result is a ``Completion`` with ``truncated`` set.
+        """
 
     @abc.abstractmethod
     async def health_check(self) -> bool: ...
 
+    async def stream(
+        self, prompt: str, max_tokens: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        """Yield the completion text as it is produced.
+
+        Providers override this with their SDK's streaming API; the default
+        yields the whole completion at once. Streams are not retried, since
+        text may already have been forwarded to the client. ``max_tokens``
+        caps the output as for ``generate``.
+        """
+        yield await self.generate(prompt, max_tokens)
+
+    @abc.abstractmethod
+    async def generate_spec(self, prompt: str) -> str:
+        """Return a JSON column specification (``SPEC_SCHEMA``) for ``prompt``."""
+
+    async def aclose(self) -> None:
+        """Release the SDK client's connection pool."""
+
+    def is_transient_error(self, exc: BaseException) -> bool:
+        """Whether ``exc`` signals an upstream outage (timeouts, 5xx)."""
+        return isinstance(exc, (TimeoutError, ConnectionError))
+
+
+class LazyProvider(LLMProvider):
+    """Build the wrapped provider, and import its SDK, on first use.
+
+    Vendor SDKs take up to seconds to import, so building every configured
+    provider at import time delays each worker's start-up. ``load`` can be
+    called ahead of time from a warm-up task.
+    """
+
+    def __init__(self, factory: Callable[[], LLMProvider]):
+        self._factory = factory
+        self._provider: Optional[LLMProvider] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._provider is not None
+
+    def load(self) -> LLMProvider:
+        if self._provider is None:
+            with self._lock:
+                if self._provider is None:
+                    self._provider = self._factory()
+        return self._provider
+
+    async def generate(self, prompt: str, max_tokens: Optional[int] = None) -> str:
+        return await self.load().generate(prompt, max_tokens)
+
+    async def generate_spec(self, prompt: str) -> str:
+        return await self.load().generate_spec(prompt)
+
+    async def stream(
+        self, prompt: str, max_tokens: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        async for chunk in self.load().stream(prompt, max_tokens):
+            yield chunk
+
+    async def health_check(self) -> bool:
+        return await self.load().health_check()
+
+    async def aclose(self) -> None:
+        if self._provider is not None:
+            await self._provider.aclose()
+
+    def is_transient_error(self, exc: BaseException) -> bool:
+        if self._provider is None:
+            return super().is_transient_error(exc)
+        return self._provider.is_transient_error(exc)
+
 
 # ---------------------------------------------------------------------------
 # OpenAI
@@ -58,43 +250,106 @@ def _is_openai_retryable(exc):
 
 
 class OpenAIProvider(LLMProvider):
+    name = "openai"
+
     def __init__(self, api_key: str, model: str):
         from openai import AsyncOpenAI, Timeout
 
         self._client = AsyncOpenAI(api_key=api_key, timeout=Timeout(timeout=25.0))
         self._model = model
+        # Built once; the system text leads every input so OpenAI's automatic
+        # prompt caching can reuse the shared prefix.
+        self._inputs = {
+            output.name: f"{output.system}\n\nUser prompt: " for output in _OUTPUTS
+        }
+        self._formats = {
+            output.name: {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": output.name,
+                    "schema": output.schema,
+                    "strict": True,
+                },
+            }
+            for output in _OUTPUTS
+        }
 
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=1, max=8),
         retry=retry_if_exception(_is_openai_retryable),
         reraise=True,
+        before_sleep=metrics.record_retry,
     )
-    async def generate(self, prompt: str) -> str:
-        response = await self._client.responses.create(
-            model=self._model,
-            input=f"{SYSTEM_PROMPT}\n\nUser prompt: {prompt}",
-            response_format={
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "synthetic_dataset",
-                    "schema": DATASET_SCHEMA,
-                    "strict": True,
-                },
-            },
-            temperature=0.4,
-        )
+    async def _complete(
+        self, prompt: str, output: OutputSchema, max_tokens: Optional[int] = None
+    ) -> str:
+        with metrics.provider_call(self.name):
+            response = await self._client.responses.create(
+                **self._request_kwargs(prompt, output, max_tokens)
+            )
+        self._record_usage(response.usage)
+        details = getattr(response, "incomplete_details", None)
+        truncated = getattr(details, "reason", None) == "max_output_tokens"
         try:
-            return response.output[0].content[0].text
+            return Completion(response.output[0].content[0].text, truncated)
         except (AttributeError, IndexError) as exc:
             raise HTTPException(
                 status_code=502, detail="Malformed response from OpenAI"
             ) from exc
 
+    async def generate(self, prompt: str, max_tokens: Optional[int] = None) -> str:
+        return await self._complete(prompt, DATASET_OUTPUT, max_tokens)
+
+    async def generate_spec(self, prompt: str) -> str:
+        return await self._complete(prompt, SPEC_OUTPUT)
+
+    async def stream(
+        self, prompt: str, max_tokens: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        events = await self._client.responses.create(
+            **self._request_kwargs(prompt, DATASET_OUTPUT, max_tokens), stream=True
+        )
+        async for event in events:
+            if event.type == "response.output_text.delta":
+                yield event.delta
+            elif event.type == "response.completed":
+                self._record_usage(event.response.usage)
+
+    def _request_kwargs(
+        self, prompt: str, output: OutputSchema, max_tokens: Optional[int] = None
+    ) -> dict:
+        kwargs = dict(
+            model=self._model,
+            input=self._inputs[output.name] + prompt,
+            response_format=self._formats[output.name],
+            temperature=0.4,
+        )
+        if max_tokens is not None:
+            kwargs["max_output_tokens"] = max_tokens
+        return kwargs
+
+    def _record_usage(self, usage) -> None:
+        if usage is None:
+            return
+        details = getattr(usage, "input_tokens_details", None)
+        metrics.record_usage(
+            self.name,
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            cache_read=getattr(details, "cached_tokens", None),
+        )
+
     async def health_check(self) -> bool:
         await self._client.models.list()
         return True
 
+    async def aclose(self) -> None:
+        await self._client.close()
+
+    def is_transient_error(self, exc: BaseException) -> bool:
+        return _is_openai_retryable(exc)
+
 
 # ---------------------------------------------------------------------------
 # Anthropic
@@ -110,39 +365,94 @@ def _is_anthropic_retryable(exc):
 
 
 class AnthropicProvider(LLMProvider):
+    name = "anthropic"
+
     def __init__(self, api_key: str, model: str):
         from anthropic import AsyncAnthropic
 
         self._client = AsyncAnthropic(api_key=api_key, timeout=25.0)
         self._model = model
+        # Built once and marked as a prompt-cache breakpoint. The dataset
+        # preamble (about 200 tokens) is below Anthropic's caching minimum, so
+        # only the longer spec preamble can be cached today.
+        self._system = {
+            output.name: [
+                {
+                    "type": "text",
+                    "text": (
+                        f"{output.system}\n\n"
+                        "You MUST respond with ONLY a valid JSON object"
+                        " matching this schema:\n"
+                        f"{json.dumps(output.schema, indent=2)}\n"
+                        "Do not include any other text, markdown, or explanation."
+                    ),
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ]
+            for output in _OUTPUTS
+        }
 
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=1, max=8),
         retry=retry_if_exception(_is_anthropic_retryable),
         reraise=True,
+        before_sleep=metrics.record_retry,
     )
-    async def generate(self, prompt: str) -> str:
-        schema_str = json.dumps(DATASET_SCHEMA, indent=2)
-        response = await self._client.messages.create(
-            model=self._model,
-            max_tokens=4096,
-            system=(
-                f"{SYSTEM_PROMPT}\n\n"
-                "You MUST respond with ONLY a valid JSON object"
-                f" matching this schema:\n{schema_str}\n"
-                "Do not include any other text, markdown, or explanation."
-            ),
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.4,
-        )
+    async def _complete(
+        self, prompt: str, output: OutputSchema, max_tokens: Optional[int] = None
+    ) -> str:
+        with metrics.provider_call(self.name):
+            response = await self._client.messages.create(
+                **self._request_kwargs(prompt, output, max_tokens)
+            )
+        self._record_usage(response.usage)
+        truncated = getattr(response, "stop_reason", None) == "max_tokens"
         try:
-            return response.content[0].text
+            return Completion(response.content[0].text, truncated)
         except (AttributeError, IndexError) as exc:
             raise HTTPException(
                 status_code=502, detail="Malformed response from Anthropic"
             ) from exc
 
+    async def generate(self, prompt: str, max_tokens: Optional[int] = None) -> str:
+        return await self._complete(prompt, DATASET_OUTPUT, max_tokens)
+
+    async def generate_spec(self, prompt: str) -> str:
+        return await self._complete(prompt, SPEC_OUTPUT)
+
+    async def stream(
+        self, prompt: str, max_tokens: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        async with self._client.messages.stream(
+            **self._request_kwargs(prompt, DATASET_OUTPUT, max_tokens)
+        ) as s:
+            async for text in s.text_stream:
+                yield text
+            self._record_usage((await s.get_final_message()).usage)
+
+    def _request_kwargs(
+        self, prompt: str, output: OutputSchema, max_tokens: Optional[int] = None
+    ) -> dict:
+        return dict(
+            model=self._model,
+            max_tokens=max_tokens or DEFAULT_MAX_TOKENS,
+            system=self._system[output.name],
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.4,
+        )
+
+    def _record_usage(self, usage) -> None:
+        if usage is None:
+            return
+        metrics.record_usage(
+            self.name,
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            cache_read=getattr(usage, "cache_read_input_tokens", None),
+            cache_write=getattr(usage, "cache_creation_input_tokens", None),
+        )
+
     async def health_check(self) -> bool:
         # Anthropic doesn't have a lightweight list endpoint; send a minimal request
         await self._client.messages.create(
@@ -152,6 +462,12 @@ class AnthropicProvider(LLMProvider):
         )
         return True
 
+    async def aclose(self) -> None:
+        await self._client.close()
+
+    def is_transient_error(self, exc: BaseException) -> bool:
+        return _is_anthropic_retryable(exc)
+
 
 # ---------------------------------------------------------------------------
 # Google Gemini
@@ -171,41 +487,213 @@ def _is_google_retryable(exc):
 
 
 class GoogleProvider(LLMProvider):
+    name = "google"
+
     def __init__(self, api_key: str, model: str):
         from google import genai
+        from google.genai import types
 
         self._client = genai.Client(api_key=api_key)
         self._model = model
+        # The schema preamble goes in the system instruction, built once, so
+        # every request shares the same prefix for Gemini's implicit caching.
+        self._configs = {
+            output.name: types.GenerateContentConfig(
+                system_instruction=(
+                    f"{output.system}\n\n"
+                    "Respond with a JSON object matching this schema:\n"
+                    f"{json.dumps(output.schema, indent=2)}"
+                ),
+                response_mime_type="application/json",
+                temperature=0.4,
+            )
+            for output in _OUTPUTS
+        }
 
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=1, max=8),
         retry=retry_if_exception(_is_google_retryable),
         reraise=True,
+        before_sleep=metrics.record_retry,
     )
-    async def generate(self, prompt: str) -> str:
-        from google.genai import types
-
-        schema_str = json.dumps(DATASET_SCHEMA, indent=2)
-        response = await self._client.aio.models.generate_content(
-            model=self._model,
-            contents=(
-                f"{SYSTEM_PROMPT}\n\n"
-                f"Respond with a JSON object matching this schema:\n{schema_str}\n\n"
-                f"User prompt: {prompt}"
-            ),
-            config=types.GenerateContentConfig(
-                response_mime_type="application/json",
-                temperature=0.4,
-            ),
-        )
+    async def _complete(
+        self, prompt: str, output: OutputSchema, max_tokens: Optional[int] = None
+    ) -> str:
+        with metrics.provider_call(self.name):
+            response = await self._client.aio.models.generate_content(
+                **self._request_kwargs(prompt, output, max_tokens)
+            )
+        self._record_usage(response.usage_metadata)
+        try:
+            candidate = response.candidates[0]
+        except (AttributeError, IndexError, TypeError):
+            candidate = None
+        reason = getattr(candidate, "finish_reason", None)
+        truncated = getattr(reason, "name", reason) == "MAX_TOKENS"
         try:
-            return response.text
+            return Completion(response.text, truncated)
         except (AttributeError, IndexError) as exc:
             raise HTTPException(
                 status_code=502, detail="Malformed response from Google"
             ) from exc
 
+    async def generate(self, prompt: str, max_tokens: Optional[int] = None) -> str:
+        return await self._complete(prompt, DATASET_OUTPUT, max_tokens)
+
+    async def generate_spec(self, prompt: str) -> str:
+        return await self._complete(prompt, SPEC_OUTPUT)
+
+    async def stream(
+        self, prompt: str, max_tokens: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        chunks = await self._client.aio.models.generate_content_stream(
+            **self._request_kwargs(prompt, DATASET_OUTPUT, max_tokens)
+        )
+        usage = None
+        async for chunk in chunks:
+            usage = chunk.usage_metadata or usage
+            if chunk.text:
+                yield chunk.text
+        self._record_usage(usage)
+
+    def _request_kwargs(
+        self, prompt: str, output: OutputSchema, max_tokens: Optional[int] = None
+    ) -> dict:
+        config = self._configs[output.name]
+        if max_tokens is not None:
+            config = config.model_copy(update={"max_output_tokens": max_tokens})
+        return dict(model=self._model, contents=prompt, config=config)
+
+    def _record_usage(self, usage) -> None:
+        if usage is None:
+            return
+        metrics.record_usage(
+            self.name,
+            input_tokens=usage.prompt_token_count,
+            output_tokens=usage.candidates_token_count,
+            cache_read=usage.cached_content_token_count,
+        )
+
     async def health_check(self) -> bool:
         await self._client.aio.models.get(model=self._model)
         return True
+
+    async def aclose(self) -> None:
+        await self._client.aio.aclose()
+
+    def is_transient_error(self, exc: BaseException) -> bool:
+        return _is_google_retryable(exc)
+
+
+# ---------------------------------------------------------------------------
+# Pool of user-key (BYOK) providers
+# ---------------------------------------------------------------------------
+class PooledProvider(LLMProvider):
+    """A pooled provider that tracks the calls currently running on it."""
+
+    def __init__(self, provider: LLMProvider):
+        self._provider = provider
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+
+    @contextlib.contextmanager
+    def _lease(self):
+        self.in_flight += 1
+        try:
+            yield self._provider
+        finally:
+            self.in_flight -= 1
+            self.last_used = time.monotonic()
+
+    def idle(self, now: float, idle_seconds: float) -> bool:
+        return not self.in_flight and now - self.last_used >= idle_seconds
+
+    async def generate(self, prompt: str, max_tokens: Optional[int] = None) -> str:
+        with self._lease() as provider:
+            return await provider.generate(prompt, max_tokens)
+
+    async def generate_spec(self, prompt: str) -> str:
+        with self._lease() as provider:
+            return await provider.generate_spec(prompt)
+
+    async def stream(
+        self, prompt: str, max_tokens: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        with self._lease() as provider:
+            async for chunk in provider.stream(prompt, max_tokens):
+                yield chunk
+
+    async def health_check(self) -> bool:
+        with self._lease() as provider:
+            return await provider.health_check()
+
+    async def aclose(self) -> None:
+        await self._provider.aclose()
+
+    def is_transient_error(self, exc: BaseException) -> bool:
+        return self._provider.is_transient_error(exc)
+
+
+class ProviderPool:
+    """Bounded LRU of provider instances built from user-supplied API keys.
+
+    Reusing an instance reuses its SDK client and HTTP connection pool across
+    a user's requests. Entries are keyed by a SHA-256 digest of
+    (provider, model, key), so raw keys never appear in the pool's keys.
+    Instances pushed out by ``maxsize`` are retired: a request may still hold
+    one, so its client is closed only once it has no call in flight and has
+    been idle for ``idle_seconds``, the same rule that expires live entries.
+    """
+
+    def __init__(self, maxsize: int = 64, idle_seconds: float = 300):
+        self._maxsize = maxsize
+        self._idle_seconds = idle_seconds
+        self._entries: OrderedDict[tuple, PooledProvider] = OrderedDict()
+        self._retired: dict[tuple, PooledProvider] = {}
+
+    def get(
+        self,
+        name: str,
+        factory: Callable[[str, str], LLMProvider],
+        api_key: str,
+        model: str,
+    ) -> PooledProvider:
+        now = time.monotonic()
+        self._expire(now)
+        digest = hashlib.sha256(f"{name}\0{model}\0{api_key}".encode()).hexdigest()
+        pool_key = (factory, digest)
+        provider = self._entries.pop(pool_key, None) or self._retired.pop(
+            pool_key, None
+        )
+        if provider is None:
+            provider = PooledProvider(factory(api_key, model))
+        provider.last_used = now
+        self._entries[pool_key] = provider
+        while len(self._entries) > self._maxsize:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self._retired[evicted_key] = evicted
+        return provider
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expire(self, now: float) -> None:
+        for entries in (self._entries, self._retired):
+            for pool_key, provider in list(entries.items()):
+                if provider.idle(now, self._idle_seconds):
+                    del entries[pool_key]
+                    self._close(provider)
+
+    @staticmethod
+    def _close(provider: LLMProvider) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        loop.create_task(provider.aclose()).add_done_callback(_log_close_failure)
+
+
+def _log_close_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Failed to close provider client: %s", task.exception())
@@ -0,0 +1,101 @@
+import logging
+import random
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# child table -> [(foreign key column, parent table)]
+ForeignKeys = Dict[str, List[Tuple[str, str]]]
+
+
+def dependency_levels(tables: List[str], foreign_keys: ForeignKeys) -> List[List[str]]:
+    """Group ``tables`` into levels where each table depends only on earlier ones.
+
+    Self-references (e.g. ``employees.manager_id``) do not create an edge.
+    Raises ValueError on unknown parents or a reference cycle.
+    """
+    parents = {name: set() for name in tables}
+    for child, keys in foreign_keys.items():
+        for _, parent in keys:
+            if parent not in parents:
+                raise ValueError(f"Table {child} references unknown table {parent}")
+            if parent != child:
+                parents[child].add(parent)
+
+    levels: List[List[str]] = []
+    placed: set = set()
+    while len(placed) < len(tables):
+        level = [t for t in tables if t not in placed and parents[t] <= placed]
+        if not level:
+            cycle = sorted(t for t in tables if t not in placed)
+            raise ValueError(f"Foreign keys form a cycle between: {', '.join(cycle)}")
+        levels.append(level)
+        placed.update(level)
+    return levels
+
+
+def ensure_primary_key(rows: List[dict], column: str) -> List:
+    """Make ``column`` a usable primary key and return its values.
+
+    Model-written keys are kept when they are present and unique; otherwise
+    (missing values, duplicates across chunks) the column is renumbered 1..n.
+    """
+    keys = [row.get(column) for row in rows]
+    if None in keys or len(set(map(repr, keys))) != len(keys):
+        logger.info("renumbering primary key", extra={"column": column})
+        keys = list(range(1, len(rows) + 1))
+        for row, key in zip(rows, keys):
+            row[column] = key
+    return keys
+
+
+def assign_foreign_key(
+    rows: List[dict], column: str, parent_keys: List, rng: random.Random
+) -> None:
+    """Fill ``column`` with keys drawn uniformly from ``parent_keys``."""
+    if not parent_keys:
+        raise ValueError(f"Cannot fill {column}: the referenced table has no rows")
+    for row, key in zip(rows, rng.choices(parent_keys, k=len(rows))):
+        row[column] = key
+
+
+def link_tables(
+    tables: Dict[str, List[dict]],
+    primary_keys: Dict[str, str],
+    foreign_keys: ForeignKeys,
+    seed: Optional[int] = None,
+) -> None:
+    """Give every table a valid primary key and fill foreign keys in place.
+
+    Foreign keys are sampled locally from the parent's final primary keys,
+    so parent rows never have to be sent back to the model.
+    """
+    rng = random.Random(seed)
+    keys: Dict[str, List] = {}
+    for level in dependency_levels(list(tables), foreign_keys):
+        for name in level:
+            keys[name] = ensure_primary_key(tables[name], primary_keys[name])
+            for column, parent in foreign_keys.get(name, []):
+                assign_foreign_key(tables[name], column, keys[parent], rng)
+
+
+def table_prompt(
+    name: str, prompt: str, primary_key: str, foreign_keys: List[Tuple[str, str]]
+) -> str:
+    """Prompt for one table: the user's description plus its key columns.
+
+    Foreign key columns only need placeholder values; they are overwritten
+    with real parent keys after generation.
+    """
+    lines = [
+        prompt,
+        "",
+        f"This is the `{name}` table of a relational dataset.",
+        f"Include a `{primary_key}` column with a unique id for every row.",
+    ]
+    for column, parent in foreign_keys:
+        lines.append(
+            f"Include a `{column}` column referencing `{parent}`; any placeholder"
+            " value is fine, it will be replaced with a real key."
+        )
+    return "\n".join(lines)
@@ -0,0 +1,219 @@
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from fastapi import HTTPException
+
+from providers import LLMProvider
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(HTTPException):
+    """Raised instead of calling a provider whose circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(
+            status_code=503,
+            detail=f"Provider {name} is temporarily unavailable",
+            headers={"Retry-After": str(max(1, round(retry_after)))},
+        )
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker over consecutive provider failures.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls fail fast. Once ``reset_timeout`` has passed, a single probe call
+    is let through (half-open). Its success closes the circuit and its
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._state == "open" and self.retry_after() == 0:
+            return "half_open"
+        return self._state
+
+    def retry_after(self) -> float:
+        if self._state != "open":
+            return 0.0
+        return max(0.0, self._opened_at + self._reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probe_in_flight:
+            self._state = "half_open"
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self._state != "closed":
+            logger.info("circuit closed")
+        self._state = "closed"
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def record_cancelled(self) -> None:
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state == "half_open" or self._failures >= self._failure_threshold:
+            if self._state != "open":
+                logger.warning("circuit opened", extra={"failures": self._failures})
+            self._state = "open"
+            self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+
+
+class AdaptiveLimiter:
+    """AIMD cap on concurrent calls to one provider.
+
+    The cap grows by one for every ``limit`` successes (additive increase)
+    and halves on a failure (multiplicative decrease), between
+    ``min_limit`` and ``max_limit``. Callers over the cap wait up to
+    ``queue_timeout`` seconds for a slot; with 0 they are refused at once.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        queue_timeout: float = 10.0,
+    ):
+        self.limit = float(initial_limit)
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._condition: asyncio.Condition | None = None
+
+    async def acquire(self) -> bool:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            if self.in_flight >= int(self.limit):
+                # wait_for with a zero timeout fails before the first check.
+                if self._queue_timeout <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(
+                        self._condition.wait_for(
+                            lambda: self.in_flight < int(self.limit)
+                        ),
+                        timeout=self._queue_timeout,
+                    )
+                except asyncio.TimeoutError:
+                    return False
+            self.in_flight += 1
+            return True
+
+    async def release(self, ok: bool | None) -> None:
+        """Free a slot; ``ok=None`` (e.g. a cancelled call) leaves the cap as is."""
+        if ok is True:
+            self.limit = min(self._max_limit, self.limit + 1 / self.limit)
+        elif ok is False:
+            self.limit = max(self._min_limit, self.limit / 2)
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+
+class GuardedProvider(LLMProvider):
+    """Wrap a provider with a circuit breaker and an adaptive concurrency cap.
+
+    Only transient upstream errors (``inner.is_transient_error``) count as
+    failures. Bad requests and malformed responses do not trip the circuit.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        inner: LLMProvider,
+        breaker: CircuitBreaker,
+        limiter: AdaptiveLimiter,
+    ):
+        self.name = name
+        self.inner = inner
+        self.breaker = breaker
+        self.limiter = limiter
+
+    def status(self) -> dict:
+        return {
+            "state": self.breaker.state,
+            "concurrency_limit": int(self.limiter.limit),
+            "in_flight": self.limiter.in_flight,
+        }
+
+    async def _enter(self) -> None:
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.name, self.breaker.retry_after())
+        if not await self.limiter.acquire():
+            self.breaker.record_cancelled()
+            raise HTTPException(
+                status_code=503,
+                detail=f"Provider {self.name} is at its concurrency limit",
+            )
+
+    async def _exit(self, exc: BaseException | None) -> None:
+        if isinstance(exc, (asyncio.CancelledError, GeneratorExit)):
+            self.breaker.record_cancelled()
+            await self.limiter.release(ok=None)
+        elif exc is not None and self.inner.is_transient_error(exc):
+            self.breaker.record_failure()
+            await self.limiter.release(ok=False)
+        else:
+            # Any answer from upstream, even a client error, shows it is up.
+            self.breaker.record_success()
+            await self.limiter.release(ok=True)
+
+    async def _guard(self, call: Callable[[], Awaitable[str]]) -> str:
+        await self._enter()
+        try:
+            result = await call()
+        except BaseException as exc:
+            await self._exit(exc)
+            raise
+        await self._exit(None)
+        return result
+
+    async def generate(self, prompt: str, max_tokens: Optional[int] = None) -> str:
+        return await self._guard(lambda: self.inner.generate(prompt, max_tokens))
+
+    async def generate_spec(self, prompt: str) -> str:
+        return await self._guard(lambda: self.inner.generate_spec(prompt))
+
+    async def stream(
+        self, prompt: str, max_tokens: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        await self._enter()
+        try:
+            async for chunk in self.inner.stream(prompt, max_tokens):
+                yield chunk
+        except BaseException as exc:
+            await self._exit(exc)
+            raise
+        await self._exit(None)
+
+    async def health_check(self) -> bool:
+        return await self.inner.health_check()
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+    def is_transient_error(self, exc: BaseException) -> bool:
+        return self.inner.is_transient_error(exc)
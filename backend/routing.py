@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+from providers import LLMProvider
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Samples needed before a provider's stats influence routing or hedging.
+_MIN_SAMPLES = 5
+
+
+class ProviderStats:
+    """Rolling window of call latencies and outcomes for one provider."""
+
+    def __init__(self, window: int):
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._failures: deque[bool] = deque(maxlen=window)
+        self.last_sample = 0.0
+
+    def record(self, latency: float, ok: bool) -> None:
+        if ok:
+            self._latencies.append(latency)
+        self._failures.append(not ok)
+        self.last_sample = time.monotonic()
+
+    @property
+    def samples(self) -> int:
+        return len(self._failures)
+
+    @property
+    def error_rate(self) -> float:
+        return sum(self._failures) / len(self._failures) if self._failures else 0.0
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(pct * len(ordered)) - 1)]
+
+    def snapshot(self) -> dict:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "samples": self.samples,
+            "error_rate": round(self.error_rate, 3),
+            "p50_seconds": None if p50 is None else round(p50, 3),
+            "p95_seconds": None if p95 is None else round(p95, 3),
+        }
+
+
+class Router:
+    """Pick the fastest healthy provider and hedge slow calls to a backup.
+
+    Providers whose recent error rate exceeds ``max_error_rate`` go to the
+    back of the ranking. Providers without recent samples rank behind the
+    healthy ones with samples, so they are probed by hedges and failovers
+    rather than taking traffic from a known fast provider. When ``hedge`` is
+    on and the primary has not answered within its p95 latency (at least
+    ``hedge_min_delay``), the same call is sent to the next provider. The
+    first success wins and the other call is cancelled; its elapsed time is
+    recorded as a sample, since the call took at least that long.
+    """
+
+    def __init__(
+        self,
+        window: int = 50,
+        max_error_rate: float = 0.5,
+        stale_seconds: float = 300,
+        hedge: bool = True,
+        hedge_min_delay: float = 1.0,
+        hedge_default_delay: float = 8.0,
+    ):
+        self._window = window
+        self._max_error_rate = max_error_rate
+        self._stale_seconds = stale_seconds
+        self.hedge = hedge
+        self._hedge_min_delay = hedge_min_delay
+        self._hedge_default_delay = hedge_default_delay
+        self.stats: dict[str, ProviderStats] = {}
+
+    def _stats(self, name: str) -> ProviderStats:
+        if name not in self.stats:
+            self.stats[name] = ProviderStats(self._window)
+        return self.stats[name]
+
+    def rank(self, names: list[str]) -> list[str]:
+        now = time.monotonic()
+
+        def sort_key(name: str):
+            stats = self._stats(name)
+            fresh = (
+                stats.samples >= _MIN_SAMPLES
+                and now - stats.last_sample < self._stale_seconds
+            )
+            if not fresh:
+                return (1, 0.0)
+            if stats.error_rate > self._max_error_rate:
+                return (2, 0.0)
+            return (0, stats.percentile(0.5) or 0.0)
+
+        return sorted(names, key=sort_key)
+
+    def hedge_delay(self, name: str) -> float:
+        stats = self._stats(name)
+        p95 = stats.percentile(0.95) if stats.samples >= _MIN_SAMPLES else None
+        if p95 is None:
+            return self._hedge_default_delay
+        return max(self._hedge_min_delay, p95)
+
+    async def _timed(
+        self, name: str, call: Callable[[LLMProvider], Awaitable[T]], provider
+    ) -> T:
+        start = time.monotonic()
+        try:
+            result = await call(provider)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._stats(name).record(time.monotonic() - start, ok=False)
+            raise
+        self._stats(name).record(time.monotonic() - start, ok=True)
+        return result
+
+    async def call(
+        self,
+        candidates: list[tuple[str, LLMProvider]],
+        call: Callable[[LLMProvider], Awaitable[T]],
+    ) -> T:
+        """Run ``call`` on the first candidate, hedging/failing over to the rest."""
+        tasks: dict[asyncio.Future, str] = {}
+        started: dict[asyncio.Future, float] = {}
+        backups = list(candidates[1:])
+
+        def launch(name: str, provider: LLMProvider) -> None:
+            task = asyncio.ensure_future(self._timed(name, call, provider))
+            tasks[task] = name
+            started[task] = time.monotonic()
+
+        launch(*candidates[0])
+        pending = set(tasks)
+        last_exc: Optional[BaseException] = None
+        try:
+            while pending:
+                timeout = (
+                    self.hedge_delay(candidates[0][0])
+                    if backups and self.hedge
+                    else None
+                )
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if len(tasks) > 1:
+                            logger.info(
+                                "hedged request won", extra={"provider": tasks[task]}
+                            )
+                            # A loser's latency is at least its time so far.
+                            now = time.monotonic()
+                            for loser in pending:
+                                self._stats(tasks[loser]).record(
+                                    now - started[loser], ok=True
+                                )
+                        return task.result()
+                    last_exc = task.exception()
+                # Hedge after the delay, or fail over when everything in flight
+                # has failed.
+                if backups and (not done or not pending):
+                    launch(*backups.pop(0))
+                    pending = {t for t in tasks if not t.done()}
+            raise last_exc
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+class RoutedProvider(LLMProvider):
+    """Provider facade that routes each call across ``providers`` via ``router``."""
+
+    def __init__(self, providers: dict[str, LLMProvider], router: Router):
+        self._providers = providers
+        self._router = router
+
+    def _candidates(self) -> list[tuple[str, LLMProvider]]:
+        ranked = self._router.rank(list(self._providers))
+        if not ranked:
+            raise ValueError("No server-side providers configured for routing")
+        return [(name, self._providers[name]) for name in ranked]
+
+    async def generate(self, prompt: str, max_tokens: Optional[int] = None) -> str:
+        return await self._router.call(
+            self._candidates(),
+            lambda provider: provider.generate(prompt, max_tokens),
+        )
+
+    async def generate_spec(self, prompt: str) -> str:
+        return await self._router.call(
+            self._candidates(), lambda provider: provider.generate_spec(prompt)
+        )
+
+    async def stream(
+        self, prompt: str, max_tokens: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        # Streams cannot be hedged once text is flowing; use the best provider.
+        _, provider = self._candidates()[0]
+        async for chunk in provider.stream(prompt, max_tokens):
+            yield chunk
+
+    async def health_check(self) -> bool:
+        _, provider = self._candidates()[0]
+        return await provider.health_check()
@@ -0,0 +1,116 @@
+import csv
+import io
+import json
+from typing import Iterable, Iterator, List, Optional
+
+# Rows encoded per chunk yielded by iter_csv: large enough to amortize the
+# writer calls, small enough that a StreamingResponse starts sending quickly.
+_CSV_BATCH_ROWS = 500
+
+
+def column_union(rows: Iterable[dict]) -> List[str]:
+    """Return every key across ``rows`` in first-seen order (one pass)."""
+    seen: dict[str, None] = {}
+    for row in rows:
+        for key in row:
+            if key not in seen:
+                seen[key] = None
+    return list(seen)
+
+
+def csv_line(values: Iterable) -> str:
+    """Encode a single CSV record (``None`` becomes an empty field)."""
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerow(values)
+    return buf.getvalue()
+
+
+def iter_csv(rows: List[dict], columns: Optional[List[str]] = None) -> Iterator[str]:
+    """Yield ``rows`` as CSV text in batches, header first.
+
+    Columns default to the union of keys in first-seen order; missing values
+    and ``None`` are written as empty fields, matching the former
+    ``pd.DataFrame(rows).to_csv(index=False)`` output except that integer
+    columns with gaps stay integers instead of becoming floats.
+    """
+    if columns is None:
+        columns = column_union(rows)
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(columns)
+    for start in range(0, len(rows), _CSV_BATCH_ROWS):
+        writer.writerows(
+            [row.get(c) for c in columns]
+            for row in rows[start : start + _CSV_BATCH_ROWS]
+        )
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def to_csv(rows: List[dict]) -> str:
+    return "".join(iter_csv(rows))
+
+
+def iter_ndjson(rows: List[dict]) -> Iterator[str]:
+    """Yield ``rows`` as newline-delimited JSON, one object per line."""
+    for start in range(0, len(rows), _CSV_BATCH_ROWS):
+        yield "".join(
+            json.dumps(row, ensure_ascii=False) + "\n"
+            for row in rows[start : start + _CSV_BATCH_ROWS]
+        )
+
+
+def _arrow_column(values: list):
+    import pyarrow as pa
+
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # LLM rows can mix types within a column (1 and "1"); keep them as text.
+        return pa.array(
+            [
+                (
+                    None
+                    if v is None
+                    else json.dumps(v) if isinstance(v, (dict, list)) else str(v)
+                )
+                for v in values
+            ],
+            type=pa.string(),
+        )
+
+
+def to_arrow_table(rows: List[dict]):
+    """Build a ``pyarrow.Table`` from ``rows``, one typed array per column.
+
+    Columns are the union of keys in first-seen order; missing values become
+    nulls. A column whose values do not share one Arrow type is stored as
+    strings instead of failing the whole table.
+    """
+    import pyarrow as pa
+
+    columns = column_union(rows)
+    return pa.table({c: _arrow_column([row.get(c) for row in rows]) for c in columns})
+
+
+def to_arrow_ipc(rows: List[dict]) -> bytes:
+    """Encode ``rows`` as an Arrow IPC stream."""
+    import pyarrow as pa
+
+    table = to_arrow_table(rows)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def to_parquet(rows: List[dict]) -> bytes:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = pa.BufferOutputStream()
+    pq.write_table(to_arrow_table(rows), sink)
+    return sink.getvalue().to_pybytes()
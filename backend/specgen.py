@@ -0,0 +1,363 @@
+import math
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+from parsing import extract_object
+
+_NUMERIC_TYPES = ("integer", "number")
+_TEMPORAL_TYPES = ("date", "datetime")
+_TYPES = _NUMERIC_TYPES + _TEMPORAL_TYPES + ("boolean", "category", "string")
+_DISTRIBUTIONS = ("uniform", "normal", "lognormal")
+
+_DIGITS = np.array(list("0123456789"))
+_LETTERS = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+_ALNUM = np.concatenate([_LETTERS, _DIGITS])
+_HEX = np.array(list("0123456789abcdef"))
+
+_FIRST_NAMES = np.array(
+    "James Mary Robert Patricia John Jennifer Michael Linda David Elizabeth "
+    "William Barbara Richard Susan Joseph Jessica Thomas Sarah Carlos Karen "
+    "Daniel Lisa Matthew Nancy Anthony Sandra Mark Ashley Wei Priya Ahmed "
+    "Sofia Kenji Amara Luca Ingrid Mateo Fatima Noah Olivia".split()
+)
+_LAST_NAMES = np.array(
+    "Smith Johnson Williams Brown Jones Garcia Miller Davis Rodriguez Martinez "
+    "Hernandez Lopez Gonzalez Wilson Anderson Thomas Taylor Moore Jackson "
+    "Martin Lee Perez Thompson White Harris Clark Lewis Walker Hall Young "
+    "Nguyen Patel Kim Chen Muller Rossi Silva Tanaka Okafor Novak".split()
+)
+_FIRST_NAMES_LOWER = np.char.lower(_FIRST_NAMES)
+_LAST_NAMES_LOWER = np.char.lower(_LAST_NAMES)
+_CITIES = np.array(
+    [
+        "New York",
+        "London",
+        "Paris",
+        "Tokyo",
+        "Berlin",
+        "Madrid",
+        "Toronto",
+        "Sydney",
+        "Chicago",
+        "Mumbai",
+        "Sao Paulo",
+        "Seoul",
+        "Amsterdam",
+        "Lagos",
+        "Mexico City",
+        "Singapore",
+        "Dublin",
+        "Stockholm",
+        "Austin",
+        "Cape Town",
+    ]
+)
+_COUNTRIES = np.array(
+    [
+        "United States",
+        "United Kingdom",
+        "France",
+        "Japan",
+        "Germany",
+        "Spain",
+        "Canada",
+        "Australia",
+        "India",
+        "Brazil",
+        "South Korea",
+        "Netherlands",
+        "Nigeria",
+        "Mexico",
+        "Singapore",
+        "Ireland",
+        "Sweden",
+        "South Africa",
+        "Italy",
+        "Kenya",
+    ]
+)
+_COMPANY_SUFFIXES = np.array(
+    [" Inc", " LLC", " Group", " Ltd", " & Co", " Labs", " Systems", " Partners"]
+)
+_WORDS = np.array(
+    "alpha beta gamma delta river stone cloud maple cedar harbor summit "
+    "falcon ember meadow orbit prism quartz signal vector willow anchor "
+    "beacon canyon drift echo frost grove haven island jade".split()
+)
+_EMAIL_DOMAINS = np.array(["example.com", "example.org", "example.net", "mail.test"])
+
+
+def _number(value, column: str, field: str) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"Column {column}: {field} must be a number")
+    if not math.isfinite(value):
+        raise ValueError(f"Column {column}: {field} must be finite")
+    return float(value)
+
+
+def _temporal(value, column: str, unit: str):
+    try:
+        return np.datetime64(value, unit)
+    except (TypeError, ValueError) as exc:
+        raise ValueError(f"Column {column}: invalid {unit} bound {value!r}") from exc
+
+
+def _check_column(raw: dict) -> dict:
+    """Validate one column entry and fill in defaults for its type."""
+    if not isinstance(raw, dict):
+        raise ValueError("Each column spec must be an object")
+    name = raw.get("name")
+    if not isinstance(name, str) or not name:
+        raise ValueError("Each column spec needs a name")
+    kind = raw.get("type")
+    if kind not in _TYPES:
+        raise ValueError(f"Column {name}: unsupported type {kind!r}")
+
+    column = {"name": name, "type": kind}
+    null_fraction = _number(raw.get("null_fraction"), name, "null_fraction") or 0.0
+    if not 0 <= null_fraction <= 1:
+        raise ValueError(f"Column {name}: null_fraction must be between 0 and 1")
+    column["null_fraction"] = null_fraction
+
+    if kind in _NUMERIC_TYPES:
+        low = _number(raw.get("min"), name, "min")
+        high = _number(raw.get("max"), name, "max")
+        low = 0.0 if low is None else low
+        high = low + 1000 if high is None else high
+        if high < low:
+            raise ValueError(f"Column {name}: max is below min")
+        distribution = raw.get("distribution") or "uniform"
+        if distribution not in _DISTRIBUTIONS:
+            raise ValueError(f"Column {name}: unknown distribution {distribution!r}")
+        mean = _number(raw.get("mean"), name, "mean")
+        std = _number(raw.get("std"), name, "std")
+        column.update(
+            min=low,
+            max=high,
+            distribution=distribution,
+            mean=(low + high) / 2 if mean is None else mean,
+            std=(high - low) / 6 if std is None else abs(std),
+            unique=kind == "integer" and bool(raw.get("unique")),
+        )
+        if distribution == "lognormal" and column["mean"] <= 0:
+            raise ValueError(f"Column {name}: lognormal needs a positive mean")
+        if kind == "number":
+            decimals = raw.get("decimals")
+            column["decimals"] = 2 if decimals is None else int(decimals)
+    elif kind in _TEMPORAL_TYPES:
+        unit = "D" if kind == "date" else "s"
+        low = _temporal(raw.get("min") or "2020-01-01", name, unit)
+        high = _temporal(raw.get("max") or "2024-12-31", name, unit)
+        if high < low:
+            raise ValueError(f"Column {name}: max is before min")
+        column.update(min=low, max=high, unit=unit)
+    elif kind in ("boolean", "category"):
+        values = raw.get("values")
+        if kind == "boolean":
+            values = [True, False]
+        elif not isinstance(values, list) or not values:
+            raise ValueError(f"Column {name}: category needs a list of values")
+        weights = raw.get("weights")
+        if weights is not None:
+            if len(weights) != len(values):
+                raise ValueError(f"Column {name}: weights and values differ in length")
+            weights = np.array([_number(w, name, "weights") for w in weights])
+            if (weights < 0).any() or weights.sum() <= 0:
+                raise ValueError(f"Column {name}: weights must be non-negative")
+            weights = weights / weights.sum()
+        column.update(values=values, weights=weights)
+    else:
+        faker = raw.get("faker")
+        pattern = raw.get("pattern")
+        if faker is not None and faker not in _FAKERS:
+            raise ValueError(f"Column {name}: unknown faker kind {faker!r}")
+        if faker is None and not pattern:
+            faker = "word"
+        column.update(faker=faker, pattern=pattern)
+    return column
+
+
+def parse_spec(content: str) -> List[dict]:
+    """Parse and validate a provider's ``{"columns": [...]}`` response."""
+    columns = extract_object(content).get("columns")
+    if not isinstance(columns, list) or not columns:
+        raise ValueError("Response JSON must include a non-empty columns array")
+    parsed = [_check_column(column) for column in columns]
+    names = [column["name"] for column in parsed]
+    if len(set(names)) != len(names):
+        raise ValueError("Column names must be unique")
+    return parsed
+
+
+def dump_spec(columns: List[dict]) -> List[dict]:
+    """Return ``columns`` in a JSON-serializable form (inverse of parse_spec)."""
+    dumped = []
+    for column in columns:
+        column = dict(column)
+        for field in ("min", "max"):
+            if isinstance(column.get(field), np.datetime64):
+                column[field] = str(column[field])
+        column.pop("unit", None)
+        if column.get("weights") is not None:
+            column["weights"] = column["weights"].tolist()
+        dumped.append(column)
+    return dumped
+
+
+def load_spec(columns: List[dict]) -> List[dict]:
+    """Re-validate columns produced by ``dump_spec`` (e.g. read from a cache)."""
+    return [_check_column(column) for column in columns]
+
+
+# ---------------------------------------------------------------------------
+# Vectorized column generators
+# ---------------------------------------------------------------------------
+def _pattern(rng: np.random.Generator, pattern: str, n: int) -> np.ndarray:
+    """Fill ``#`` with digits, ``?`` with letters and ``*`` with either.
+
+    A backslash escapes the next character. Each position is drawn for all
+    ``n`` rows at once and the character matrix is viewed as fixed-width
+    strings, so no per-row Python work happens.
+    """
+    slots = []
+    escaped = False
+    for char in pattern:
+        if escaped:
+            slots.append(char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == "#":
+            slots.append(_DIGITS)
+        elif char == "?":
+            slots.append(_LETTERS)
+        elif char == "*":
+            slots.append(_ALNUM)
+        else:
+            slots.append(char)
+    if not slots:
+        return np.full(n, "", dtype="U1")
+    matrix = np.empty((n, len(slots)), dtype="U1")
+    for position, slot in enumerate(slots):
+        if isinstance(slot, str):
+            matrix[:, position] = slot
+        else:
+            matrix[:, position] = slot[rng.integers(0, len(slot), n)]
+    return matrix.view(f"U{len(slots)}").ravel()
+
+
+def _pick(rng: np.random.Generator, choices: np.ndarray, n: int) -> np.ndarray:
+    return choices[rng.integers(0, len(choices), n)]
+
+
+def _uuid4(rng: np.random.Generator, n: int) -> np.ndarray:
+    nibbles = rng.integers(0, 16, (n, 32))
+    nibbles[:, 12] = 4
+    nibbles[:, 16] = 8 + nibbles[:, 16] % 4
+    matrix = np.full((n, 36), "-", dtype="U1")
+    hex_positions = [i for i in range(36) if i not in (8, 13, 18, 23)]
+    matrix[:, hex_positions] = _HEX[nibbles]
+    return matrix.view("U36").ravel()
+
+
+def _email(rng: np.random.Generator, n: int) -> np.ndarray:
+    local = np.char.add(
+        np.char.add(_pick(rng, _FIRST_NAMES_LOWER, n), "."),
+        _pick(rng, _LAST_NAMES_LOWER, n),
+    )
+    local = np.char.add(local, _pattern(rng, "##", n))
+    return np.char.add(np.char.add(local, "@"), _pick(rng, _EMAIL_DOMAINS, n))
+
+
+_FAKERS = {
+    "first_name": lambda rng, n: _pick(rng, _FIRST_NAMES, n),
+    "last_name": lambda rng, n: _pick(rng, _LAST_NAMES, n),
+    "name": lambda rng, n: np.char.add(
+        np.char.add(_pick(rng, _FIRST_NAMES, n), " "), _pick(rng, _LAST_NAMES, n)
+    ),
+    "email": _email,
+    "phone": lambda rng, n: _pattern(rng, "+1-###-###-####", n),
+    "city": lambda rng, n: _pick(rng, _CITIES, n),
+    "country": lambda rng, n: _pick(rng, _COUNTRIES, n),
+    "company": lambda rng, n: np.char.add(
+        _pick(rng, _LAST_NAMES, n), _pick(rng, _COMPANY_SUFFIXES, n)
+    ),
+    "word": lambda rng, n: _pick(rng, _WORDS, n),
+    "uuid": _uuid4,
+}
+
+
+def _numeric(rng: np.random.Generator, column: dict, n: int, offset: int):
+    low, high = column["min"], column["max"]
+    if column["unique"]:
+        return np.arange(int(low) + offset, int(low) + offset + n)
+    distribution = column["distribution"]
+    if distribution == "normal":
+        values = rng.normal(column["mean"], column["std"], n)
+    elif distribution == "lognormal":
+        # mean/std describe the distribution itself, not the underlying normal.
+        sigma2 = math.log1p((column["std"] / column["mean"]) ** 2)
+        values = rng.lognormal(math.log(column["mean"]) - sigma2 / 2, sigma2**0.5, n)
+    elif column["type"] == "integer":
+        return rng.integers(math.ceil(low), math.floor(high) + 1, n)
+    else:
+        values = rng.uniform(low, high, n)
+    values = np.clip(values, low, high)
+    if column["type"] == "integer":
+        return np.rint(values).astype(np.int64)
+    return np.round(values, column["decimals"])
+
+
+def _column_values(
+    rng: np.random.Generator, column: dict, n: int, offset: int
+) -> np.ndarray:
+    kind = column["type"]
+    if kind in _NUMERIC_TYPES:
+        return _numeric(rng, column, n, offset)
+    if kind in _TEMPORAL_TYPES:
+        low, high = column["min"], column["max"]
+        span = int((high - low).astype(np.int64)) + 1
+        return (low + rng.integers(0, span, n)).astype(str)
+    if kind in ("boolean", "category"):
+        picks = rng.choice(len(column["values"]), n, p=column["weights"])
+        return np.array(column["values"], dtype=object)[picks]
+    if column["faker"] is not None:
+        return _FAKERS[column["faker"]](rng, n)
+    return _pattern(rng, column["pattern"], n)
+
+
+def generate_batches(
+    columns: List[dict],
+    rows: int,
+    seed: Optional[int] = None,
+    batch_size: int = 10_000,
+) -> Iterator[List[dict]]:
+    """Yield ``rows`` rows for ``columns`` in lists of up to ``batch_size``.
+
+    Values are drawn a whole column at a time; only the final zip into row
+    dicts is per-row Python. The same ``seed`` reproduces the same rows.
+    """
+    rng = np.random.default_rng(seed)
+    names = [column["name"] for column in columns]
+    for offset in range(0, rows, batch_size):
+        n = min(batch_size, rows - offset)
+        values = []
+        for column in columns:
+            data = _column_values(rng, column, n, offset).tolist()
+            if column["null_fraction"]:
+                for idx in np.flatnonzero(rng.random(n) < column["null_fraction"]):
+                    data[idx] = None
+            values.append(data)
+        yield [dict(zip(names, row)) for row in zip(*values)]
+
+
+def generate_rows(
+    columns: List[dict], rows: int, seed: Optional[int] = None
+) -> List[dict]:
+    data: List[dict] = []
+    for batch in generate_batches(columns, rows, seed):
+        data.extend(batch)
+    return data
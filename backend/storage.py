@@ -0,0 +1,15 @@
+import sqlite3
+
+
+def connect(path: str, timeout: float = 5.0) -> sqlite3.Connection:
+    """Open a SQLite database that several uvicorn workers share.
+
+    WAL mode lets readers proceed while one worker writes; the busy timeout
+    makes concurrent writers wait up to ``timeout`` seconds instead of failing
+    with "database is locked" at once. Callers serialize access to the
+    returned connection with their own lock.
+    """
+    conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
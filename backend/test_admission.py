@@ -0,0 +1,37 @@
+import asyncio
+import os
+
+import pytest
+
+from admission import AdmissionRejected, FairAdmission, TokenBucketStore
+
+
+def test_token_bucket_refills_and_is_shared_across_connections(tmp_path):
+    path = os.path.join(tmp_path, "buckets.sqlite3")
+    store = TokenBucketStore(path, rate=1.0, burst=5)
+    other_worker = TokenBucketStore(path, rate=1.0, burst=5)
+
+    assert store.take("a", 3, now=100.0) == 0
+    assert other_worker.take("a", 3, now=100.0) == pytest.approx(1.0)
+    assert other_worker.take("a", 3, now=101.0) == 0
+    # Other tenants have their own bucket; oversized costs are capped at burst.
+    assert store.take("b", 50, now=101.0) == 0
+    assert store.take("b", 1, now=101.0) == pytest.approx(1.0)
+
+
+def test_admission_queues_briefly_then_rejects(tmp_path):
+    store = TokenBucketStore(os.path.join(tmp_path, "b.sqlite3"), rate=20.0, burst=1)
+    admission = FairAdmission(store, max_wait=0.2)
+
+    async def scenario():
+        await admission.admit("a", 1)
+        await admission.admit("a", 1)  # waits ~50 ms for a refill
+        await admission.admit("b", 1)  # unaffected by a's queue
+        admission.max_wait = 0.01
+        with pytest.raises(AdmissionRejected) as exc_info:
+            await admission.admit("a", 1)  # needs ~50 ms, more than max_wait
+        return exc_info.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.retry_after > 0
+    assert admission._locks == {}
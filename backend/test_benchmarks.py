@@ -0,0 +1,57 @@
+import asyncio
+
+from benchmarks.compare import compare
+from benchmarks.fake_provider import FakeProvider
+from benchmarks.report import percentile
+from parsing import extract_json
+
+
+def test_fake_provider_honours_row_instruction_and_streams_same_payload():
+    provider = FakeProvider(rows=3, latency=0, chunk_size=16)
+
+    async def run():
+        default = await provider.generate("customers")
+        sized = await provider.generate("customers\n\nGenerate exactly 7 rows.")
+        streamed = "".join([c async for c in provider.stream("customers")])
+        return default, sized, streamed
+
+    default, sized, streamed = asyncio.run(run())
+    assert len(extract_json(default)) == 3
+    assert len(extract_json(sized)) == 7
+    assert streamed == default
+    assert provider.calls == 3
+
+
+def test_percentile_nearest_rank():
+    samples = [float(i) for i in range(1, 101)]
+    assert percentile(samples, 0.5) == 50
+    assert percentile(samples, 0.99) == 99
+    assert percentile([], 0.5) is None
+
+
+def test_compare_flags_slower_timings_and_lower_throughput():
+    baseline = {"results": [{"concurrency": 8, "p95_ms": 100, "throughput_rps": 50}]}
+    current = {"results": [{"concurrency": 8, "p95_ms": 125, "throughput_rps": 49}]}
+    rows = {r["metric"]: r for r in compare(baseline, current, threshold=0.1)}
+    assert rows["p95_ms"]["regression"]
+    assert not rows["throughput_rps"]["regression"]
+
+
+def test_parse_importtime_keeps_direct_imports_of_main():
+    from benchmarks.startup import parse_importtime
+
+    stderr = "\n".join(
+        [
+            "import time: self [us] | cumulative | imported package",
+            "import time:       700 |        700 |   certifi",
+            "import time:      2000 |       2700 | site",
+            "import time:       100 |        100 |     pydantic.fields",
+            "import time:      1000 |       1100 |   fastapi",
+            "import time:       500 |       5500 |   config",
+            "import time:       300 |       6900 | main",
+        ]
+    )
+    assert parse_importtime(stderr, top=5) == [
+        {"name": "importtime config", "ms": 5.5},
+        {"name": "importtime fastapi", "ms": 1.1},
+    ]
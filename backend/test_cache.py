@@ -0,0 +1,102 @@
+import cache
+from cache import MemoryCache, SQLiteCache
+from dataset import Dataset
+
+
+def test_memory_cache_counts_hits_misses_and_evictions():
+    c = MemoryCache(maxsize=2, ttl=60)
+    assert c.get("a") is None
+    c.set("a", "1")
+    c.set("b", "2")
+    c.set("c", "3")  # evicts the least recently used entry
+    assert c.get("c") == "3"
+    stats = c.stats()
+    assert stats["backend"] == "memory"
+    assert stats["entries"] == 2
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 1
+
+
+def test_sqlite_cache_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    writer = SQLiteCache(path, ttl=60)
+    reader = SQLiteCache(path, ttl=60)
+    writer.set("k", {"rows": [{"a": 1}]})
+    assert reader.get("k") == {"rows": [{"a": 1}]}
+    assert reader.hits == 1
+    assert reader.get("missing") is None
+    assert reader.misses == 1
+
+
+def test_sqlite_cache_expires_entries(tmp_path, monkeypatch):
+    c = SQLiteCache(str(tmp_path / "cache.sqlite3"), ttl=10)
+    now = 1_000_000.0
+    monkeypatch.setattr(cache.time, "time", lambda: now)
+    c.set("k", "v")
+    now += 11
+    assert c.get("k") is None
+    assert len(c) == 0
+
+
+def test_sqlite_cache_evicts_least_recently_used_over_budget(tmp_path, monkeypatch):
+    c = SQLiteCache(
+        str(tmp_path / "cache.sqlite3"), ttl=60, max_bytes=25, touch_interval=0
+    )
+    clock = iter(range(1_000_000, 1_000_100))
+    monkeypatch.setattr(cache.time, "time", lambda: float(next(clock)))
+    c.set("a", "x" * 8)  # each value encodes to 10 bytes
+    c.set("b", "y" * 8)
+    assert c.get("a") == "x" * 8  # touch "a" so "b" is the LRU entry
+    c.set("c", "z" * 8)
+    assert c.get("b") is None
+    assert c.get("a") == "x" * 8
+    assert c.get("c") == "z" * 8
+    assert c.evictions == 1
+
+
+def test_sqlite_cache_fails_open_when_the_database_is_busy(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "cache.sqlite3")
+    c = SQLiteCache(path, ttl=60, busy_timeout=0.01)
+    c.set("k", "v")
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        c.set("new", "v")  # skipped rather than waiting or raising
+        assert c.get("k") == "v"  # reads are not blocked by the writer
+    finally:
+        other.execute("ROLLBACK")
+    assert c.get("new") is None
+
+
+def test_sqlite_cache_round_trips_datasets(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    c = SQLiteCache(path, ttl=60, dumps=Dataset.to_bytes, loads=Dataset.from_bytes)
+    c.set("k", Dataset([{"a": 1, "b": "x"}]))
+    cached = c.get("k")
+    assert isinstance(cached, Dataset)
+    assert cached.rows == [{"a": 1, "b": "x"}]
+    assert cached.body("json") == b'{"json":[{"a":1,"b":"x"}]}'
+
+
+def test_sqlite_cache_keeps_rejected_and_requested_rows(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    c = SQLiteCache(path, ttl=60, dumps=Dataset.to_bytes, loads=Dataset.from_bytes)
+    c.set("k", Dataset([{"a": "x\ny"}], rejected=2, requested=5))
+    cached = c.get("k")
+    assert (cached.rejected, cached.requested) == (2, 5)
+    assert cached.rows == [{"a": "x\ny"}]
+    # Entries written before the metadata line still load.
+    assert Dataset.from_bytes(b'{"json":[{"a":1}]}').requested is None
+
+
+def test_dataset_heads_are_memoized_with_a_bound():
+    dataset = Dataset([{"i": i} for i in range(100)])
+    first = dataset.head(1)
+    assert dataset.head(1) is first
+    for n in range(2, 50):
+        assert dataset.head(n).rows == dataset.rows[:n]
+    assert len(dataset._heads) == 4
+    assert dataset.head(1) is not first
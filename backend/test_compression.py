@@ -0,0 +1,38 @@
+import gzip
+
+import pytest
+
+from compression import compress, negotiate
+from dataset import Dataset
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("gzip, deflate, br, zstd", "zstd"),
+        ("gzip", "gzip"),
+        ("zstd;q=0, gzip", "gzip"),
+        ("gzip;q=1, zstd;q=0.5", "gzip"),
+        ("*", "zstd"),
+        ("", None),
+        ("br, identity", None),
+    ],
+)
+def test_negotiate(header, expected):
+    assert negotiate(header) == expected
+
+
+def test_encoded_body_respects_threshold_and_memoizes():
+    dataset = Dataset([{"i": i, "name": "row"} for i in range(200)])
+    small, encoding = dataset.encoded_body("json", False, "gzip", min_bytes=10**9)
+    assert encoding is None and small == dataset.body("json")
+
+    body, encoding = dataset.encoded_body("csv", True, "gzip", min_bytes=1)
+    assert encoding == "gzip"
+    assert gzip.decompress(body) == dataset.body("csv", raw=True)
+    assert dataset.encoded_body("csv", True, "gzip", min_bytes=1)[0] is body
+
+
+def test_compress_rejects_unknown_encoding():
+    with pytest.raises(ValueError):
+        compress(b"x", "br")
@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+from datastore import DatasetNotFound, DatasetStore
+
+ROWS = [{"i": i, "text": "line\nbreak", "name": f"n{i}"} for i in range(25)]
+
+
+def test_save_is_content_addressed(tmp_path):
+    store = DatasetStore(str(tmp_path))
+    dataset_id = store.save(ROWS)
+    assert store.save([dict(row) for row in ROWS]) == dataset_id
+    assert store.save(ROWS[:3]) != dataset_id
+    assert store.meta(dataset_id) == {"rows": 25, "columns": ["i", "text", "name"]}
+    leftovers = [f for _, _, files in os.walk(tmp_path) for f in files]
+    assert not any(f.endswith(".tmp") for f in leftovers)
+
+
+def test_range_reads_and_column_projection(tmp_path):
+    store = DatasetStore(str(tmp_path))
+    dataset_id = store.save(ROWS)
+    assert store.read(dataset_id, offset=10, limit=3) == ROWS[10:13]
+    assert store.read(dataset_id, offset=24, limit=10) == ROWS[24:]
+    assert store.read(dataset_id, offset=30, limit=10) == []
+    assert store.read(dataset_id, 0, 2, columns=["name", "missing"]) == [
+        {"name": "n0", "missing": None},
+        {"name": "n1", "missing": None},
+    ]
+    assert store.read(dataset_id) == ROWS
+
+
+def test_empty_dataset_and_unknown_ids(tmp_path):
+    store = DatasetStore(str(tmp_path))
+    empty = store.save([])
+    assert store.read(empty, 0, 10) == []
+    for bad in ("0" * 32, "../../etc/passwd"):
+        with pytest.raises(DatasetNotFound):
+            store.meta(bad)
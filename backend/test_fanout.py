@@ -0,0 +1,85 @@
+import asyncio
+import json
+import re
+from unittest.mock import AsyncMock
+
+import pytest
+
+from fanout import chunk_sizes, generate_chunked, merge_rows
+
+
+def test_chunk_sizes():
+    assert chunk_sizes(250, 100) == [100, 100, 50]
+    assert chunk_sizes(200, 100) == [100, 100]
+
+
+def test_merge_rows_reconciles_columns():
+    merged = merge_rows([[{"First Name": "a", "age": 1}], [{"first_name": "b"}]])
+    assert merged == [
+        {"First Name": "a", "age": 1},
+        {"First Name": "b", "age": None},
+    ]
+
+
+def test_merge_rows_dedupe():
+    chunks = [[{"a": 1}, {"a": 2}], [{"a": 1}]]
+    assert merge_rows(chunks) == [{"a": 1}, {"a": 2}, {"a": 1}]
+    assert merge_rows(chunks, dedupe=True) == [{"a": 1}, {"a": 2}]
+
+
+def test_generate_chunked_bounds_concurrency():
+    active = peak = 0
+    counter = iter(range(10_000))
+
+    async def generate(prompt, max_tokens=None):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        n = int(re.search(r"exactly (\d+) rows", prompt).group(1))
+        return json.dumps({"rows": [{"id": next(counter)} for _ in range(n)]})
+
+    provider = AsyncMock()
+    provider.generate = AsyncMock(side_effect=generate)
+    rows = asyncio.run(
+        generate_chunked(provider, "ids", 95, chunk_rows=10, concurrency=3)
+    )
+    assert len(rows) == 95
+    assert len({r["id"] for r in rows}) == 95
+    assert provider.generate.await_count == 10
+    assert peak == 3
+
+
+def test_generate_chunked_failure_propagates():
+    async def generate(prompt, max_tokens=None):
+        if "part 2 of" in prompt:
+            raise ValueError("chunk failed")
+        return '{"rows": [{"a": 1}]}'
+
+    provider = AsyncMock()
+    provider.generate = AsyncMock(side_effect=generate)
+    with pytest.raises(ValueError, match="chunk failed"):
+        asyncio.run(generate_chunked(provider, "x", 3, chunk_rows=1, concurrency=1))
+
+
+def test_generate_rows_sizes_budget_and_continues_after_truncation():
+    from fanout import TokenBudget, generate_rows
+    from providers import Completion
+
+    cut = Completion('{"rows": [{"n": 1}, {"n": 2}, {"n"', truncated=True)
+    rest = '{"rows": [{"n": 3}, {"n": 4}]}'
+    provider = AsyncMock()
+    provider.generate = AsyncMock(side_effect=[cut, rest])
+    budget = TokenBudget(row_bytes=10, limit=1000, continuations=1)
+
+    rows = asyncio.run(generate_rows(provider, lambda n: f"want {n}", 4, budget=budget))
+
+    assert rows == [{"n": 1}, {"n": 2}, {"n": 3}, {"n": 4}]
+    first, second = provider.generate.await_args_list
+    assert first.args == ("want 4",)
+    assert first.kwargs["max_tokens"] == budget.tokens(4)
+    assert second.args == ("want 2",)
+    # Resized from the ~17 bytes per row the truncated completion used.
+    assert second.kwargs["max_tokens"] > budget.tokens(2)
+    assert TokenBudget(row_bytes=1000, limit=500).tokens(100) == 500
@@ -1,14 +1,26 @@
+import asyncio
+import json
+import time
+
+import httpx
 import pytest
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, Mock
+
+import main
 from fastapi.testclient import TestClient
 from main import (
     app,
     extract_json,
     _providers,
     _cache_key,
+    _normalize_prompt,
+    _singleflight,
+    _inflight,
     _HEADER_PROVIDER_MAP,
 )
 from config import Settings
+from jobs import JobStore
+from providers import ProviderPool
 
 settings = Settings()
 
@@ -107,6 +119,16 @@ def test_extract_json_deeply_nested_no_hang():
     assert result[-1]["a"]["b"]["c"] == 2
 
 
+def test_extract_json_markdown_fence():
+    content = '```json\n{"rows": [{"f": 1}]}\n```'
+    assert extract_json(content) == [{"f": 1}]
+
+
+def test_extract_json_skips_prose_brackets():
+    content = 'Note [see below] then {"rows": [{"g": 1}]} done'
+    assert extract_json(content) == [{"g": 1}]
+
+
 @pytest.mark.parametrize(
     "format_type,expected_key",
     [("json", "json"), ("csv", "csv")],
@@ -176,6 +198,16 @@ def test_cache_key_includes_provider():
     assert key1 != key2
 
 
+def test_cache_key_parts_cannot_collide():
+    assert _cache_key("openai", "spec:customers") != _cache_key(
+        "openai", "customers", mode="spec"
+    )
+    assert _cache_key("openai", "customers", mode="spec") != _cache_key(
+        "openai:spec", "customers"
+    )
+    assert _cache_key("openai", "dedupe:x") != _cache_key("openai", "x", True)
+
+
 def test_generate_data_with_user_key_header(monkeypatch):
     """User-supplied API key header overrides server default provider."""
     mock_provider = AsyncMock()
@@ -245,3 +277,865 @@ def test_generate_data_user_key_bypasses_cache(monkeypatch):
         headers={"X-OpenAI-API-Key": "user-key-abc"},
     )
     assert mock_provider.generate.await_count == 2
+
+
+def test_singleflight_coalesces_concurrent_calls():
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        return await asyncio.gather(*(_singleflight("sf-key", fetch) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["result"] * 5
+    assert calls == 1
+    assert "sf-key" not in _inflight
+
+
+def test_singleflight_propagates_errors_to_all_waiters():
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    async def run():
+        return await asyncio.gather(
+            *(_singleflight("sf-err", fetch) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert "sf-err" not in _inflight
+
+
+def test_row_stream_failure_is_in_band_except_for_csv():
+    async def rows():
+        yield {"a": 1}
+        raise ValueError("upstream failed")
+
+    async def collect(fmt):
+        return [part async for part in main._encode_row_stream(rows(), fmt, False)]
+
+    assert asyncio.run(collect("ndjson")) == [
+        '{"a": 1}\n',
+        '{"error": "upstream failed"}\n',
+    ]
+    with pytest.raises(ValueError):
+        asyncio.run(collect("csv"))
+
+
+def test_generate_data_coalesces_identical_requests(monkeypatch):
+    """Concurrent identical prompts should share a single provider call."""
+
+    async def slow_generate(prompt, max_tokens=None):
+        await asyncio.sleep(0.05)
+        return '{"rows": [{"n": 1}]}'
+
+    provider = list(_providers.values())[0]
+    mock = AsyncMock(side_effect=slow_generate)
+    monkeypatch.setattr(provider, "generate", mock)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as ac:
+            payload = {"prompt": "coalesce me", "format": "json"}
+            return await asyncio.gather(
+                *(ac.post("/generate-data", json=payload) for _ in range(3))
+            )
+
+    responses = asyncio.run(run())
+    assert [r.status_code for r in responses] == [200, 200, 200]
+    assert all(r.json()["json"] == [{"n": 1}] for r in responses)
+    assert mock.await_count == 1
+
+
+def test_generate_data_cache_hit_skips_parsing(monkeypatch):
+    """Cache hits should serve the stored rendering without re-parsing."""
+    provider = list(_providers.values())[0]
+    monkeypatch.setattr(
+        provider, "generate", AsyncMock(return_value='{"rows": [{"k": "v"}]}')
+    )
+    payload = {"prompt": "parse once", "format": "csv"}
+    first = client.post("/generate-data", json=payload)
+    assert first.status_code == 200
+
+    monkeypatch.setattr(main, "extract_json", Mock(side_effect=AssertionError))
+    second = client.post("/generate-data", json=payload)
+    assert second.status_code == 200
+    assert second.json() == first.json() == {"csv": "k\nv\n"}
+    provider.generate.assert_awaited_once()
+
+
+def _streaming(*chunks):
+    async def stream(prompt, max_tokens=None):
+        for chunk in chunks:
+            yield chunk
+
+    return stream
+
+
+def test_generate_data_stream_ndjson(monkeypatch):
+    provider = list(_providers.values())[0]
+    monkeypatch.setattr(
+        provider, "stream", _streaming('{"rows": [{"i": 1},', ' {"i": 2}]}')
+    )
+    response = client.post(
+        "/generate-data",
+        json={"prompt": "stream ndjson", "format": "json", "stream": True},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.text == '{"i": 1}\n{"i": 2}\n'
+
+
+def test_generate_data_stream_csv_and_sse(monkeypatch):
+    provider = list(_providers.values())[0]
+    monkeypatch.setattr(
+        provider, "stream", _streaming('{"rows": [{"a": 1, "b": null}', "]}")
+    )
+    response = client.post(
+        "/generate-data",
+        json={"prompt": "stream csv", "format": "csv", "stream": True},
+    )
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text == "a,b\n1,\n"
+
+    response = client.post(
+        "/generate-data",
+        json={"prompt": "stream sse", "format": "json", "stream": True},
+        headers={"Accept": "text/event-stream"},
+    )
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text == 'data: {"a": 1, "b": null}\n\nevent: done\ndata: {}\n\n'
+
+
+def test_generate_data_stream_reports_errors_in_band(monkeypatch):
+    provider = list(_providers.values())[0]
+    monkeypatch.setattr(provider, "stream", _streaming("not json at all"))
+    response = client.post(
+        "/generate-data",
+        json={"prompt": "stream garbage", "format": "json", "stream": True},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"error": "Response did not contain valid JSON"}
+
+
+def test_generate_data_cut_off_stream_is_an_error(monkeypatch):
+    provider = list(_providers.values())[0]
+    monkeypatch.setattr(
+        provider, "stream", _streaming('{"rows": [{"a": 1}, {"a": 2}, {"a"')
+    )
+    body = {"prompt": "stream cut off", "format": "json", "stream": True}
+    response = client.post("/generate-data", json=body)
+    assert response.text.splitlines()[-1] == json.dumps(
+        {"error": "Stream ended before all rows were generated"}
+    )
+    response = client.post(
+        "/generate-data", json=body, headers={"Accept": "text/event-stream"}
+    )
+    assert "event: error" in response.text
+    assert "event: done" not in response.text
+
+
+def test_generate_data_large_stream_is_chunked_and_capped(monkeypatch):
+    calls = []
+
+    async def stream(prompt, max_tokens=None):
+        n = int(prompt.rsplit("exactly ", 1)[1].split()[0])
+        calls.append((n, max_tokens))
+        yield json.dumps({"rows": [{"i": i} for i in range(n)]})
+
+    provider = list(_providers.values())[0]
+    monkeypatch.setattr(provider, "stream", stream)
+    monkeypatch.setattr(main.settings, "chunk_rows", 10)
+    response = client.post(
+        "/generate-data",
+        json={"prompt": "chunked stream", "rows": 25, "stream": True},
+    )
+    assert len(response.text.splitlines()) == 25
+    assert [n for n, _ in calls] == [10, 10, 5]
+    assert all(max_tokens is not None for _, max_tokens in calls)
+
+
+def test_generate_data_large_row_count_fans_out(monkeypatch):
+    calls = []
+
+    async def generate(prompt, max_tokens=None):
+        calls.append(prompt)
+        n = int(prompt.rsplit("exactly ", 1)[1].split()[0])
+        return json.dumps({"rows": [{"v": len(calls)} for _ in range(n)]})
+
+    provider = list(_providers.values())[0]
+    monkeypatch.setattr(provider, "generate", AsyncMock(side_effect=generate))
+    monkeypatch.setattr(main.settings, "chunk_rows", 10)
+    response = client.post(
+        "/generate-data", json={"prompt": "fan out", "format": "json", "rows": 25}
+    )
+    assert response.status_code == 200
+    assert len(response.json()["json"]) == 25
+    assert len(calls) == 3
+
+
+@pytest.fixture
+def job_client(monkeypatch, tmp_path):
+    monkeypatch.setattr(main._jobs, "store", JobStore(str(tmp_path / "jobs.sqlite3")))
+    with TestClient(app) as c:
+        yield c
+
+
+def _wait_for_job(c, job_id):
+    for _ in range(100):
+        job = c.get(f"/jobs/{job_id}").json()
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_job_lifecycle(monkeypatch, job_client):
+    async def generate(prompt, max_tokens=None):
+        n = int(prompt.rsplit("exactly ", 1)[1].split()[0])
+        return json.dumps({"rows": [{"n": i} for i in range(n)]})
+
+    provider = list(_providers.values())[0]
+    monkeypatch.setattr(provider, "generate", AsyncMock(side_effect=generate))
+    monkeypatch.setattr(main.settings, "chunk_rows", 10)
+
+    response = job_client.post(
+        "/jobs", json={"prompt": "job rows", "format": "csv", "rows": 25}
+    )
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+
+    job = _wait_for_job(job_client, job_id)
+    assert job["status"] == "succeeded"
+    assert job["rows_requested"] == 25
+    assert job["rows_done"] == 25
+
+    result = job_client.get(f"/jobs/{job_id}/result")
+    assert result.status_code == 200
+    assert result.json()["csv"].startswith("n\n0\n")
+    as_json = job_client.get(f"/jobs/{job_id}/result", params={"format": "json"})
+    assert len(as_json.json()["json"]) == 25
+
+
+def test_job_failure_and_missing_result(monkeypatch, job_client):
+    provider = list(_providers.values())[0]
+    monkeypatch.setattr(
+        provider, "generate", AsyncMock(side_effect=ValueError("upstream broke"))
+    )
+    job_id = job_client.post("/jobs", json={"prompt": "job fails"}).json()["id"]
+    job = _wait_for_job(job_client, job_id)
+    assert job["status"] == "failed"
+    assert job["error"] == "upstream broke"
+    assert job_client.get(f"/jobs/{job_id}/result").status_code == 409
+    assert job_client.get("/jobs/does-not-exist").status_code == 404
+
+
+def test_large_spec_jobs_are_rejected(monkeypatch, job_client):
+    monkeypatch.setattr(main.settings, "spec_max_inline_rows", 10)
+    body = {"prompt": "big spec job", "mode": "spec", "rows": 11}
+    response = job_client.post("/jobs", json=body)
+    assert response.status_code == 422
+    assert "stream or save" in response.json()["detail"]
+
+
+def test_jobs_reject_stream_and_save(job_client):
+    for flag in ("stream", "save"):
+        response = job_client.post("/jobs", json={"prompt": "job flags", flag: True})
+        assert response.status_code == 422
+
+
+def test_jobs_left_by_a_stopped_worker_stop_counting(monkeypatch, tmp_path):
+    clock = [1000.0]
+    monkeypatch.setattr("jobs.time.time", lambda: clock[0])
+    store = JobStore(str(tmp_path / "jobs.sqlite3"), stale_after=60)
+    store.create("alive", "json", 10)
+    store.create("orphan", "json", 10)
+    clock[0] += 50
+    store.heartbeat(["alive"])
+    clock[0] += 50
+    assert store.count_active() == 1
+    assert store.get("orphan")["status"] == "failed"
+    assert store.get("alive")["status"] == "queued"
+
+
+def test_jobs_share_the_rate_limit(monkeypatch, job_client):
+    provider = list(_providers.values())[0]
+    monkeypatch.setattr(provider, "generate", AsyncMock(return_value='{"rows": []}'))
+    monkeypatch.setattr(main._admission, "max_wait", 0)
+    big = {"prompt": "queued work", "rows": 5000}
+    assert job_client.post("/jobs", json=big).status_code == 202
+    assert job_client.post("/jobs", json=big).status_code == 429
+
+
+def test_user_key_provider_is_reused_across_requests(monkeypatch):
+    built = []
+
+    def mock_cls(key, model):
+        provider = AsyncMock()
+        provider.generate = AsyncMock(return_value='{"rows": [{"p": 1}]}')
+        built.append(key)
+        return provider
+
+    monkeypatch.setitem(
+        _HEADER_PROVIDER_MAP,
+        "x-openai-api-key",
+        ("openai", mock_cls, settings.openai_model),
+    )
+    for key in ("pooled-key", "pooled-key", "other-key"):
+        response = client.post(
+            "/generate-data",
+            json={"prompt": "pooled", "format": "json"},
+            headers={"X-OpenAI-API-Key": key},
+        )
+        assert response.status_code == 200
+    assert built == ["pooled-key", "other-key"]
+
+    client.get("/providers", headers={"X-OpenAI-API-Key": "listing-only-key"})
+    assert "listing-only-key" not in built
+
+
+def test_provider_pool_closes_evicted_and_idle_clients(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("providers.time.monotonic", lambda: clock[0])
+    built = {}
+
+    def factory(key, model):
+        built[key] = AsyncMock()
+        return built[key]
+
+    async def run():
+        pool = ProviderPool(maxsize=2, idle_seconds=60)
+        a = pool.get("openai", factory, "key-a", "m")
+        b = pool.get("openai", factory, "key-b", "m")
+        assert pool.get("openai", factory, "key-a", "m") is a
+        release = asyncio.Event()
+
+        async def slow_generate(prompt, max_tokens=None):
+            await release.wait()
+
+        built["key-b"].generate.side_effect = slow_generate
+        call = asyncio.ensure_future(b.generate("p"))
+        await asyncio.sleep(0)
+        pool.get("openai", factory, "key-c", "m")  # evicts key-b (LRU)
+        assert len(pool) == 2
+        clock[0] = 120
+        pool.get("openai", factory, "key-d", "m")  # a and c went idle
+        assert len(pool) == 1
+        await asyncio.sleep(0)
+        built["key-a"].aclose.assert_awaited_once()
+        built["key-c"].aclose.assert_awaited_once()
+        # The evicted client is still in use, so it stays open until idle.
+        built["key-b"].aclose.assert_not_awaited()
+        release.set()
+        await call
+        clock[0] = 240
+        pool.get("openai", factory, "key-e", "m")
+        await asyncio.sleep(0)
+        built["key-b"].aclose.assert_awaited_once()
+        assert not any("key-d" in str(pool_key) for pool_key in pool._entries)
+
+    asyncio.run(run())
+
+
+def test_generate_data_auto_routing(monkeypatch):
+    provider = list(_providers.values())[0]
+    monkeypatch.setattr(
+        provider, "generate", AsyncMock(return_value='{"rows": [{"r": 1}]}')
+    )
+    response = client.post(
+        "/generate-data", json={"prompt": "route me", "provider": "auto"}
+    )
+    assert response.status_code == 200
+    assert response.json() == {"json": [{"r": 1}]}
+    routing = client.get("/health").json()["routing"]
+    assert routing[list(_providers)[0]]["samples"] >= 1
+
+
+def test_open_circuit_returns_503_and_shows_in_health(monkeypatch):
+    provider = list(_providers.values())[0]
+    monkeypatch.setattr(provider.breaker, "_state", "open")
+    monkeypatch.setattr(provider.breaker, "_opened_at", time.monotonic())
+    response = client.post("/generate-data", json={"prompt": "circuit open"})
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+    circuits = client.get("/health").json()["circuits"]
+    assert circuits[list(_providers)[0]]["state"] == "open"
+
+
+def test_normalize_prompt_folds_case_whitespace_and_row_suffix():
+    assert _normalize_prompt("Customers  with\nemail\n\nGenerate exactly 25 rows.") == (
+        "customers with email",
+        25,
+    )
+    assert _normalize_prompt("Customers with email") == ("customers with email", None)
+    assert _cache_key("openai", "  CUSTOMERS with email ") == _cache_key(
+        "openai", "customers with email\n\nGenerate exactly 5 rows."
+    )
+
+
+def test_generate_data_reuses_larger_cached_result(monkeypatch):
+    async def generate(prompt, max_tokens=None):
+        n = int(prompt.rsplit("exactly ", 1)[1].split()[0])
+        return json.dumps({"rows": [{"i": i} for i in range(n)]})
+
+    provider = list(_providers.values())[0]
+    mock = AsyncMock(side_effect=generate)
+    monkeypatch.setattr(provider, "generate", mock)
+
+    def post(prompt):
+        return client.post("/generate-data", json={"prompt": prompt}).json()["json"]
+
+    assert len(post("Row reuse test\n\nGenerate exactly 5 rows.")) == 5
+    assert post("  row REUSE test\n\nGenerate exactly 3 rows.") == [
+        {"i": 0},
+        {"i": 1},
+        {"i": 2},
+    ]
+    assert mock.await_count == 1
+    assert len(post("Row reuse test\n\nGenerate exactly 8 rows.")) == 8
+    assert mock.await_count == 2
+
+
+def test_generate_data_prompt_row_count_sizes_and_continues(monkeypatch):
+    from providers import Completion
+
+    provider = list(_providers.values())[0]
+    mock = AsyncMock(
+        side_effect=[
+            Completion('{"rows": [{"i": 0}, {"i": 1}, {"i"', truncated=True),
+            json.dumps({"rows": [{"i": 2}]}),
+        ]
+    )
+    monkeypatch.setattr(provider, "generate", mock)
+    prompt = "Continued rows\n\nGenerate exactly 3 rows."
+
+    rows = client.post("/generate-data", json={"prompt": prompt}).json()["json"]
+    assert rows == [{"i": 0}, {"i": 1}, {"i": 2}]
+    first, second = mock.await_args_list
+    assert first.args[0] == prompt and first.kwargs["max_tokens"] is not None
+    assert second.args[0].endswith("Generate exactly 1 rows.")
+
+
+def test_generate_data_short_cached_result_is_a_hit(monkeypatch):
+    provider = list(_providers.values())[0]
+    mock = AsyncMock(return_value=json.dumps({"rows": [{"i": 0}, {"i": 1}]}))
+    monkeypatch.setattr(provider, "generate", mock)
+    body = {"prompt": "Short result test", "rows": 4}
+
+    assert len(client.post("/generate-data", json=body).json()["json"]) == 2
+    assert len(client.post("/generate-data", json=body).json()["json"]) == 2
+    assert mock.await_count == 1
+
+
+def test_generate_data_spec_mode_generates_rows_locally(monkeypatch):
+    spec = {
+        "columns": [
+            {"name": "id", "type": "integer", "min": 1, "unique": True},
+            {"name": "city", "type": "string", "faker": "city"},
+        ]
+    }
+    provider = list(_providers.values())[0]
+    mock = AsyncMock(return_value=json.dumps(spec))
+    monkeypatch.setattr(provider, "generate_spec", mock)
+    body = {"prompt": "Spec mode cities", "mode": "spec", "rows": 20000, "seed": 1}
+
+    rows = client.post("/generate-data", json=body).json()["json"]
+    assert len(rows) == 20000
+    assert rows[-1]["id"] == 20000
+    again = client.post("/generate-data", json=body).json()["json"]
+    assert again == rows
+    mock.assert_awaited_once()
+
+    streamed = client.post("/generate-data", json={**body, "rows": 3, "stream": True})
+    lines = [json.loads(line) for line in streamed.text.splitlines()]
+    assert lines == rows[:3]
+    assert mock.await_count == 1
+
+
+def test_generate_data_row_limit_depends_on_mode():
+    too_many = settings.max_rows + 1
+    response = client.post("/generate-data", json={"prompt": "x", "rows": too_many})
+    assert response.status_code == 422
+    in_prompt = f"x. Generate exactly {settings.spec_max_rows + 1} rows."
+    response = client.post("/generate-data", json={"prompt": in_prompt, "mode": "spec"})
+    assert response.status_code == 422
+    inline = {"prompt": "x", "mode": "spec", "rows": settings.spec_max_inline_rows + 1}
+    response = client.post("/generate-data", json=inline)
+    assert response.status_code == 422
+    assert "stream or save" in response.json()["detail"]
+    response = client.post("/generate-batch", json={"requests": [inline]})
+    assert response.status_code == 422
+
+
+def test_large_saved_spec_dataset_returns_only_its_id(monkeypatch, tmp_path):
+    from datastore import DatasetStore
+
+    monkeypatch.setattr(main, "_datasets", DatasetStore(str(tmp_path)))
+    monkeypatch.setattr(main.settings, "spec_max_inline_rows", 10)
+    spec = {"columns": [{"name": "id", "type": "integer", "min": 1}]}
+    provider = list(_providers.values())[0]
+    monkeypatch.setattr(
+        provider, "generate_spec", AsyncMock(return_value=json.dumps(spec))
+    )
+    body = {"prompt": "saved spec ids", "mode": "spec", "rows": 500, "save": True}
+
+    response = client.post("/generate-data", json=body)
+    assert response.status_code == 200
+    assert response.json() == {
+        "dataset_id": response.headers["x-dataset-id"],
+        "rows": 500,
+    }
+    page = client.get(f"/datasets/{response.json()['dataset_id']}").json()
+    assert page["total_rows"] == 500
+
+
+def test_generate_data_binary_formats(monkeypatch):
+    import pyarrow as pa
+
+    provider = list(_providers.values())[0]
+    monkeypatch.setattr(
+        provider, "generate", AsyncMock(return_value='{"rows": [{"x": 1}, {"x": 2}]}')
+    )
+    payload = {"prompt": "binary formats"}
+
+    ndjson = client.post("/generate-data", json={**payload, "format": "ndjson"})
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    assert ndjson.text == '{"x": 1}\n{"x": 2}\n'
+
+    arrow = client.post("/generate-data", json={**payload, "format": "arrow"})
+    assert arrow.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    assert pa.ipc.open_stream(arrow.content).read_all().to_pylist() == [
+        {"x": 1},
+        {"x": 2},
+    ]
+
+    parquet = client.post("/generate-data", json={**payload, "format": "parquet"})
+    assert parquet.headers["content-type"] == "application/vnd.apache.parquet"
+    assert parquet.content[:4] == b"PAR1"
+
+    streamed = client.post(
+        "/generate-data", json={**payload, "format": "parquet", "stream": True}
+    )
+    assert streamed.status_code == 422
+
+
+def test_generate_data_compression_and_download(monkeypatch):
+    rows = [{"id": i, "name": f"user {i}"} for i in range(200)]
+    provider = list(_providers.values())[0]
+    monkeypatch.setattr(
+        provider, "generate", AsyncMock(return_value=json.dumps({"rows": rows}))
+    )
+    payload = {"prompt": "compressed download", "format": "csv"}
+
+    gzipped = client.post(
+        "/generate-data", json=payload, headers={"Accept-Encoding": "gzip"}
+    )
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.headers["vary"] == "Accept-Encoding"
+    assert gzipped.json()["csv"].startswith("id,name\n0,user 0\n")
+
+    plain = client.post(
+        "/generate-data",
+        json={**payload, "download": True},
+        headers={"Accept-Encoding": "identity"},
+    )
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["content-type"] == "text/csv; charset=utf-8"
+    assert "attachment" in plain.headers["content-disposition"]
+    assert plain.text.startswith("id,name\n0,user 0\n")
+
+    raw_json = client.post(
+        "/generate-data", json={**payload, "format": "json", "download": True}
+    )
+    assert raw_json.json() == rows
+
+    monkeypatch.setattr(provider, "generate", AsyncMock(return_value='{"rows": []}'))
+    small = client.post(
+        "/generate-data",
+        json={"prompt": "tiny payload"},
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert "content-encoding" not in small.headers
+
+
+def test_metrics_endpoint_reports_request_and_cache_metrics(monkeypatch):
+    provider = list(_providers.values())[0]
+    monkeypatch.setattr(
+        provider, "generate", AsyncMock(return_value='{"rows": [{"x": 1}]}')
+    )
+    for _ in range(2):
+        client.post("/generate-data", json={"prompt": "metrics", "format": "csv"})
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    text = response.text
+    assert (
+        'http_request_duration_seconds_count{method="POST",'
+        'route="/generate-data",status="200"}'
+    ) in text
+    assert 'response_cache_lookups_total{backend="memory",result="hit"}' in text
+    assert "extract_json_duration_seconds_count" in text
+    assert 'serialize_duration_seconds_count{format="csv"}' in text
+    assert "http_requests_in_flight" in text
+
+
+def test_generate_batch_streams_each_item_and_reuses_cache(monkeypatch):
+    async def generate(prompt, max_tokens=None):
+        if "broken" in prompt:
+            raise ValueError("bad table")
+        await asyncio.sleep(0.05 if "slow" in prompt else 0)
+        return json.dumps({"rows": [{"table": prompt.split()[0]}]})
+
+    provider = list(_providers.values())[0]
+    mock = AsyncMock(side_effect=generate)
+    monkeypatch.setattr(provider, "generate", mock)
+    batch = {
+        "requests": [
+            {"prompt": "slow customers"},
+            {"prompt": "orders", "format": "csv"},
+            {"prompt": "broken products"},
+            {"prompt": "ORDERS", "format": "csv"},
+        ]
+    }
+
+    response = client.post("/generate-batch", json=batch)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    by_index = {line["index"]: line for line in lines}
+    assert lines[-1]["index"] == 0  # the slow item finishes last
+    assert by_index[0] == {"index": 0, "status": 200, "json": [{"table": "slow"}]}
+    assert by_index[1]["csv"] == "table\norders\n"
+    assert by_index[2] == {"index": 2, "status": 502, "detail": "bad table"}
+    assert by_index[3]["csv"] == by_index[1]["csv"]
+    # The two ORDERS prompts share one provider call.
+    assert mock.await_count == 3
+
+
+def test_generate_batch_validation():
+    assert client.post("/generate-batch", json={"requests": []}).status_code == 422
+    binary = {"requests": [{"prompt": "x", "format": "parquet"}]}
+    assert client.post("/generate-batch", json=binary).status_code == 422
+    unknown = {"requests": [{"prompt": "x", "provider": "nope"}]}
+    assert client.post("/generate-batch", json=unknown).status_code == 400
+
+
+def test_generate_relational_links_tables(monkeypatch):
+    async def generate(prompt, max_tokens=None):
+        n = int(prompt.rsplit("exactly ", 1)[1].split()[0])
+        if "`customers`" in prompt:
+            return json.dumps({"rows": [{"id": 1, "name": "a"}] * n})
+        return json.dumps({"rows": [{"id": i, "customer_id": 0} for i in range(n)]})
+
+    provider = list(_providers.values())[0]
+    mock = AsyncMock(side_effect=generate)
+    monkeypatch.setattr(provider, "generate", mock)
+    body = {
+        "tables": [
+            {
+                "name": "orders",
+                "prompt": "Relational orders",
+                "rows": 20,
+                "foreign_keys": [{"column": "customer_id", "references": "customers"}],
+            },
+            {"name": "customers", "prompt": "Relational customers", "rows": 4},
+        ],
+        "seed": 3,
+    }
+    response = client.post("/generate-relational", json=body)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["levels"] == [["customers"], ["orders"]]
+    customer_ids = [c["id"] for c in data["tables"]["customers"]]
+    assert customer_ids == [1, 2, 3, 4]
+    assert {o["customer_id"] for o in data["tables"]["orders"]} <= set(customer_ids)
+    assert mock.await_count == 2
+    # A second request is served from the cache without touching cached rows.
+    again = client.post("/generate-relational", json=body).json()
+    assert again == data
+    assert mock.await_count == 2
+    # Prompts at the length limit still fit once key hints are added.
+    body["tables"][1]["prompt"] = "c" * settings.max_prompt_length
+    assert client.post("/generate-relational", json=body).status_code == 200
+
+
+def test_generate_relational_rejects_cycles():
+    body = {
+        "tables": [
+            {
+                "name": "a",
+                "prompt": "a",
+                "rows": 1,
+                "foreign_keys": [{"column": "b_id", "references": "b"}],
+            },
+            {
+                "name": "b",
+                "prompt": "b",
+                "rows": 1,
+                "foreign_keys": [{"column": "a_id", "references": "a"}],
+            },
+        ]
+    }
+    response = client.post("/generate-relational", json=body)
+    assert response.status_code == 422
+
+
+def test_saved_dataset_pages_and_downloads(monkeypatch, tmp_path):
+    from datastore import DatasetStore
+
+    monkeypatch.setattr(main, "_datasets", DatasetStore(str(tmp_path)))
+    rows = [{"id": i, "name": f"n{i}"} for i in range(30)]
+    provider = list(_providers.values())[0]
+    mock = AsyncMock(return_value=json.dumps({"rows": rows}))
+    monkeypatch.setattr(provider, "generate", mock)
+
+    response = client.post("/generate-data", json={"prompt": "saved", "save": True})
+    dataset_id = response.headers["x-dataset-id"]
+    assert response.json()["json"] == rows
+
+    page = client.get(
+        f"/datasets/{dataset_id}", params={"offset": 28, "limit": 5}
+    ).json()
+    assert page["total_rows"] == 30
+    assert page["columns"] == ["id", "name"]
+    assert page["rows"] == rows[28:]
+    projected = client.get(
+        f"/datasets/{dataset_id}", params={"limit": 2, "columns": "name"}
+    ).json()
+    assert projected["rows"] == [{"name": "n0"}, {"name": "n1"}]
+
+    csv = client.get(f"/datasets/{dataset_id}/download", params={"format": "csv"})
+    assert csv.text.startswith("id,name\n0,n0\n")
+    assert mock.await_count == 1
+    assert client.get("/datasets/" + "f" * 32).status_code == 404
+
+
+def test_column_schema_drops_bad_rows_and_tops_up(monkeypatch):
+    provider = list(_providers.values())[0]
+    mock = AsyncMock(
+        side_effect=[
+            json.dumps({"rows": [{"n": "1"}, {"n": "bad"}, {"n": 3}]}),
+            json.dumps({"rows": [{"N": 4.0}]}),
+        ]
+    )
+    monkeypatch.setattr(provider, "generate", mock)
+    body = {
+        "prompt": "typed numbers",
+        "rows": 3,
+        "columns": [{"name": "n", "type": "integer"}],
+    }
+
+    response = client.post("/generate-data", json=body)
+    assert response.status_code == 200
+    assert response.json()["json"] == [{"n": 1}, {"n": 3}, {"n": 4}]
+    assert response.headers["x-rows-rejected"] == "1"
+    assert "n: integer" in mock.await_args_list[0].args[0]
+    assert mock.await_args_list[1].args[0].endswith("Generate exactly 1 rows.")
+
+    # Served from the cache entry keyed by prompt and schema.
+    assert client.post("/generate-data", json=body).json()["json"][2] == {"n": 4}
+    assert mock.await_count == 2
+    bad = {**body, "columns": [{"name": "n"}, {"name": "N"}]}
+    assert client.post("/generate-data", json=bad).status_code == 422
+    bad = {**body, "columns": [{"name": "d", "type": "date", "enum": [20240101]}]}
+    assert client.post("/generate-data", json=bad).status_code == 422
+
+
+def test_streamed_column_schema_tops_up_and_reports_rejects(monkeypatch):
+    prompts = []
+
+    async def stream(prompt, max_tokens=None):
+        prompts.append(prompt)
+        if len(prompts) == 1:
+            yield json.dumps({"rows": [{"n": "1"}, {"n": "bad"}, {"n": 3}]})
+        else:
+            yield json.dumps({"rows": [{"n": 4}]})
+
+    provider = list(_providers.values())[0]
+    monkeypatch.setattr(provider, "stream", stream)
+    body = {
+        "prompt": "streamed typed numbers",
+        "rows": 3,
+        "stream": True,
+        "columns": [{"name": "n", "type": "integer"}],
+    }
+
+    expected = '{"n": 1}\n{"n": 3}\n{"n": 4}\n{"rows_rejected": 1}\n'
+    assert client.post("/generate-data", json=body).text == expected
+    assert prompts[1].endswith("Generate exactly 1 rows.")
+    # Replayed from the cache with the same count.
+    assert client.post("/generate-data", json=body).text == expected
+    assert len(prompts) == 2
+    sse = client.post(
+        "/generate-data", json=body, headers={"Accept": "text/event-stream"}
+    )
+    assert sse.text.endswith('event: done\ndata: {"rows_rejected": 1}\n\n')
+    csv = client.post("/generate-data", json={**body, "format": "csv"})
+    assert csv.status_code == 422
+
+
+def test_rate_limit_is_per_tenant_with_retry_after(monkeypatch):
+    provider = list(_providers.values())[0]
+    monkeypatch.setattr(
+        provider, "generate", AsyncMock(return_value='{"rows": [{"a": 1}]}')
+    )
+    monkeypatch.setattr(main._admission, "max_wait", 0)
+    big = {"prompt": "costly", "rows": 5000}
+
+    assert client.post("/generate-data", json=big).status_code == 200
+    limited = client.post("/generate-data", json=big)
+    assert limited.status_code == 429
+    assert int(limited.headers["retry-after"]) > 0
+    # Headers the client picks cannot move server-funded calls to a new bucket.
+    spoofed = [
+        {"X-Tenant-Id": "fresh"},
+        {"X-Anthropic-API-Key": "unused-junk"},
+    ]
+    for headers in spoofed:
+        response = client.post(
+            "/generate-data", json={**big, "provider": "openai"}, headers=headers
+        )
+        assert response.status_code == 429
+
+    # A trusted proxy's tenant header does separate tenants.
+    monkeypatch.setattr(main.settings, "tenant_header", "X-Tenant-Id")
+    other = client.post("/generate-data", json=big, headers={"X-Tenant-Id": "team-b"})
+    assert other.status_code == 200
+
+
+def test_fresh_user_keys_do_not_bypass_the_rate_limit(monkeypatch):
+    def mock_cls(key, model):
+        provider = AsyncMock()
+        provider.generate = AsyncMock(return_value='{"rows": [{"a": 1}]}')
+        return provider
+
+    monkeypatch.setitem(
+        _HEADER_PROVIDER_MAP,
+        "x-openai-api-key",
+        ("openai", mock_cls, settings.openai_model),
+    )
+    monkeypatch.setattr(main._admission, "max_wait", 0)
+    big = {"prompt": "costly keys", "rows": 5000}
+    statuses = [
+        client.post(
+            "/generate-data", json=big, headers={"X-OpenAI-API-Key": f"random-{i}"}
+        ).status_code
+        for i in range(3)
+    ]
+    assert statuses == [200, 429, 429]
+
+
+def test_startup_warm_up_builds_lazy_providers(monkeypatch):
+    from providers import LazyProvider
+
+    factory = Mock()
+    lazy = LazyProvider(factory)
+    monkeypatch.setattr(main, "_lazy_providers", {"fake": lazy})
+    asyncio.run(main._warm_up())
+    assert lazy.loaded and factory.call_count == 1
@@ -0,0 +1,62 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from prometheus_client import REGISTRY
+
+import metrics
+from providers import AnthropicProvider, OpenAIProvider
+
+
+def _value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_record_retry_counts_per_provider():
+    before = _value("provider_retries_total", provider="openai")
+    provider = OpenAIProvider.__new__(OpenAIProvider)
+    metrics.record_retry(SimpleNamespace(args=(provider, "prompt")))
+    assert _value("provider_retries_total", provider="openai") == before + 1
+
+
+def test_provider_call_records_outcome_and_in_flight():
+    def calls(outcome):
+        return _value(
+            "provider_call_duration_seconds_count", provider="test", outcome=outcome
+        )
+
+    ok, error = calls("ok"), calls("error")
+    with metrics.provider_call("test"):
+        assert _value("provider_calls_in_flight", provider="test") == 1
+    with pytest.raises(RuntimeError):
+        with metrics.provider_call("test"):
+            raise RuntimeError
+    assert (calls("ok"), calls("error")) == (ok + 1, error + 1)
+    assert _value("provider_calls_in_flight", provider="test") == 0
+
+
+def test_anthropic_reuses_cacheable_system_prompt_and_reports_cache_reads():
+    provider = AnthropicProvider("test-key", "test-model")
+    response = SimpleNamespace(
+        content=[SimpleNamespace(text='{"rows": []}')],
+        usage=SimpleNamespace(
+            input_tokens=12,
+            output_tokens=30,
+            cache_read_input_tokens=900,
+            cache_creation_input_tokens=0,
+        ),
+    )
+    create = AsyncMock(return_value=response)
+    provider._client.messages.create = create
+    before = _value("provider_tokens_total", provider="anthropic", kind="cache_read")
+
+    asyncio.run(provider.generate("a"))
+    asyncio.run(provider.generate("b"))
+
+    first, second = (call.kwargs["system"] for call in create.await_args_list)
+    assert first is second
+    assert first[-1]["cache_control"] == {"type": "ephemeral"}
+    assert "rows" in first[-1]["text"]
+    after = _value("provider_tokens_total", provider="anthropic", kind="cache_read")
+    assert after == before + 1800
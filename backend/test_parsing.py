@@ -0,0 +1,53 @@
+import pytest
+
+from parsing import RowStreamParser
+
+DOC = '{"rows": [{"a": 1, "s": "x}{\\"]"}, {"a": 2, "nested": {"b": [1, 2]}}]}'
+
+
+def _feed_all(parser, text, size):
+    rows = []
+    for i in range(0, len(text), size):
+        rows.extend(parser.feed(text[i : i + size]))
+    return rows
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, len(DOC)])
+def test_row_stream_parser_emits_rows_across_chunk_boundaries(chunk_size):
+    parser = RowStreamParser()
+    rows = _feed_all(parser, DOC, chunk_size)
+    assert rows == [{"a": 1, "s": 'x}{"]'}, {"a": 2, "nested": {"b": [1, 2]}}]
+    assert parser.done
+    parser.close()
+
+
+def test_row_stream_parser_emits_each_row_as_it_closes():
+    parser = RowStreamParser()
+    assert parser.feed('{"rows": [{"a": 1}, {"a"') == [{"a": 1}]
+    assert parser.feed(": 2}") == [{"a": 2}]
+    assert not parser.done
+    assert parser.feed("]}") == []
+    assert parser.done
+
+
+def test_row_stream_parser_accepts_bare_array():
+    parser = RowStreamParser()
+    assert parser.feed('[{"a": 1}]') == [{"a": 1}]
+    assert parser.done
+
+
+def test_row_stream_parser_close_without_rows_raises():
+    parser = RowStreamParser()
+    parser.feed("no json here")
+    with pytest.raises(ValueError):
+        parser.close()
+
+
+def test_truncated_completion_keeps_complete_rows():
+    from parsing import extract_json
+    from providers import Completion
+
+    text = '```json\n{"rows": [{"a": 1}, {"a": "x}"}, {"a": 3, "b": [1,'
+    assert extract_json(Completion(text, truncated=True)) == [{"a": 1}, {"a": "x}"}]
+    with pytest.raises(ValueError):
+        extract_json(text)
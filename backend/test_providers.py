@@ -0,0 +1,76 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from providers import AnthropicProvider, LLMProvider, OpenAIProvider
+
+
+def _anthropic_response(text, stop_reason):
+    usage = SimpleNamespace(input_tokens=1, output_tokens=1)
+    return SimpleNamespace(
+        content=[SimpleNamespace(text=text)], stop_reason=stop_reason, usage=usage
+    )
+
+
+def test_anthropic_reports_truncation_and_sizes_max_tokens():
+    provider = AnthropicProvider("test-key", "test-model")
+    create = AsyncMock(
+        side_effect=[
+            _anthropic_response('{"rows": [{"a"', "max_tokens"),
+            _anthropic_response('{"rows": []}', "end_turn"),
+        ]
+    )
+    provider._client.messages.create = create
+
+    cut = asyncio.run(provider.generate("p", max_tokens=1234))
+    full = asyncio.run(provider.generate("p"))
+
+    assert cut.truncated and not full.truncated
+    assert create.await_args_list[0].kwargs["max_tokens"] == 1234
+    assert create.await_args_list[1].kwargs["max_tokens"] == 4096
+
+
+def test_openai_reports_incomplete_response_as_truncated():
+    provider = OpenAIProvider("test-key", "test-model")
+    response = SimpleNamespace(
+        output=[SimpleNamespace(content=[SimpleNamespace(text='{"rows": [')])],
+        incomplete_details=SimpleNamespace(reason="max_output_tokens"),
+        usage=None,
+    )
+    create = AsyncMock(return_value=response)
+    provider._client.responses.create = create
+
+    assert asyncio.run(provider.generate("p", max_tokens=500)).truncated
+    assert create.await_args.kwargs["max_output_tokens"] == 500
+
+
+def test_lazy_provider_builds_on_first_use():
+    from unittest.mock import Mock
+
+    from providers import LazyProvider
+
+    inner = Mock()
+    inner.generate = AsyncMock(return_value="{}")
+    factory = Mock(return_value=inner)
+    lazy = LazyProvider(factory)
+
+    assert not lazy.loaded and factory.call_count == 0
+    asyncio.run(lazy.aclose())  # nothing built, nothing to close
+    assert asyncio.run(lazy.generate("p", max_tokens=10)) == "{}"
+    assert asyncio.run(lazy.generate("q")) == "{}"
+    assert factory.call_count == 1
+    inner.generate.assert_awaited_with("q", None)
+
+
+def test_providers_must_implement_spec_generation():
+    class DatasetOnly(LLMProvider):
+        async def generate(self, prompt, max_tokens=None):
+            return "{}"
+
+        async def health_check(self):
+            return True
+
+    with pytest.raises(TypeError, match="generate_spec"):
+        DatasetOnly()
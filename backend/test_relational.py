@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from relational import (
+    assign_foreign_key,
+    dependency_levels,
+    ensure_primary_key,
+    link_tables,
+    table_prompt,
+)
+
+
+def test_dependency_levels_groups_independent_tables():
+    fks = {
+        "orders": [("customer_id", "customers"), ("product_id", "products")],
+        "items": [("order_id", "orders")],
+        "employees": [("manager_id", "employees")],
+    }
+    tables = ["items", "orders", "customers", "products", "employees"]
+    assert dependency_levels(tables, fks) == [
+        ["customers", "products", "employees"],
+        ["orders"],
+        ["items"],
+    ]
+
+
+def test_dependency_levels_rejects_cycles_and_unknown_tables():
+    with pytest.raises(ValueError, match="cycle"):
+        dependency_levels(["a", "b"], {"a": [("b_id", "b")], "b": [("a_id", "a")]})
+    with pytest.raises(ValueError, match="unknown table"):
+        dependency_levels(["a"], {"a": [("x_id", "x")]})
+
+
+def test_ensure_primary_key_keeps_unique_keys_and_renumbers_duplicates():
+    unique = [{"id": "a"}, {"id": "b"}]
+    assert ensure_primary_key(unique, "id") == ["a", "b"]
+    duplicated = [{"id": 1}, {"id": 1}, {"name": "x"}]
+    assert ensure_primary_key(duplicated, "id") == [1, 2, 3]
+    assert [row["id"] for row in duplicated] == [1, 2, 3]
+
+
+def test_link_tables_samples_foreign_keys_from_parent_keys():
+    tables = {
+        "customers": [{"id": 7}, {"id": 7}, {"id": 9}],
+        "orders": [{"order_id": i, "customer_id": "?"} for i in range(50)],
+    }
+    link_tables(
+        tables,
+        {"customers": "id", "orders": "order_id"},
+        {"orders": [("customer_id", "customers")]},
+        seed=1,
+    )
+    # Duplicate customer ids were renumbered before orders were linked.
+    assert [c["id"] for c in tables["customers"]] == [1, 2, 3]
+    assert {o["customer_id"] for o in tables["orders"]} <= {1, 2, 3}
+
+
+def test_assign_foreign_key_needs_parent_rows():
+    with pytest.raises(ValueError, match="no rows"):
+        assign_foreign_key([{"x": 1}], "x", [], random.Random(0))
+
+
+def test_table_prompt_mentions_keys():
+    prompt = table_prompt("orders", "Orders", "id", [("customer_id", "customers")])
+    assert "`orders`" in prompt and "`customer_id`" in prompt
@@ -0,0 +1,102 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+import resilience
+from resilience import (
+    AdaptiveLimiter,
+    CircuitBreaker,
+    CircuitOpenError,
+    GuardedProvider,
+)
+
+
+def _inner(side_effect):
+    inner = AsyncMock()
+    inner.generate = AsyncMock(side_effect=side_effect)
+    inner.is_transient_error = lambda exc: isinstance(exc, TimeoutError)
+    return inner
+
+
+def test_circuit_breaker_transitions(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    now[0] = 31
+    assert breaker.state == "half_open"
+    assert breaker.allow()  # single probe
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] = 62
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_adaptive_limiter_aimd():
+    async def run():
+        limiter = AdaptiveLimiter(initial_limit=4, min_limit=1, queue_timeout=0.01)
+        for _ in range(4):
+            assert await limiter.acquire()
+        assert not await limiter.acquire()  # over the cap: times out
+        await limiter.release(ok=False)
+        assert limiter.limit == 2
+        await limiter.release(ok=True)
+        assert limiter.limit == 2.5
+        return limiter
+
+    assert asyncio.run(run()).in_flight == 2
+
+
+def test_adaptive_limiter_without_queueing_admits_up_to_the_cap():
+    async def run():
+        limiter = AdaptiveLimiter(initial_limit=2, queue_timeout=0)
+        return [await limiter.acquire() for _ in range(3)]
+
+    assert asyncio.run(run()) == [True, True, False]
+
+
+def test_guarded_provider_fails_fast_when_open():
+    inner = _inner(TimeoutError("upstream timeout"))
+    guarded = GuardedProvider(
+        "openai", inner, CircuitBreaker(failure_threshold=2), AdaptiveLimiter()
+    )
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(TimeoutError):
+                await guarded.generate("p")
+        with pytest.raises(CircuitOpenError) as excinfo:
+            await guarded.generate("p")
+        return excinfo.value
+
+    error = asyncio.run(run())
+    assert error.status_code == 503
+    assert "Retry-After" in error.headers
+    assert inner.generate.await_count == 2
+    assert guarded.status()["state"] == "open"
+    assert guarded.limiter.in_flight == 0
+
+
+def test_guarded_provider_ignores_non_transient_errors():
+    inner = _inner(ValueError("bad prompt"))
+    guarded = GuardedProvider(
+        "openai", inner, CircuitBreaker(failure_threshold=1), AdaptiveLimiter()
+    )
+
+    async def run():
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                await guarded.generate("p")
+
+    asyncio.run(run())
+    assert guarded.breaker.state == "closed"
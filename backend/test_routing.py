@@ -0,0 +1,68 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from routing import RoutedProvider, Router
+
+
+def _provider(delay=0.0, result="ok", exc=None):
+    async def generate(prompt, max_tokens=None):
+        await asyncio.sleep(delay)
+        if exc is not None:
+            raise exc
+        return result
+
+    provider = AsyncMock()
+    provider.generate = AsyncMock(side_effect=generate)
+    return provider
+
+
+def _warm(router, name, latency, ok=True, n=10):
+    for _ in range(n):
+        router._stats(name).record(latency, ok=ok)
+
+
+def test_rank_prefers_fast_healthy_providers():
+    router = Router()
+    _warm(router, "slow", 2.0)
+    _warm(router, "fast", 0.5)
+    _warm(router, "broken", 0.1, ok=False)
+    assert router.rank(["broken", "slow", "fast"]) == ["fast", "slow", "broken"]
+    # Providers without samples wait behind healthy ones, ahead of broken ones.
+    assert router.rank(["new", "fast"]) == ["fast", "new"]
+    assert router.rank(["broken", "new"]) == ["new", "broken"]
+
+
+def test_hedged_request_wins_and_cancels_slow_primary():
+    router = Router(hedge_min_delay=0.01, hedge_default_delay=0.01)
+    slow, fast = _provider(delay=1.0, result="slow"), _provider(result="fast")
+    routed = RoutedProvider({"slow": slow, "fast": fast}, router)
+    _warm(router, "slow", 0.01)
+    _warm(router, "fast", 0.02)
+
+    assert asyncio.run(routed.generate("p")) == "fast"
+    assert slow.generate.await_count == 1
+    # The cancelled call is recorded with its elapsed time as a lower bound.
+    assert router.stats["slow"].samples == 11
+    assert router.stats["slow"].percentile(1.0) >= 0.01
+
+
+def test_failover_when_primary_errors():
+    router = Router(hedge=False)
+    routed = RoutedProvider(
+        {"a": _provider(exc=RuntimeError("down")), "b": _provider(result="b")},
+        router,
+    )
+    assert asyncio.run(routed.generate("p")) == "b"
+    assert router.stats["a"].error_rate == 1.0
+
+
+def test_all_candidates_failing_raises_last_error():
+    router = Router(hedge=False)
+    routed = RoutedProvider(
+        {"a": _provider(exc=RuntimeError("a")), "b": _provider(exc=ValueError("b"))},
+        router,
+    )
+    with pytest.raises(ValueError, match="b"):
+        asyncio.run(routed.generate("p"))
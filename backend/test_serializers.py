@@ -0,0 +1,58 @@
+import io
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from serializers import (
+    column_union,
+    iter_csv,
+    iter_ndjson,
+    to_arrow_ipc,
+    to_csv,
+    to_parquet,
+)
+
+
+def test_to_csv_matches_previous_dataframe_output():
+    rows = [
+        {"a": 1.5, "b": None},
+        {"c": "x,y", "a": 2.5, "d": True, "e": {"k": 1}},
+        {"a": 'q"', "c": "line\nbreak"},
+    ]
+    assert to_csv(rows) == (
+        "a,b,c,d,e\n"
+        "1.5,,,,\n"
+        "2.5,,\"x,y\",True,{'k': 1}\n"
+        '"q""",,"line\nbreak",,\n'
+    )
+
+
+def test_to_csv_empty():
+    assert to_csv([]) == "\n"
+
+
+def test_column_union_first_seen_order():
+    assert column_union([{"b": 1}, {"a": 2, "b": 3}, {"c": 4}]) == ["b", "a", "c"]
+
+
+def test_iter_csv_yields_batches():
+    rows = [{"i": i} for i in range(1200)]
+    chunks = list(iter_csv(rows))
+    assert len(chunks) == 3
+    assert "".join(chunks) == "i\n" + "".join(f"{i}\n" for i in range(1200))
+
+
+def test_iter_ndjson_one_object_per_line():
+    rows = [{"i": i, "s": "\u00e9"} for i in range(600)]
+    lines = "".join(iter_ndjson(rows)).splitlines()
+    assert [json.loads(line) for line in lines] == rows
+
+
+def test_arrow_and_parquet_round_trip_with_mixed_types():
+    rows = [{"a": 1, "b": "x"}, {"a": "2", "c": 1.5}]
+    expected = [{"a": "1", "b": "x", "c": None}, {"a": "2", "b": None, "c": 1.5}]
+    table = pa.ipc.open_stream(to_arrow_ipc(rows)).read_all()
+    assert table.to_pylist() == expected
+    assert pq.read_table(io.BytesIO(to_parquet(rows))).to_pylist() == expected
+    assert table.schema.field("c").type == pa.float64()
@@ -0,0 +1,74 @@
+import pytest
+
+from validation import RowValidator
+
+COLUMNS = [
+    {"name": "id", "type": "integer"},
+    {"name": "first_name", "type": "string"},
+    {"name": "score", "type": "number", "nullable": True},
+    {"name": "active", "type": "boolean"},
+    {"name": "tier", "type": "string", "enum": ["Gold", "Silver"]},
+    {"name": "joined", "type": "date"},
+]
+
+
+def test_rows_are_repaired_to_the_schema():
+    validator = RowValidator(COLUMNS)
+    row = {
+        "ID": "1,024",
+        "First Name": "Ada",
+        "score": "",
+        "active": "yes",
+        "tier": "gold",
+        "joined": "2024-03-01T10:00:00Z",
+        "extra": "dropped",
+    }
+    assert validator.coerce(row) == {
+        "id": 1024,
+        "first_name": "Ada",
+        "score": None,
+        "active": True,
+        "tier": "Gold",
+        "joined": "2024-03-01",
+    }
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        {"id": "abc"},
+        {"id": 1.5},
+        {"active": "maybe"},
+        {"tier": "Bronze"},
+        {"joined": "yesterday"},
+        {"score": float("nan")},
+        {"first_name": None},
+        {"first_name": {"nested": 1}},
+    ],
+)
+def test_invalid_rows_are_rejected(change):
+    row = {
+        "id": 1,
+        "first_name": "Ada",
+        "score": 1.5,
+        "active": True,
+        "tier": "Gold",
+        "joined": "2024-03-01",
+    }
+    assert RowValidator(COLUMNS).coerce({**row, **change}) is None
+
+
+def test_parse_counts_rejects():
+    validator = RowValidator([{"name": "n", "type": "integer"}])
+    rows, rejected = validator.parse('{"rows": [{"n": 1}, 7, {"n": "x"}, {"n": "2"}]}')
+    assert rows == [{"n": 1}, {"n": 2}]
+    assert rejected == 2
+
+
+def test_bad_schemas_are_rejected():
+    with pytest.raises(ValueError, match="Duplicate"):
+        RowValidator([{"name": "First Name"}, {"name": "first_name"}])
+    with pytest.raises(ValueError):
+        RowValidator([{"name": "n", "type": "integer", "enum": ["one"]}])
+    with pytest.raises(ValueError, match="enum"):
+        RowValidator([{"name": "d", "type": "date", "enum": [20240101]}])
@@ -0,0 +1,173 @@
+import datetime
+import json
+import math
+from typing import Any, Callable, List, Optional, Tuple
+
+from fanout import column_id
+from parsing import extract_array
+
+COLUMN_TYPES = ("string", "integer", "number", "boolean", "date", "datetime")
+
+_TRUE = frozenset({"true", "yes", "y", "1"})
+_FALSE = frozenset({"false", "no", "n", "0"})
+
+
+def _as_string(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    raise TypeError("expected a string")
+
+
+def _as_integer(value: Any) -> int:
+    if isinstance(value, bool):
+        raise TypeError("expected an integer")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = value.strip().replace(",", "")
+        try:
+            return int(value)
+        except ValueError:
+            value = float(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    raise ValueError("expected an integer")
+
+
+def _as_number(value: Any) -> float:
+    if isinstance(value, bool):
+        raise TypeError("expected a number")
+    if isinstance(value, str):
+        value = float(value.strip().replace(",", ""))
+    if not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError("expected a finite number")
+    return value
+
+
+def _as_boolean(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, str)):
+        text = str(value).strip().lower()
+        if text in _TRUE:
+            return True
+        if text in _FALSE:
+            return False
+    raise ValueError("expected a boolean")
+
+
+def _as_date(value: Any) -> str:
+    if not isinstance(value, str):
+        raise TypeError("expected an ISO date")
+    # A full timestamp is repaired to its date part.
+    return datetime.date.fromisoformat(value.strip()[:10]).isoformat()
+
+
+def _as_datetime(value: Any) -> str:
+    if not isinstance(value, str):
+        raise TypeError("expected an ISO datetime")
+    return datetime.datetime.fromisoformat(value.strip()).isoformat()
+
+
+_COERCERS: dict[str, Callable[[Any], Any]] = {
+    "string": _as_string,
+    "integer": _as_integer,
+    "number": _as_number,
+    "boolean": _as_boolean,
+    "date": _as_date,
+    "datetime": _as_datetime,
+}
+
+
+class RowValidator:
+    """Check and repair rows against a typed column schema.
+
+    ``columns`` are dicts with ``name``, ``type`` (one of ``COLUMN_TYPES``),
+    and optional ``nullable`` and ``enum``. The schema is compiled once into
+    a list of per-column coercers. A row is repaired where the intent is
+    clear: keys are matched ignoring case and separators, ``"42"`` becomes
+    ``42``, ``"yes"`` becomes ``True``, enum values are matched ignoring case,
+    and extra keys are dropped. Rows that still do not fit are rejected.
+    """
+
+    def __init__(self, columns: List[dict]):
+        self.columns = [column["name"] for column in columns]
+        self._fields = []
+        seen = set()
+        for column in columns:
+            key = column_id(column["name"])
+            if key in seen:
+                raise ValueError(f"Duplicate column: {column['name']}")
+            seen.add(key)
+            coerce = _COERCERS[column.get("type", "string")]
+            enum = column.get("enum")
+            if enum:
+                try:
+                    values = [coerce(v) for v in enum]
+                except (TypeError, ValueError) as exc:
+                    raise ValueError(
+                        f"Invalid enum value for {column['name']}: {exc}"
+                    ) from exc
+                enum = {(v.lower() if isinstance(v, str) else v): v for v in values}
+            self._fields.append(
+                (column["name"], key, coerce, column.get("nullable", False), enum)
+            )
+        self._schema = columns
+
+    @property
+    def fingerprint(self) -> str:
+        """Stable text identifying the schema, for cache keys."""
+        return json.dumps(self._schema, sort_keys=True, separators=(",", ":"))
+
+    def coerce(self, row: Any) -> Optional[dict]:
+        """Return ``row`` repaired to the schema, or None if it cannot be."""
+        if not isinstance(row, dict):
+            return None
+        by_id = {column_id(key): value for key, value in row.items()}
+        out = {}
+        for name, key, coerce, nullable, enum in self._fields:
+            value = by_id.get(key)
+            if value is None or value == "":
+                if not nullable:
+                    return None
+                out[name] = None
+                continue
+            try:
+                value = coerce(value)
+            except (TypeError, ValueError):
+                return None
+            if enum is not None:
+                value = enum.get(value.lower() if isinstance(value, str) else value)
+                if value is None:
+                    return None
+            out[name] = value
+        return out
+
+    def validate(self, rows: list) -> Tuple[List[dict], int]:
+        """Return ``(valid rows, number rejected)``."""
+        valid = []
+        for row in rows:
+            fixed = self.coerce(row)
+            if fixed is not None:
+                valid.append(fixed)
+        return valid, len(rows) - len(valid)
+
+    def parse(self, content: str) -> Tuple[List[dict], int]:
+        """Extract rows from a completion and validate them."""
+        return self.validate(extract_array(content))
+
+    def prompt(self, prompt: str) -> str:
+        """Append the schema to ``prompt`` so the model aims for it."""
+        lines = [prompt, "", "Use exactly these columns:"]
+        for column in self._schema:
+            line = f"- {column['name']}: {column.get('type', 'string')}"
+            if column.get("enum"):
+                line += f", one of {json.dumps(column['enum'])}"
+            if column.get("nullable"):
+                line += ", may be null"
+            lines.append(line)
+        return "\n".join(lines)
@@ -65,7 +65,7 @@ describe('App', () => {
 
   it('shows success snackbar after generating data', async () => {
     axios.post.mockResolvedValueOnce({
-      data: { json: [{ name: 'Alice', age: 30 }] },
+      data: [{ name: 'Alice', age: 30 }],
     });
 
     render(<App />);
@@ -5,9 +5,11 @@ import * as Sentry from "@sentry/react";
 
 const API_BASE_URL = import.meta.env.VITE_API_URL || "http://localhost:8000";
 
+// Requests use `download: true`, so the backend returns the CSV text or JSON
+// array directly; the `{csv}` / `{json}` envelope is still accepted.
 const normalizeDataset = (payload, requestedFormat) => {
   if (requestedFormat === "csv") {
-    const csvContent = payload?.csv;
+    const csvContent = typeof payload === "string" ? payload : payload?.csv;
     if (!csvContent) {
       throw new Error("CSV payload missing");
     }
@@ -18,11 +20,30 @@ const normalizeDataset = (payload, requestedFormat) => {
     return { format: "csv", table: parsed.data, raw: csvContent };
   }
 
-  if (!Array.isArray(payload?.json)) {
+  const rows = Array.isArray(payload) ? payload : payload?.json;
+  if (!Array.isArray(rows)) {
     throw new Error("JSON payload must be an array");
   }
 
-  return { format: "json", table: payload.json, raw: payload.json };
+  return { format: "json", table: rows, raw: rows };
+};
+
+const requestConfig = (format, headers) => ({
+  timeout: 35000,
+  headers,
+  responseType: format === "csv" ? "text" : "json",
+});
+
+const errorDetail = (err) => {
+  let data = err.response?.data;
+  if (typeof data === "string") {
+    try {
+      data = JSON.parse(data);
+    } catch {
+      data = null;
+    }
+  }
+  return data?.detail || err.message || "Error generating data";
 };
 
 export default function useDataGeneration({ format, rowCount, prompt, provider, setSnackbar, savePromptToHistory, getHeaders }) {
@@ -64,10 +85,11 @@ export default function useDataGeneration({ format, rowCount, prompt, provider,
       const body = {
         prompt: `${trimmedPrompt}\n\nGenerate exactly ${rowCount} rows.`,
         format,
+        download: true,
       };
       if (provider) body.provider = provider;
       const headers = getHeaders ? getHeaders() : {};
-      const res = await axios.post(`${API_BASE_URL}/generate-data`, body, { timeout: 35000, headers });
+      const res = await axios.post(`${API_BASE_URL}/generate-data`, body, requestConfig(format, headers));
       const normalized = normalizeDataset(res.data, format);
       setDataset(normalized);
       setCache((prev) => ({ ...prev, [key]: normalized }));
@@ -76,7 +98,7 @@ export default function useDataGeneration({ format, rowCount, prompt, provider,
       setTimeout(() => tableRef.current?.scrollIntoView({ behavior: "smooth" }), 300);
     } catch (err) {
       Sentry.captureException(err);
-      const message = err.response?.data?.detail || err.message || "Error generating data";
+      const message = errorDetail(err);
       setSnackbar({ open: true, message, severity: "error" });
     } finally {
       setLoading(false);
@@ -129,10 +151,11 @@ export default function useDataGeneration({ format, rowCount, prompt, provider,
       const body = {
         prompt: `${trimmedPrompt}\n\nGenerate exactly ${rowCount} rows.`,
         format,
+        download: true,
       };
       if (provider) body.provider = provider;
       const headers = getHeaders ? getHeaders() : {};
-      const res = await axios.post(`${API_BASE_URL}/generate-data`, body, { timeout: 35000, headers });
+      const res = await axios.post(`${API_BASE_URL}/generate-data`, body, requestConfig(format, headers));
       const normalized = normalizeDataset(res.data, format);
       setDataset(normalized);
       setCache((prev) => ({ ...prev, [key]: normalized }));
@@ -141,7 +164,7 @@ export default function useDataGeneration({ format, rowCount, prompt, provider,
       setTimeout(() => tableRef.current?.scrollIntoView({ behavior: "smooth" }), 300);
     } catch (err) {
       Sentry.captureException(err);
-      const message = err.response?.data?.detail || err.message || "Error generating data";
+      const message = errorDetail(err);
       setSnackbar({ open: true, message, severity: "error" });
     } finally {
       setLoading(false);